@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+UMBC Dataset Generator Benchmark
+
+Runs generate_synthetic_dataset.py at several scale factors with --profile
+and collects, for every generate_* and export_* stage, wall time, CPU time,
+peak traced memory and rows per second into one JSON report.
+
+Given a baseline report, stages that got slower than the regression
+threshold allows are listed and the script exits with status 1, so it can
+guard performance work on the generator.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+# =============================================================================
+#                           CONFIGURATION SETTINGS
+# =============================================================================
+
+GENERATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate_synthetic_dataset.py")
+
+SCALE_FACTORS = ["SF1", "SF10"]     # Scale factors benchmarked by default
+REFERENCE_DATE = "2025-09-01"       # Pinned so every run generates the same history (the generator's
+                                    # SCALE_FACTOR_REFERENCE_DATE)
+SEED = 42
+REPORT_PATH = "benchmark_report.json"
+
+REGRESSION_THRESHOLD = 0.25   # Fail when a stage is this much slower than the baseline (0.25 = 25%)
+MIN_BASELINE_SECONDS = 0.5    # Stages faster than this in the baseline are too noisy to compare
+
+# =============================================================================
+#                           BENCHMARK
+# =============================================================================
+
+def run_scale_factor(scale_factor, work_dir, seed=SEED, reference_date=REFERENCE_DATE):
+    """
+    Generate one dataset in a fresh process and return its stage profile.
+    Shards run in-process (--workers 1) so their stages are broken down.
+    """
+    output_dir = os.path.join(work_dir, scale_factor)
+    profile_path = os.path.join(work_dir, f"profile_{scale_factor}.json")
+    command = [
+        sys.executable, GENERATOR,
+        "--scale-factor", scale_factor,
+        "--seed", str(seed),
+        "--reference-date", reference_date,
+        "--output-dir", output_dir,
+        "--workers", "1",
+        "--profile", profile_path
+    ]
+
+    print(f"Running {scale_factor}...")
+    start = time.time()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    print(f"  {scale_factor} finished in {time.time() - start:.1f}s")
+
+    with open(profile_path) as f:
+        return json.load(f)
+
+def run_benchmark(scale_factors, work_dir, seed=SEED, reference_date=REFERENCE_DATE):
+    """
+    Benchmark every scale factor and return the report.
+    """
+    return {
+        "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "seed": seed,
+        "referenceDate": reference_date,
+        "runs": {
+            scale_factor: run_scale_factor(scale_factor, work_dir, seed, reference_date)
+            for scale_factor in scale_factors
+        }
+    }
+
+def find_regressions(report, baseline, threshold=REGRESSION_THRESHOLD, min_seconds=MIN_BASELINE_SECONDS):
+    """
+    Compare stage wall times against a baseline report.
+    Returns (scale factor, stage, baseline seconds, seconds) for every stage
+    that slowed down by more than threshold.
+    """
+    regressions = []
+    for scale_factor, run in report["runs"].items():
+        baseline_run = baseline.get("runs", {}).get(scale_factor)
+        if baseline_run is None:
+            continue
+
+        baseline_stages = {stats["stage"]: stats for stats in baseline_run["stages"]}
+        for stats in run["stages"]:
+            baseline_stats = baseline_stages.get(stats["stage"])
+            if baseline_stats is None or baseline_stats["wallSeconds"] < min_seconds:
+                continue
+            if stats["wallSeconds"] > baseline_stats["wallSeconds"] * (1 + threshold):
+                regressions.append(
+                    (scale_factor, stats["stage"], baseline_stats["wallSeconds"], stats["wallSeconds"])
+                )
+    return regressions
+
+def print_summary(report):
+    """
+    Print the slowest stages of every run.
+    """
+    for scale_factor, run in report["runs"].items():
+        print(f"\n{scale_factor}: {run['totalWallSeconds']:.2f}s total")
+        slowest = sorted(run["stages"], key=lambda stats: stats["wallSeconds"], reverse=True)[:8]
+        for stats in slowest:
+            print(f"  {stats['stage']:<40} {stats['wallSeconds']:>9.3f}s "
+                  f"{stats['peakMemoryBytes'] / 2**20:>8.1f} MB")
+
+# =============================================================================
+#                           COMMAND LINE
+# =============================================================================
+
+def parse_args(argv=None):
+    """
+    Parse command line options.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the synthetic dataset generator per stage.")
+    parser.add_argument("--scale-factors", default=",".join(SCALE_FACTORS),
+                        help=f"Comma-separated scale factors (default: {','.join(SCALE_FACTORS)})")
+    parser.add_argument("--output", default=REPORT_PATH,
+                        help=f"JSON report path (default: {REPORT_PATH})")
+    parser.add_argument("--baseline",
+                        help="Earlier report to compare against; exit 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"Allowed slowdown per stage as a fraction (default: {REGRESSION_THRESHOLD})")
+    parser.add_argument("--min-seconds", type=float, default=MIN_BASELINE_SECONDS,
+                        help=f"Ignore stages faster than this in the baseline (default: {MIN_BASELINE_SECONDS})")
+    parser.add_argument("--work-dir",
+                        help="Keep generated datasets here instead of a temporary directory")
+    parser.add_argument("--seed", type=int, default=SEED,
+                        help=f"Random seed (default: {SEED})")
+    parser.add_argument("--reference-date", default=REFERENCE_DATE,
+                        help=f"Reference date for every run (default: {REFERENCE_DATE})")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Run the benchmark, write the report and check it against the baseline.
+    """
+    args = parse_args(argv)
+    scale_factors = [sf.strip() for sf in args.scale_factors.split(",") if sf.strip()]
+
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        report = run_benchmark(scale_factors, args.work_dir, args.seed, args.reference_date)
+    else:
+        with tempfile.TemporaryDirectory(prefix="umbc-benchmark-") as work_dir:
+            report = run_benchmark(scale_factors, work_dir, args.seed, args.reference_date)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}:")
+            for scale_factor, stage, before, after in regressions:
+                print(f"  {scale_factor} {stage}: {before:.3f}s -> {after:.3f}s ({after / before - 1:+.0%})")
+            sys.exit(1)
+        print(f"\nNo stage regressed by more than {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
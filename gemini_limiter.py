@@ -0,0 +1,114 @@
+"""
+Client-side rate limiting for Gemini calls, shared by the playlist vibe APIs
+(pytest.py and pytestserverless.py).
+
+Calls are paced by a token bucket under the per-minute quota instead of
+letting Gemini reject them. Callers waiting for a token sit in a bounded
+priority queue, so interactive requests are released before background work
+and a backlog is refused instead of growing without bound.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, Optional
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+class GeminiQueueFullError(Exception):
+    """Raised when too many Gemini calls are already waiting for quota"""
+
+class GeminiRateLimiter:
+    """
+    Token-bucket scheduler that paces Gemini calls under the per-minute quota.
+    Waiting calls sit in a bounded priority queue so interactive requests
+    are released before background work. Rejections and upstream rate limits
+    are counted in metrics; clock and sleep can be replaced in tests.
+    """
+    
+    def __init__(self, requests_per_minute: int, burst: int, max_queue_size: int,
+                 metrics: Optional[Dict] = None, clock=time.monotonic, sleep=asyncio.sleep):
+        self.requests_per_minute = requests_per_minute
+        self.rate_per_second = requests_per_minute / 60
+        self.capacity = max(1, burst)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.capacity)
+        self.updated_at = clock()
+        self.max_queue_size = max_queue_size
+        self.metrics = metrics if metrics is not None else {}
+        self.metrics.setdefault("rate_limit_rejections", 0)
+        self.metrics.setdefault("upstream_rate_limited", 0)
+        self.waiting = []
+        # Callers still waiting; the heap may also hold entries of callers that gave up
+        self.queued = 0
+        self.sequence = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.dispatcher = None
+    
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+    
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        """Wait until this call may go to Gemini"""
+        
+        if self.queued >= self.max_queue_size:
+            self.metrics["rate_limit_rejections"] += 1
+            raise GeminiQueueFullError("Too many Gemini requests waiting for quota")
+        
+        if len(self.waiting) >= 2 * self.max_queue_size:
+            # Drop entries of cancelled callers so the heap stays bounded too
+            self.waiting = [entry for entry in self.waiting if not entry[2].done()]
+            heapq.heapify(self.waiting)
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiting, (priority, next(self.sequence), future))
+        self.wakeup.set()
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self._dispatch())
+        
+        self.queued += 1
+        try:
+            await future
+        finally:
+            self.queued -= 1
+    
+    async def _dispatch(self):
+        while True:
+            # Wait for a token first, then hand it to the highest-priority waiter
+            self._refill()
+            if self.tokens < 1:
+                await self.sleep((1 - self.tokens) / self.rate_per_second)
+                continue
+            
+            if not self.waiting:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            
+            _, _, future = heapq.heappop(self.waiting)
+            if future.done():
+                # The caller gave up while queued
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+    
+    def penalize(self):
+        """Gemini told us we are over quota: drain the bucket so pacing backs off"""
+        
+        self.metrics["upstream_rate_limited"] += 1
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+    
+    def snapshot(self) -> Dict:
+        self._refill()
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "available_tokens": round(self.tokens, 2),
+            "queued": self.queued,
+            "max_queue_size": self.max_queue_size
+        }
@@ -11,15 +11,40 @@ The script produces Cypher files that can be directly imported into Neo4j.
 
 import random
 import string
+import re
+import zlib
 import uuid
 import csv
 import os
 import datetime
 import math
+import bisect
+import io
 import json
-from collections import defaultdict
+import time
+import gzip
+import hashlib
+import threading
+import argparse
+import itertools
+import contextlib
+import tracemalloc
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import defaultdict, deque
 from faker import Faker
 
+try:
+    import numpy as np
+except ImportError:  # The pure-Python interaction engine still works without NumPy
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar export then writes .npy directories instead of Parquet
+    pa = pq = None
+
 # Initialize Faker with a specific locale for more realistic data
 fake = Faker(['en_US'])
 
@@ -60,6 +85,15 @@ COURSE_DIFFICULTY_DISTRIBUTION = {
     5: 0.05   # Very Hard
 }
 
+# Grade points in tenths, so grade differences can be summed exactly
+GRADE_POINTS_TENTHS = {
+    "A": 40, "A-": 37,
+    "B+": 33, "B": 30, "B-": 27,
+    "C+": 23, "C": 20, "C-": 17,
+    "D+": 13, "D": 10, "D-": 7,
+    "F": 0, "W": 0
+}
+
 GRADE_DISTRIBUTION = {
     "A": 0.15,
     "A-": 0.15,
@@ -75,6 +109,28 @@ GRADE_DISTRIBUTION = {
     "W": 0.01  # Withdrawal
 }
 
+# Student preferences
+PREFERRED_PACE_DISTRIBUTION = {
+    "Accelerated": 0.1,
+    "Standard": 0.7,
+    "Part-time": 0.2
+}
+
+INSTRUCTION_PREFERENCE_DISTRIBUTION = {
+    "In-person": 0.6,
+    "Online": 0.2,
+    "Hybrid": 0.2
+}
+
+FINANCIAL_AID_DISTRIBUTION = {
+    "Scholarship": 0.15,
+    "FinancialAid": 0.35,
+    "Self-Pay": 0.35,
+    "Loans": 0.15
+}
+
+TEXTBOOKS_PER_COURSE_DISTRIBUTION = {1: 0.5, 2: 0.3, 3: 0.2}
+
 # The departments at UMBC (focused on CS and Biology)
 DEPARTMENTS = [
     "Computer Science",
@@ -89,28 +145,296 @@ COURSE_LEVELS = {
     400: 0.15   # Senior
 }
 
+# Relationship densities (pairwise rates are scaled down by scale presets so
+# every node keeps the same average degree)
+LEADS_TO_SAME_DEPT_RATE = 0.3       # LEADS_TO chance per next-level course in the same department
+SAME_DEPT_SIMILARITY_RATE = 0.1     # SIMILAR_CONTENT chance per course in the same department
+COURSE_SIMILARITY_TOP_K = 10        # Shared-tag SIMILAR_CONTENT edges kept per course
+COURSE_SIMILARITY_MAX_TAG_SHARE = 0.2  # Tags on more of the catalog than this don't make candidates
+COURSE_SIMILARITY_EXACT_GROUPS = 2000  # Distinct tag sets compared exactly; above this, MinHash/LSH
+COURSE_SIMILARITY_MINHASH_BANDS = 8    # LSH bands per MinHash signature
+COURSE_SIMILARITY_MINHASH_ROWS = 4     # MinHash values per LSH band
+DIFFICULTY_SIMILARITY_SAMPLE = 10   # Courses sampled per course for SIMILAR_DIFFICULTY
+LEARNING_STYLE_PEERS = 20           # Same-style students sampled per student
+COURSE_SAMPLE_ATTEMPTS = 8          # Random draws per course before enumerating eligible ones
+PERFORMANCE_SIMILARITY_TOP_K = 10      # Most similar students kept per student
+PERFORMANCE_SIMILARITY_MIN_COMMON = 3  # Completed courses two students must share
+PERFORMANCE_SIMILARITY_PAIR_CHUNK = 5_000_000  # Candidate pairs scored per NumPy chunk
+STUDENTS_PER_RELATIONSHIP_BLOCK = 1000  # Students whose degree and similarity edges are written at a time
+
+# Parallel generation: per-student stages run in fixed-size shards, each with
+# its own seeded RNG stream, so output does not depend on the worker count
+STUDENTS_PER_SHARD = 1000
+SHARDS_IN_FLIGHT_PER_WORKER = 2     # Bounds how many finished shards wait in memory
+
+# Person names are drawn from pools sampled from Faker once, not one Faker call per person
+NAME_POOL_SIZE = 1000     # Faker draws per first-name and last-name pool
+UNIQUE_NAMES = False      # Give every student and faculty member a distinct full name (--unique-names)
+
+# Rows per UNWIND statement in the batched Cypher export (--cypher-format unwind)
+CYPHER_BATCH_SIZE = 1000
+
+# CSV export: formatted blocks are compressed and written by a thread pool
+# (zlib and file writes release the GIL); big relationship files can be split
+# into chunks behind one header file, which neo4j-admin import reads in parallel
+CSV_WRITERS = 4                     # Writer threads (--csv-writers); 1 writes inline
+CSV_WRITE_QUEUE_PER_WRITER = 4      # Formatted blocks waiting per writer thread
+CSV_GZIP_LEVEL = 6                  # zlib level for --csv-compression gzip
+CSV_CHUNKED_FILES = ["completed_courses", "page_views", "textbook_interactions"]  # Split by --csv-chunks
+
+# Textbook page views and interactions: "numpy" draws whole shards as arrays,
+# "python" is the original record-at-a-time loop. The numpy engine also makes
+# the weighted draws of student attributes and grades in NumPy batches.
+INTERACTION_ENGINE = "numpy" if np is not None else "python"
+WEIGHTED_DRAW_BLOCK = 4096  # Weighted values drawn per NumPy batch when the count is not known
+
+# Reproducibility
+RANDOM_SEED = 42          # Seed for random and Faker
+REFERENCE_DATE = None     # "Today" for generated history (YYYY-MM-DD); None uses the real date
+SCALE_FACTOR_REFERENCE_DATE = "2025-09-01"  # Default REFERENCE_DATE of --scale-factor runs
+SCALE_FACTOR = 1          # Set by apply_scale_factor()
+
+# Named size presets in the style of TPC scale factors (SF1 = the sizes above)
+SCALE_FACTOR_PRESETS = {
+    "SF1": 1,
+    "SF10": 10,
+    "SF100": 100,
+    "SF1000": 1000,
+    "SF10000": 10000
+}
+
+# Per-stage profiler set by --profile; shard worker processes never profile
+PROFILER = None
+
+# Configuration recorded in the manifest
+CONFIG_KEYS = [
+    "SCALE_FACTOR", "RANDOM_SEED", "REFERENCE_DATE",
+    "NUM_STUDENTS", "NUM_COURSES", "NUM_FACULTY", "NUM_DEGREES",
+    "TERMS_TO_GENERATE", "HISTORY_YEARS", "MAX_PREREQS_PER_COURSE",
+    "LEADS_TO_SAME_DEPT_RATE", "SAME_DEPT_SIMILARITY_RATE", "COURSE_SIMILARITY_TOP_K",
+    "DIFFICULTY_SIMILARITY_SAMPLE", "LEARNING_STYLE_PEERS",
+    "PERFORMANCE_SIMILARITY_TOP_K", "PERFORMANCE_SIMILARITY_MIN_COMMON",
+    "STUDENTS_PER_SHARD", "INTERACTION_ENGINE", "NAME_POOL_SIZE", "UNIQUE_NAMES"
+]
+
 # =============================================================================
 #                           UTILITY FUNCTIONS
 # =============================================================================
 
-def weighted_choice(choices_dict):
+class WeightedSampler:
+    """
+    A weighted distribution ({value: weight}) compiled once into cumulative weights.
+
+    draw() takes one rng.random() and a bisect, exactly as random.choices
+    does, so it reproduces the same values from the same stream without
+    rebuilding the value and weight lists on every call. draw_array() makes
+    a batch of draws with a NumPy Generator, and stream() yields batched
+    draws one value at a time for loops that do not know their count.
+    """
+    
+    def __init__(self, distribution):
+        self.values = list(distribution)
+        self.cum_weights = list(itertools.accumulate(distribution.values()))
+        self.total = self.cum_weights[-1] + 0.0
+        self.last = len(self.values) - 1
+        self.cum_weights_array = None
+    
+    def draw(self, rng=random):
+        return self.values[bisect.bisect(self.cum_weights, rng.random() * self.total, 0, self.last)]
+    
+    def draw_array(self, count, gen):
+        """
+        Draw count value indices with a NumPy Generator; index self.values with them.
+        """
+        if self.cum_weights_array is None:
+            self.cum_weights_array = np.array(self.cum_weights)
+        indices = np.searchsorted(self.cum_weights_array, gen.random(count) * self.total, side="right")
+        return np.minimum(indices, self.last)
+    
+    def draw_values(self, count, gen):
+        return [self.values[i] for i in self.draw_array(count, gen).tolist()]
+    
+    def stream(self, gen, block=WEIGHTED_DRAW_BLOCK):
+        """
+        Yield values drawn block at a time with draw_array(), without end.
+        """
+        while True:
+            yield from self.draw_values(block, gen)
+
+# Samplers for the distributions in the configuration
+LEARNING_STYLE_SAMPLER = WeightedSampler(LEARNING_STYLE_DISTRIBUTION)
+COURSE_DIFFICULTY_SAMPLER = WeightedSampler(COURSE_DIFFICULTY_DISTRIBUTION)
+GRADE_SAMPLER = WeightedSampler(GRADE_DISTRIBUTION)
+COURSE_LEVEL_SAMPLER = WeightedSampler(COURSE_LEVELS)
+PREFERRED_PACE_SAMPLER = WeightedSampler(PREFERRED_PACE_DISTRIBUTION)
+INSTRUCTION_PREFERENCE_SAMPLER = WeightedSampler(INSTRUCTION_PREFERENCE_DISTRIBUTION)
+FINANCIAL_AID_SAMPLER = WeightedSampler(FINANCIAL_AID_DISTRIBUTION)
+TEXTBOOKS_PER_COURSE_SAMPLER = WeightedSampler(TEXTBOOKS_PER_COURSE_DISTRIBUTION)
+
+def bernoulli_indices(n, rate, rng=random):
+    """
+    Yield the indexes in range(n) that pass an independent rate-probability
+    coin flip, drawing geometric gaps between hits instead of flipping n coins.
+    """
+    if rate <= 0:
+        return
+    if rate >= 1:
+        yield from range(n)
+        return
+    
+    log_miss = math.log(1 - rate)
+    i = -1
+    while True:
+        i += 1 + int(math.log(1 - rng.random()) / log_miss)
+        if i >= n:
+            return
+        yield i
+
+# Campus IDs are two letters followed by five digits
+CAMPUS_ID_DIGIT_SPACE = 10 ** 5
+CAMPUS_ID_SPACE = 26 * 26 * CAMPUS_ID_DIGIT_SPACE
+
+class IdAllocator:
     """
-    Make a weighted random choice from a dictionary of choices and weights.
+    Hand out unique IDs with O(1) uniqueness checks.
+
+    Campus IDs come from a bijective permutation of the two-letter/five-digit
+    space, so the n-th ID is unique by construction and never needs a retry.
+    Other IDs (e.g. course IDs) are checked against a set and get the next
+    free "-N" suffix when taken.
     """
-    choices = list(choices_dict.keys())
-    weights = list(choices_dict.values())
-    return random.choices(choices, weights=weights, k=1)[0]
+    
+    def __init__(self, rng=random):
+        # i -> (a * i + b) mod N is a bijection on [0, N) whenever gcd(a, N) == 1
+        self.multiplier = rng.randrange(1, CAMPUS_ID_SPACE)
+        while math.gcd(self.multiplier, CAMPUS_ID_SPACE) != 1:
+            self.multiplier = rng.randrange(1, CAMPUS_ID_SPACE)
+        self.offset = rng.randrange(CAMPUS_ID_SPACE)
+        self.used_ids = set()
+        self.next_suffix = defaultdict(int)
+    
+    def campus_id(self, index):
+        """
+        Return the campus ID for the index-th student, e.g. 'AB12345'.
+        Distinct indexes below CAMPUS_ID_SPACE always give distinct IDs.
+        """
+        if not 0 <= index < CAMPUS_ID_SPACE:
+            raise ValueError(f"Campus ID space exhausted ({CAMPUS_ID_SPACE} IDs)")
+        
+        value = (self.multiplier * index + self.offset) % CAMPUS_ID_SPACE
+        letters, number = divmod(value, CAMPUS_ID_DIGIT_SPACE)
+        first, second = divmod(letters, 26)
+        return f"{string.ascii_uppercase[first]}{string.ascii_uppercase[second]}{number:05d}"
+    
+    def unique_id(self, base_id):
+        """
+        Return base_id if it is still free, otherwise the first free 'base_id-N'.
+        """
+        candidate = base_id
+        while candidate in self.used_ids:
+            self.next_suffix[base_id] += 1
+            candidate = f"{base_id}-{self.next_suffix[base_id]}"
+        
+        self.used_ids.add(candidate)
+        return candidate
 
-def generate_campus_id():
+class NamePool:
     """
-    Generate a realistic UMBC Campus ID (unique student identifier).
-    Format: Typically 'AB12345' where:
-    - 'AB' represents two letters
-    - '12345' represents 5 digits
+    Full names drawn in batches from first/last-name pools sampled from Faker once.
+
+    A pool of NAME_POOL_SIZE Faker draws keeps Faker's name frequencies, and
+    drawing from it costs a list lookup per name instead of a Faker call.
+    Unique names map the i-th person through a bijective permutation of the
+    distinct (first, last) pairs, like campus IDs, so they are distinct by
+    construction however the population is sharded; a middle initial is
+    added when the population outgrows the pairs, and more distinct names
+    are drawn from Faker when it outgrows those too.
     """
-    letters = ''.join(random.choices(string.ascii_uppercase, k=2))
-    numbers = ''.join(random.choices(string.digits, k=5))
-    return f"{letters}{numbers}"
+    
+    def __init__(self, seed=None, size=None, population=None):
+        self.seed = f"{RANDOM_SEED}:name-pool" if seed is None else seed
+        self.size = NAME_POOL_SIZE if size is None else size
+        faker = Faker(['en_US'])
+        faker.seed_instance(self.seed)
+        self.first_names = [faker.first_name() for _ in range(self.size)]
+        self.last_names = [faker.last_name() for _ in range(self.size)]
+        self.distinct_first_names = list(dict.fromkeys(self.first_names))
+        self.distinct_last_names = list(dict.fromkeys(self.last_names))
+        self.reserved = None
+        if population is not None:
+            self.reserve(population)
+    
+    def reserve(self, population):
+        """
+        Make sure population people can get unique names: while the distinct
+        names with middle initials are too few, draw rounds of size more first
+        and last names from a separately seeded Faker. Only the distinct names
+        grow, so random draws keep the original pool's frequencies, and they
+        depend only on the population, not on earlier calls.
+        """
+        if self.reserved == population:
+            return
+        
+        first_names = dict.fromkeys(self.first_names)
+        last_names = dict.fromkeys(self.last_names)
+        faker = Faker(['en_US'])
+        faker.seed_instance(f"{self.seed}:more-names")
+        while len(first_names) * len(last_names) * len(string.ascii_uppercase) < population:
+            known = len(first_names) + len(last_names)
+            first_names.update(dict.fromkeys(faker.first_name() for _ in range(self.size)))
+            last_names.update(dict.fromkeys(faker.last_name() for _ in range(self.size)))
+            if len(first_names) + len(last_names) == known:
+                raise ValueError(f"Faker has too few distinct names for {population} unique names")
+        self.distinct_first_names = list(first_names)
+        self.distinct_last_names = list(last_names)
+        self.reserved = population
+    
+    def draw(self, count, rng=random):
+        """
+        Return count full names drawn at random (repeats are possible).
+        """
+        first_names = rng.choices(self.first_names, k=count)
+        last_names = rng.choices(self.last_names, k=count)
+        return [f"{first} {last}" for first, last in zip(first_names, last_names)]
+    
+    def unique(self, start, count, population):
+        """
+        Return the distinct full names of people start..start+count-1 of population.
+        """
+        self.reserve(population)
+        first_names, last_names = self.distinct_first_names, self.distinct_last_names
+        initials = ""
+        space = len(first_names) * len(last_names)
+        if population > space:
+            initials = string.ascii_uppercase
+            space *= len(initials)
+        
+        # i -> (a * i + b) mod space is a bijection whenever gcd(a, space) == 1
+        rng = random.Random(f"{self.seed}:{space}")
+        multiplier = rng.randrange(1, space)
+        while math.gcd(multiplier, space) != 1:
+            multiplier = rng.randrange(1, space)
+        offset = rng.randrange(space)
+        
+        names = []
+        for i in range(start, start + count):
+            value = (multiplier * i + offset) % space
+            value, first = divmod(value, len(first_names))
+            initial, last = divmod(value, len(last_names))
+            if initials:
+                names.append(f"{first_names[first]} {initials[initial]}. {last_names[last]}")
+            else:
+                names.append(f"{first_names[first]} {last_names[last]}")
+        return names
+    
+    def names(self, start, count, population, rng=random):
+        """
+        Return names for people start..start+count-1: unique ones when
+        UNIQUE_NAMES is set, otherwise random draws from rng.
+        """
+        if UNIQUE_NAMES:
+            return self.unique(start, count, population)
+        return self.draw(count, rng)
 
 def generate_course_id(department, level):
     """
@@ -182,6 +506,14 @@ def generate_course_name(department, level):
         prefixes = ["Advanced ", "Topics in ", "Special Topics in "]
         return f"{random.choice(prefixes)}{random.choice(names)}"
 
+def reference_now():
+    """
+    Return the moment generated history is relative to (REFERENCE_DATE, or now).
+    """
+    if REFERENCE_DATE:
+        return datetime.datetime.strptime(REFERENCE_DATE, "%Y-%m-%d")
+    return datetime.datetime.now()
+
 def get_term_by_date(date):
     """
     Return the academic term (e.g., 'Fall2022') for a given date.
@@ -196,7 +528,7 @@ def get_term_by_date(date):
     else:
         return f"Fall{year}"
 
-def generate_date(year_min, year_max=None):
+def generate_date(year_min, year_max=None, rng=random):
     """
     Generate a random date between year_min and year_max.
     """
@@ -208,123 +540,342 @@ def generate_date(year_min, year_max=None):
     
     time_between_dates = end_date - start_date
     days_between_dates = time_between_dates.days
-    random_days = random.randrange(days_between_dates)
+    random_days = rng.randrange(days_between_dates)
     
     return start_date + datetime.timedelta(days=random_days)
 
+def group_by(records, field):
+    """
+    Group records by the value of one field, keeping record order.
+    """
+    groups = defaultdict(list)
+    for record in records:
+        groups[record[field]].append(record)
+    return groups
+
+class EntityRegistry:
+    """
+    ID -> entity maps and foreign-key groupings shared by every generator
+    stage, built once from the catalog so stages never scan lists for an ID.
+    """
+    
+    def __init__(self, terms=(), courses=(), textbooks=(), course_textbooks=(), prerequisites=()):
+        self.terms = {term["id"]: term for term in terms}
+        self.courses = {course["id"]: course for course in courses}
+        
+        # Textbook IDs can repeat across courses; the first one generated wins
+        self.textbooks = {}
+        for textbook in textbooks:
+            self.textbooks.setdefault(textbook["id"], textbook)
+        
+        self.term_start_dates = {
+            term["id"]: datetime.datetime.strptime(term["startDate"], "%Y-%m-%d") for term in terms
+        }
+        self.term_end_dates = {
+            term["id"]: datetime.datetime.strptime(term["endDate"], "%Y-%m-%d") for term in terms
+        }
+        
+        # Term the reference date falls in, or the last term if it was not generated
+        self.current_term = self.terms.get(get_term_by_date(reference_now()), terms[-1] if terms else None)
+        
+        self.textbooks_by_course = defaultdict(list)
+        for ct in course_textbooks:
+            self.textbooks_by_course[ct["courseId"]].append(self.textbooks[ct["textbookId"]])
+        
+        self.history_index = build_course_history_index(list(courses), prerequisites)
+    
+    def add_term(self, term):
+        """
+        Register a term added after the registry was built (incremental generation).
+        """
+        self.terms[term["id"]] = term
+        self.term_start_dates[term["id"]] = datetime.datetime.strptime(term["startDate"], "%Y-%m-%d")
+        self.term_end_dates[term["id"]] = datetime.datetime.strptime(term["endDate"], "%Y-%m-%d")
+
+class StageProfiler:
+    """
+    Accumulate wall time, CPU time, peak traced memory and row counts per
+    pipeline stage. Entering a stage again (e.g. once per shard) adds to it,
+    and a nested stage's time is also counted in the stage around it.
+    Memory is traced with tracemalloc, which slows allocation down.
+    """
+    
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.open_peaks = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        stats = self.stages.setdefault(name, {
+            "stage": name, "calls": 0, "rows": 0,
+            "wallSeconds": 0.0, "cpuSeconds": 0.0, "peakMemoryBytes": 0
+        })
+        counter = {"rows": 0}
+        
+        # Enclosing stages keep the peak seen so far before it is reset
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.open_peaks = [max(open_peak, peak) for open_peak in self.open_peaks]
+            tracemalloc.reset_peak()
+        self.open_peaks.append(0)
+        
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield counter
+        finally:
+            stats["calls"] += 1
+            stats["rows"] += counter["rows"]
+            stats["wallSeconds"] += time.perf_counter() - wall
+            stats["cpuSeconds"] += time.process_time() - cpu
+            
+            peak = self.open_peaks.pop()
+            if self.trace_memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                self.open_peaks = [max(open_peak, peak) for open_peak in self.open_peaks]
+            stats["peakMemoryBytes"] = max(stats["peakMemoryBytes"], peak)
+    
+    def report(self):
+        """
+        Return the stages in the order they first ran, with rows per second.
+        """
+        return [
+            dict(stats,
+                 wallSeconds=round(stats["wallSeconds"], 4),
+                 cpuSeconds=round(stats["cpuSeconds"], 4),
+                 rowsPerSecond=round(stats["rows"] / stats["wallSeconds"], 1) if stats["wallSeconds"] else None)
+            for stats in self.stages.values()
+        ]
+
+def profile_stage(name):
+    """
+    Time a pipeline stage when profiling is on (a no-op otherwise). Set the
+    yielded dict's "rows" to the number of rows the stage produced.
+    """
+    if PROFILER is None:
+        return contextlib.nullcontext({"rows": 0})
+    return PROFILER.stage(name)
+
+# =============================================================================
+#                           SCALE FACTORS AND REPRODUCIBILITY
+# =============================================================================
+
+def apply_scale_factor(preset):
+    """
+    Scale entity counts and relationship densities by a named preset.
+    Entity counts grow linearly; pairwise rates shrink by the same factor so
+    each course and student keeps the same average number of relationships.
+    """
+    global SCALE_FACTOR, NUM_STUDENTS, NUM_COURSES, NUM_FACULTY
+    global LEADS_TO_SAME_DEPT_RATE, SAME_DEPT_SIMILARITY_RATE
+    
+    if preset not in SCALE_FACTOR_PRESETS:
+        raise ValueError(f"Unknown scale factor {preset!r}, expected one of {list(SCALE_FACTOR_PRESETS)}")
+    
+    factor = SCALE_FACTOR_PRESETS[preset] / SCALE_FACTOR
+    SCALE_FACTOR = SCALE_FACTOR_PRESETS[preset]
+    
+    NUM_STUDENTS = int(NUM_STUDENTS * factor)
+    NUM_COURSES = int(NUM_COURSES * factor)
+    NUM_FACULTY = int(NUM_FACULTY * factor)
+    
+    LEADS_TO_SAME_DEPT_RATE /= factor
+    SAME_DEPT_SIMILARITY_RATE /= factor
+
+def seed_generators(seed):
+    """
+    Seed the global random module and Faker so runs are reproducible.
+    """
+    global RANDOM_SEED
+    
+    RANDOM_SEED = seed
+    random.seed(seed)
+    Faker.seed(seed)
+
+def get_config():
+    """
+    Return the current generator configuration as a plain dictionary.
+    """
+    return {key: globals()[key] for key in CONFIG_KEYS}
+
+def apply_config(config):
+    """
+    Restore a configuration captured with get_config() (used by worker processes).
+    """
+    globals().update({key: config[key] for key in CONFIG_KEYS})
+
+def shard_rng(stage, shard_index):
+    """
+    Return the independent RNG stream for one stage of one shard.
+    String seeds are hashed with SHA-512, so streams are stable across runs and processes.
+    """
+    return random.Random(f"{RANDOM_SEED}:{stage}:{shard_index}")
+
+def batch_generator(rng):
+    """
+    Return a NumPy Generator seeded from rng for batched weighted draws with
+    the numpy engine, or None with the python engine (rng is then untouched).
+    """
+    if INTERACTION_ENGINE != "numpy":
+        return None
+    return np.random.default_rng(rng.getrandbits(128))
+
+def write_profile(path, profiler, elapsed_seconds, workers):
+    """
+    Write the per-stage profile of a run as JSON and print it as a table.
+    """
+    stages = profiler.report()
+    with open(path, "w") as f:
+        json.dump({
+            "scaleFactor": SCALE_FACTOR,
+            "workers": workers,
+            "config": get_config(),
+            "totalWallSeconds": round(elapsed_seconds, 4),
+            "stages": stages
+        }, f, indent=2)
+    
+    print(f"{'stage':<40} {'wall s':>9} {'cpu s':>9} {'peak MB':>9} {'rows/s':>12}")
+    for stats in stages:
+        rows_per_second = f"{stats['rowsPerSecond']:,.0f}" if stats["rowsPerSecond"] else "-"
+        print(f"{stats['stage']:<40} {stats['wallSeconds']:>9.3f} {stats['cpuSeconds']:>9.3f} "
+              f"{stats['peakMemoryBytes'] / 2**20:>9.1f} {rows_per_second:>12}")
+
+def write_manifest(output_dir, row_counts, elapsed_seconds, csv_files=None):
+    """
+    Write manifest.json recording the configuration, row counts and CSV file
+    names (header file first) of a run.
+    """
+    manifest = {
+        "generator": "generate_synthetic_dataset.py",
+        "generatedAt": datetime.datetime.now().isoformat(timespec="seconds"),
+        "elapsedSeconds": round(elapsed_seconds, 2),
+        "config": get_config(),
+        "rowCounts": row_counts
+    }
+    if csv_files is not None:
+        manifest["csvFiles"] = csv_files
+    
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
 # =============================================================================
 #                           DATA GENERATION
 # =============================================================================
 
+# Academic calendar, in term order within a year
+TERM_DATES = {
+    "Spring": {"start_month": 1, "start_day": 25, "end_month": 5, "end_day": 15},
+    "Summer": {"start_month": 6, "start_day": 1, "end_month": 7, "end_day": 30},
+    "Fall": {"start_month": 8, "start_day": 25, "end_month": 12, "end_day": 15}
+}
+
 def generate_terms():
     """
     Generate academic terms for the past few years and upcoming year.
     """
     terms = []
-    current_year = datetime.datetime.now().year
+    current_year = reference_now().year
     start_year = current_year - HISTORY_YEARS
     end_year = current_year + 1
     
-    term_info = {
-        "Spring": {"start_month": 1, "start_day": 25, "end_month": 5, "end_day": 15},
-        "Summer": {"start_month": 6, "start_day": 1, "end_month": 7, "end_day": 30},
-        "Fall": {"start_month": 8, "start_day": 25, "end_month": 12, "end_day": 15}
-    }
-    
     for year in range(start_year, end_year + 1):
-        for term_name, dates in term_info.items():
-            term_id = f"{term_name}{year}"
-            
+        for term_name in TERM_DATES:
             # Skip generating too many terms if we exceed TERMS_TO_GENERATE
             if len(terms) >= TERMS_TO_GENERATE:
                 break
-                
-            start_date = datetime.date(year, dates["start_month"], dates["start_day"])
-            end_date = datetime.date(year, dates["end_month"], dates["end_day"])
             
-            terms.append({
-                "id": term_id,
-                "name": f"{term_name} {year}",
-                "startDate": start_date.strftime("%Y-%m-%d"),
-                "endDate": end_date.strftime("%Y-%m-%d"),
-                "type": term_name
-            })
+            terms.append(make_term(term_name, year))
     
     return terms
 
-def generate_students():
+def make_term(term_name, year):
     """
-    Generate student data.
+    Return the term record for a term type (e.g. "Fall") in a year.
     """
-    students = []
-    
-    current_year = datetime.datetime.now().year
-    
-    learning_styles = list(LEARNING_STYLE_DISTRIBUTION.keys())
-    learning_style_weights = list(LEARNING_STYLE_DISTRIBUTION.values())
+    dates = TERM_DATES[term_name]
+    start_date = datetime.date(year, dates["start_month"], dates["start_day"])
+    end_date = datetime.date(year, dates["end_month"], dates["end_day"])
     
-    course_loads = {
-        "Accelerated": 0.1,
-        "Standard": 0.7,
-        "Part-time": 0.2
+    return {
+        "id": f"{term_name}{year}",
+        "name": f"{term_name} {year}",
+        "startDate": start_date.strftime("%Y-%m-%d"),
+        "endDate": end_date.strftime("%Y-%m-%d"),
+        "type": term_name
     }
+
+def following_term(term):
+    """
+    Return the term after this one in the academic calendar.
+    """
+    term_names = list(TERM_DATES)
+    year = int(term["id"][len(term["type"]):])
+    index = term_names.index(term["type"]) + 1
+    if index == len(term_names):
+        index, year = 0, year + 1
+    return make_term(term_names[index], year)
+
+def generate_students(id_allocator=None, start=0, count=None, rng=random, name_pool=None, name_rng=None, gen=None):
+    """
+    Generate student data.
+    Students start..start+count-1 of the population are generated, so shards
+    of the population can be produced independently. Names come from
+    name_pool, drawn with name_rng (default: rng). With a NumPy Generator gen
+    the weighted attributes are drawn from it in one batch each.
+    """
+    students = []
+    id_allocator = id_allocator or IdAllocator()
+    count = NUM_STUDENTS if count is None else count
+    name_pool = name_pool or NamePool()
+    names = name_pool.names(start, count, NUM_STUDENTS + NUM_FACULTY, name_rng or rng)
     
-    instruction_prefs = {
-        "In-person": 0.6,
-        "Online": 0.2,
-        "Hybrid": 0.2
-    }
+    if gen is not None:
+        learning_styles = iter(LEARNING_STYLE_SAMPLER.draw_values(count, gen))
+        paces = iter(PREFERRED_PACE_SAMPLER.draw_values(count, gen))
+        financial_aid = iter(FINANCIAL_AID_SAMPLER.draw_values(count, gen))
+        instruction_modes = iter(INSTRUCTION_PREFERENCE_SAMPLER.draw_values(count, gen))
     
-    financial_statuses = {
-        "Scholarship": 0.15,
-        "FinancialAid": 0.35,
-        "Self-Pay": 0.35,
-        "Loans": 0.15
-    }
+    current_year = reference_now().year
     
-    for i in range(NUM_STUDENTS):
-        # Generate basic info
-        campus_id = generate_campus_id()
-        
-        # Ensure campus_id is unique
-        while any(s["id"] == campus_id for s in students):
-            campus_id = generate_campus_id()
-            
-        # Use faker for name generation
-        first_name = fake.first_name()
-        last_name = fake.last_name()
+    for i, name in zip(range(start, start + count), names):
+        # Generate basic info (campus IDs are unique by construction)
+        campus_id = id_allocator.campus_id(i)
         
         # Generate enrollment date (between 1-5 years ago)
-        enrollment_years_ago = random.randint(1, 5)
-        enrollment_date = generate_date(current_year - enrollment_years_ago, current_year)
+        enrollment_years_ago = rng.randint(1, 5)
+        enrollment_date = generate_date(current_year - enrollment_years_ago, current_year, rng)
         
         # Generate expected graduation (1-4 years from enrollment)
-        grad_years = random.randint(1, 4) if enrollment_years_ago <= 3 else random.randint(0, 2)
-        expected_graduation = generate_date(current_year + grad_years)
+        grad_years = rng.randint(1, 4) if enrollment_years_ago <= 3 else rng.randint(0, 2)
+        expected_graduation = generate_date(current_year + grad_years, rng=rng)
         
         # Learning style
-        learning_style = random.choices(learning_styles, weights=learning_style_weights)[0]
+        learning_style = LEARNING_STYLE_SAMPLER.draw(rng) if gen is None else next(learning_styles)
         
         # Course load preference
-        preferred_course_load = random.randint(2, 5)
-        preferred_pace = weighted_choice(course_loads)
+        preferred_course_load = rng.randint(2, 5)
+        preferred_pace = PREFERRED_PACE_SAMPLER.draw(rng) if gen is None else next(paces)
         
         # Work hours
         work_hours = 0
         if preferred_pace == "Part-time":
-            work_hours = random.randint(20, 40)
+            work_hours = rng.randint(20, 40)
         elif preferred_pace == "Standard":
-            work_hours = random.randint(0, 20)
+            work_hours = rng.randint(0, 20)
         
         # Financial aid status
-        financial_aid_status = weighted_choice(financial_statuses)
+        financial_aid_status = FINANCIAL_AID_SAMPLER.draw(rng) if gen is None else next(financial_aid)
         
         # Preferred instruction mode
-        preferred_instruction_mode = weighted_choice(instruction_prefs)
+        preferred_instruction_mode = (
+            INSTRUCTION_PREFERENCE_SAMPLER.draw(rng) if gen is None else next(instruction_modes)
+        )
         
         students.append({
             "id": campus_id,
-            "name": f"{first_name} {last_name}",
+            "name": name,
             "enrollmentDate": enrollment_date.strftime("%Y-%m-%d"),
             "expectedGraduation": expected_graduation.strftime("%Y-%m-%d"),
             "learningStyle": learning_style,
@@ -337,11 +888,17 @@ def generate_students():
     
     return students
 
-def generate_faculty():
+def generate_faculty(name_pool=None):
     """
     Generate faculty data.
+    Names come from their own RNG stream (or follow the students' unique
+    names), so the shared random stream is the same with either.
     """
     faculty = []
+    name_pool = name_pool or NamePool()
+    names = name_pool.names(
+        NUM_STUDENTS, NUM_FACULTY, NUM_STUDENTS + NUM_FACULTY, random.Random(f"{RANDOM_SEED}:faculty-names")
+    )
     
     titles = ["Dr.", "Professor", "Dr.", "Professor", "Dr.", "Assoc. Prof.", "Asst. Prof."]
     
@@ -357,10 +914,7 @@ def generate_faculty():
         faculty_id = f"F{str(i+1001).zfill(5)}"
         
         title = random.choice(titles)
-        # Use faker for name generation
-        first_name = fake.first_name()
-        last_name = fake.last_name()
-        name = f"{title} {first_name} {last_name}"
+        name = f"{title} {names[i]}"
         
         # Assign department
         department = random.choice(DEPARTMENTS)
@@ -385,12 +939,13 @@ def generate_faculty():
     
     return faculty, faculty_by_dept
 
-def generate_courses(faculty_by_dept):
+def generate_courses(faculty_by_dept, id_allocator=None):
     """
     Generate course data for CS and Biology departments.
     """
     courses = []
     dept_courses = defaultdict(list)
+    id_allocator = id_allocator or IdAllocator()
     
     # Generate courses for each department
     for dept in DEPARTMENTS:
@@ -399,19 +954,15 @@ def generate_courses(faculty_by_dept):
         
         for i in range(dept_course_count):
             # Pick a course level
-            level = weighted_choice(COURSE_LEVELS)
-            
-            # Generate course ID and name
-            course_id = generate_course_id(dept, level)
+            level = COURSE_LEVEL_SAMPLER.draw()
             
-            # Ensure course_id is unique
-            while any(c["id"] == course_id for c in courses):
-                course_id = f"{course_id}-{random.randint(1, 9)}"
+            # Generate a unique course ID and name
+            course_id = id_allocator.unique_id(generate_course_id(dept, level))
                 
             course_name = generate_course_name(dept, level)
             
             # Generate course difficulty (adjusted for CS and Biology)
-            avg_difficulty = weighted_choice(COURSE_DIFFICULTY_DISTRIBUTION)
+            avg_difficulty = COURSE_DIFFICULTY_SAMPLER.draw()
             
             # Generate time commitment (hours per week)
             avg_time_commitment = level // 100 + avg_difficulty + random.randint(1, 3)
@@ -608,7 +1159,8 @@ def generate_degrees(dept_courses):
             requirement_groups.append(core_requirement)
             
             # Remaining requirement groups (electives, concentrations, etc.)
-            remaining_courses = [c for c in available_courses if c not in core_courses]
+            core_course_ids = {c["id"] for c in core_courses}
+            remaining_courses = [c for c in available_courses if c["id"] not in core_course_ids]
             
             # Add some related department courses for electives
             related_dept = "Biology" if dept == "Computer Science" else "Computer Science"
@@ -649,16 +1201,104 @@ def generate_degrees(dept_courses):
     
     return degrees, requirement_groups
 
-def generate_prerequisites(courses):
+def name_tokens(text):
+    """
+    Split a course name or phrase into lowercase word tokens.
+    """
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+class CourseCatalogIndex:
+    """
+    Course lookups by (department, level) and by name token, built once per
+    catalog so generators never rescan the course list per course.
+    """
+    
+    def __init__(self, courses):
+        self.courses = courses
+        self.by_dept_level = defaultdict(list)
+        self.by_token = defaultdict(list)
+        self.levels = sorted({course["level"] for course in courses})
+        self._below = {}
+        
+        for position, course in enumerate(courses):
+            self.by_dept_level[(course["department"], course["level"])].append(course)
+            for token in dict.fromkeys(name_tokens(course["name"])):
+                self.by_token[token].append(position)
+    
+    def at_level(self, dept, level):
+        """
+        Return the courses of a department at exactly this level, in catalog order.
+        """
+        return self.by_dept_level.get((dept, level), [])
+    
+    def below_level(self, dept, level):
+        """
+        Return the courses of a department below this level, lowest level first.
+        """
+        key = (dept, level)
+        if key not in self._below:
+            self._below[key] = [
+                course for l in self.levels if l < level for course in self.at_level(dept, l)
+            ]
+        return self._below[key]
+    
+    def find_by_name(self, dept, phrase, min_level=None):
+        """
+        Return the courses of a department whose name contains phrase as whole
+        words (case-insensitive), in catalog order, optionally above min_level.
+        """
+        tokens = name_tokens(phrase)
+        if not tokens:
+            return []
+        
+        # Walk the rarest token's postings and confirm the phrase on each name
+        postings = min((self.by_token.get(token, []) for token in tokens), key=len)
+        pattern = re.compile(r"\b" + r"\W+".join(map(re.escape, tokens)) + r"\b", re.IGNORECASE)
+        matches = []
+        for position in postings:
+            course = self.courses[position]
+            if course["department"] != dept or (min_level is not None and course["level"] <= min_level):
+                continue
+            if pattern.search(course["name"]):
+                matches.append(course)
+        return matches
+
+def validate_prerequisite_dag(prerequisites):
+    """
+    Raise ValueError unless the prerequisite graph is a DAG (no self-loops, no cycles).
+    """
+    successors = defaultdict(list)
+    in_degree = defaultdict(int)
+    for p in prerequisites:
+        if p["source"] == p["target"]:
+            raise ValueError(f"Course {p['source']} is listed as its own prerequisite")
+        successors[p["source"]].append(p["target"])
+        in_degree[p["target"]] += 1
+        in_degree.setdefault(p["source"], 0)
+    
+    # Kahn's algorithm: every course is removed exactly when the graph is acyclic
+    ready = deque(course_id for course_id, degree in in_degree.items() if degree == 0)
+    removed = 0
+    while ready:
+        course_id = ready.popleft()
+        removed += 1
+        for target in successors[course_id]:
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                ready.append(target)
+    
+    if removed != len(in_degree):
+        cycle_courses = sorted(course_id for course_id, degree in in_degree.items() if degree > 0)
+        raise ValueError(f"Prerequisite cycle through {len(cycle_courses)} courses, e.g. {cycle_courses[:5]}")
+
+def generate_prerequisites(courses, catalog=None):
     """
     Generate prerequisite relationships between courses for CS and Biology.
+    Every prerequisite is at a lower level than the course it unlocks, so the
+    graph is acyclic by construction; validate_prerequisite_dag() checks it.
     """
     prerequisites = []
-    
-    # Group courses by department and level
-    by_dept_level = defaultdict(list)
-    for course in courses:
-        by_dept_level[(course["department"], course["level"])].append(course)
+    catalog = catalog or CourseCatalogIndex(courses)
     
     # Define core prerequisite sequences for each department
     core_sequences = {
@@ -693,19 +1333,15 @@ def generate_prerequisites(courses):
         for sequence in sequences:
             for i in range(len(sequence) - 1):
                 # Find the prerequisite course
-                prereq_name = sequence[i]
-                prereq_courses = [c for c in courses 
-                                if c["department"] == dept and 
-                                prereq_name.lower() in c["name"].lower()]
+                prereq_courses = catalog.find_by_name(dept, sequence[i])
+                if not prereq_courses:
+                    continue
+                prereq = prereq_courses[0]
                 
-                # Find the target course
-                target_name = sequence[i + 1]
-                target_courses = [c for c in courses 
-                                if c["department"] == dept and 
-                                target_name.lower() in c["name"].lower()]
+                # Find the target course, at a higher level than its prerequisite
+                target_courses = catalog.find_by_name(dept, sequence[i + 1], min_level=prereq["level"])
                 
-                if prereq_courses and target_courses:
-                    prereq = prereq_courses[0]
+                if target_courses:
                     target = target_courses[0]
                     
                     prerequisites.append({
@@ -734,17 +1370,12 @@ def generate_prerequisites(courses):
             num_prereqs = min(num_prereqs, MAX_PREREQS_PER_COURSE)
             
             # Select prerequisites (prefer lower-level courses from same department)
-            potential_prereqs = []
-            for l in range(100, level, 100):
-                if (dept, l) in by_dept_level:
-                    potential_prereqs.extend(by_dept_level[(dept, l)])
+            potential_prereqs = catalog.below_level(dept, level)
             
             # If we don't have enough potential prerequisites, look at other departments
             if len(potential_prereqs) < num_prereqs:
                 other_dept = "Biology" if dept == "Computer Science" else "Computer Science"
-                for l in range(100, level, 100):
-                    if (other_dept, l) in by_dept_level:
-                        potential_prereqs.extend(by_dept_level[(other_dept, l)])
+                potential_prereqs = potential_prereqs + catalog.below_level(other_dept, level)
             
             # If we still don't have enough, reduce number of prerequisites
             num_prereqs = min(num_prereqs, len(potential_prereqs))
@@ -766,13 +1397,15 @@ def generate_prerequisites(courses):
                     "minGrade": min_grade
                 })
     
+    validate_prerequisite_dag(prerequisites)
     return prerequisites
 
-def generate_leads_to_relationships(courses, prerequisites):
+def generate_leads_to_relationships(courses, prerequisites, catalog=None):
     """
     Generate "LEADS_TO" relationships between courses (common course sequences).
     """
     leads_to = []
+    catalog = catalog or CourseCatalogIndex(courses)
     
     # Build a graph of prerequisites to help determine potential leads_to relationships
     prereq_graph = defaultdict(list)
@@ -795,16 +1428,12 @@ def generate_leads_to_relationships(courses, prerequisites):
                 })
         
         # Some random LEADS_TO relationships for courses in same department at next level
-        dept = course["department"]
-        level = course["level"]
-        next_level = level + 100
-        
-        same_dept_next_level = [c for c in courses 
-                               if c["department"] == dept and c["level"] == next_level]
+        same_dept_next_level = catalog.at_level(course["department"], course["level"] + 100)
         
         # Randomly create some LEADS_TO that aren't prerequisites
-        for potential in same_dept_next_level:
-            if potential["id"] not in followers and random.random() < 0.3:
+        for i in bernoulli_indices(len(same_dept_next_level), LEADS_TO_SAME_DEPT_RATE):
+            potential = same_dept_next_level[i]
+            if potential["id"] not in followers:
                 leads_to.append({
                     "source": course["id"],
                     "target": potential["id"],
@@ -814,35 +1443,127 @@ def generate_leads_to_relationships(courses, prerequisites):
     
     return leads_to
 
+def tag_set_jaccard(a, b):
+    """
+    Jaccard similarity of two tag sets.
+    """
+    return len(a & b) / len(a | b)
+
+MINHASH_PRIME = (1 << 61) - 1
+
+def tag_set_minhash(tags, permutations):
+    """
+    MinHash signature of a tag set, one value per (a, b) hash permutation.
+    Tags are hashed with crc32 so signatures are stable across processes.
+    """
+    hashes = [zlib.crc32(tag.encode()) for tag in tags]
+    return tuple(min((a * h + b) % MINHASH_PRIME for h in hashes) for a, b in permutations)
+
+def similar_tag_set_candidates(tag_sets, common_tags):
+    """
+    Return {group: {other group: Jaccard}} for distinct tag sets that share
+    at least one informative tag (tags in common_tags are skipped).
+
+    Up to COURSE_SIMILARITY_EXACT_GROUPS tag sets are paired through a tag
+    inverted index. Larger catalogs pair tag sets whose informative tags
+    collide in a MinHash LSH band. Either way candidates are scored exactly.
+    """
+    candidates = defaultdict(dict)
+    
+    if len(tag_sets) <= COURSE_SIMILARITY_EXACT_GROUPS:
+        tag_index = defaultdict(list)
+        for group, tags in enumerate(tag_sets):
+            for tag in tags - common_tags:
+                tag_index[tag].append(group)
+        
+        for group, tags in enumerate(tag_sets):
+            others = {other for tag in tags - common_tags for other in tag_index[tag]}
+            others.discard(group)
+            for other in others:
+                candidates[group][other] = tag_set_jaccard(tags, tag_sets[other])
+        return candidates
+    
+    rows = COURSE_SIMILARITY_MINHASH_ROWS
+    perm_rng = random.Random("course-similarity-minhash")
+    permutations = [
+        (perm_rng.randrange(1, MINHASH_PRIME), perm_rng.randrange(MINHASH_PRIME))
+        for _ in range(COURSE_SIMILARITY_MINHASH_BANDS * rows)
+    ]
+    
+    # Signatures cover only informative tags, as the exact path's index does,
+    # so sharing the department and level tags never makes two sets collide
+    buckets = defaultdict(list)
+    for group, tags in enumerate(tag_sets):
+        informative = tags - common_tags
+        if informative:
+            signature = tag_set_minhash(informative, permutations)
+            for band in range(COURSE_SIMILARITY_MINHASH_BANDS):
+                buckets[(band, signature[band * rows:(band + 1) * rows])].append(group)
+    
+    for members in buckets.values():
+        for group in members:
+            for other in members:
+                if other != group and other not in candidates[group]:
+                    candidates[group][other] = tag_set_jaccard(tag_sets[group], tag_sets[other])
+    return candidates
+
 def generate_course_similarity(courses):
     """
     Generate similarity relationships between courses.
+    
+    Shared-tag similarity links each course to its COURSE_SIMILARITY_TOP_K
+    most similar courses by tag-set Jaccard. Courses with identical tag sets
+    are grouped, so candidates are found per distinct tag set rather than per
+    course pair, and tags carried by most of the catalog (department, level)
+    never make two courses candidates on their own.
     """
     similarity_content = []
     similarity_difficulty = []
     
-    # Group courses by department and tags
+    # Group courses by department, tag and distinct tag set
     by_dept = defaultdict(list)
-    by_tag = defaultdict(list)
+    tag_counts = defaultdict(int)
+    groups = {}
+    group_members = []
+    course_group = []
     
     for course in courses:
         by_dept[course["department"]].append(course)
-        for tag in course.get("tags", []):
-            by_tag[tag].append(course)
+        tags = frozenset(course.get("tags", []))
+        for tag in tags:
+            tag_counts[tag] += 1
+        if tags not in groups:
+            groups[tags] = len(group_members)
+            group_members.append([])
+        group_members[groups[tags]].append(course)
+        course_group.append(groups[tags])
     
-    # Generate content similarity within departments and shared tags
-    for course in courses:
-        # Find similar courses in same department
-        same_dept_courses = by_dept[course["department"]]
-        
-        # Find courses with shared tags
-        shared_tag_courses = []
-        for tag in course.get("tags", []):
-            shared_tag_courses.extend(by_tag[tag])
+    tag_sets = list(groups)
+    common_tags = {tag for tag, count in tag_counts.items() if count > COURSE_SIMILARITY_MAX_TAG_SHARE * len(courses)}
+    candidates = similar_tag_set_candidates(tag_sets, common_tags)
+    
+    # Most similar tag sets first; a course's own tag set always ranks first
+    ranked_groups = []
+    for group in range(len(tag_sets)):
+        ranked = sorted(candidates[group].items(), key=lambda item: (-item[1], item[0]))
+        ranked.insert(0, (group, 1.0))
         
+        # Keep only as many tag sets as it takes to fill the top-k
+        kept, size = [], 0
+        for other, jaccard in ranked:
+            if size > COURSE_SIMILARITY_TOP_K:
+                break
+            kept.append((other, jaccard))
+            size += len(group_members[other])
+        ranked_groups.append(kept)
+    
+    # Generate content similarity within departments and shared tags
+    for course, group in zip(courses, course_group):
         # Create content similarity to some courses in same department
-        for similar in same_dept_courses:
-            if similar["id"] != course["id"] and random.random() < 0.1:
+        same_dept_courses = by_dept[course["department"]]
+        for i in bernoulli_indices(len(same_dept_courses), SAME_DEPT_SIMILARITY_RATE):
+            similar = same_dept_courses[i]
+            if similar["id"] != course["id"]:
                 similarity_score = round(random.uniform(0.1, 0.8), 2)
                 similarity_content.append({
                     "source": course["id"],
@@ -850,19 +1571,20 @@ def generate_course_similarity(courses):
                     "similarity": similarity_score
                 })
         
-        # Create content similarity to courses with shared tags
-        # Create a list of unique course IDs to avoid duplicates
-        seen_course_ids = set()
-        for similar in shared_tag_courses:
-            if similar["id"] not in seen_course_ids:
-                seen_course_ids.add(similar["id"])
-            if similar["id"] != course["id"] and random.random() < 0.2:
-                # Higher similarity for more shared tags
-                course_tags = set(course.get("tags", []))
-                similar_tags = set(similar.get("tags", []))
-                shared_tags = len(course_tags.intersection(similar_tags))
+        # Create content similarity to the courses with the most similar tags
+        needed = COURSE_SIMILARITY_TOP_K
+        for other, jaccard in ranked_groups[group]:
+            if needed == 0:
+                break
+            members = group_members[other]
+            for similar in random.sample(members, min(needed + 1, len(members))):
+                if needed == 0:
+                    break
+                if similar["id"] == course["id"]:
+                    continue
                 
-                base_similarity = 0.2 + (shared_tags * 0.1)
+                # Higher similarity for more similar tag sets
+                base_similarity = 0.2 + (jaccard * 0.5)
                 similarity_score = round(min(0.9, base_similarity + random.uniform(0, 0.2)), 2)
                 
                 similarity_content.append({
@@ -870,9 +1592,10 @@ def generate_course_similarity(courses):
                     "target": similar["id"],
                     "similarity": similarity_score
                 })
+                needed -= 1
         
         # Create difficulty similarity to some random courses
-        for similar in random.sample(courses, min(10, len(courses))):
+        for similar in random.sample(courses, min(DIFFICULTY_SIMILARITY_SAMPLE, len(courses))):
             if similar["id"] != course["id"] and abs(course["avgDifficulty"] - similar["avgDifficulty"]) <= 1:
                 difficulty_diff = abs(course["avgDifficulty"] - similar["avgDifficulty"])
                 similarity_score = round(1.0 - (difficulty_diff / 5.0), 2)
@@ -889,18 +1612,26 @@ def generate_course_similarity(courses):
     
     return list(content_dict.values()), list(difficulty_dict.values())
 
-def generate_student_degree_relationships(students, degrees):
+def generate_student_degree_relationships(student_ids, degrees, block_size=STUDENTS_PER_RELATIONSHIP_BLOCK):
+    """
+    Generate relationships between students and degrees, yielding
+    ("student_degree", records) for block_size students at a time.
+    """
+    for start in range(0, len(student_ids), block_size):
+        yield "student_degree", student_degree_block(student_ids[start:start + block_size], degrees)
+
+def student_degree_block(student_ids, degrees):
     """
-    Generate relationships between students and degrees.
+    Degrees pursued by each of student_ids.
     """
     student_degree = []
     
-    for student in students:
+    for student_id in student_ids:
         # Each student pursues at least one degree
         primary_degree = random.choice(degrees)
         
         student_degree.append({
-            "studentId": student["id"],
+            "studentId": student_id,
             "degreeId": primary_degree["id"]
         })
         
@@ -909,7 +1640,7 @@ def generate_student_degree_relationships(students, degrees):
             second_degree = random.choice([d for d in degrees if d["id"] != primary_degree["id"]])
             
             student_degree.append({
-                "studentId": student["id"],
+                "studentId": student_id,
                 "degreeId": second_degree["id"]
             })
     
@@ -950,28 +1681,135 @@ def generate_teaching_relationships(faculty_by_dept, courses):
     
     return teaching
 
-def generate_student_course_history(students, courses, terms, prerequisites):
+def build_course_history_index(courses, prerequisites):
+    """
+    Precompute what course-history generation needs for every student:
+    course positions per term type and, for every course, the positions of
+    its prerequisites (at most MAX_PREREQS_PER_COURSE, so checking them
+    costs the same whatever the catalog size).
+    """
+    position = {course["id"]: i for i, course in enumerate(courses)}
+    
+    # A prerequisite outside the catalog can never be taken; give it a position no course has
+    prereq_positions = [[] for _ in courses]
+    for p in prerequisites:
+        target = position.get(p["target"])
+        if target is None:
+            continue
+        source = position.get(p["source"], -1)
+        if source not in prereq_positions[target]:
+            prereq_positions[target].append(source)
+    prereq_positions = [tuple(positions) for positions in prereq_positions]
+    
+    courses_by_term_type = defaultdict(list)
+    for i, course in enumerate(courses):
+        for term_type in dict.fromkeys(course["termAvailability"]):
+            courses_by_term_type[term_type].append(i)
+    
+    return {
+        "prereq_positions": prereq_positions,
+        "courses_by_term_type": courses_by_term_type
+    }
+
+def prerequisites_met(prereqs, taken):
+    """
+    Whether every prerequisite position in prereqs is in taken.
+    """
+    for position in prereqs:
+        if position not in taken:
+            return False
+    return True
+
+def sample_eligible_courses(candidates, prereq_positions, taken, count, rng=random):
+    """
+    Pick up to count distinct course positions, uniformly, from candidates that
+    are not taken and whose prerequisites are all taken.
+    Draws are rejection-sampled, so the cost does not grow with the catalog;
+    only when eligible courses are scarce are the candidates enumerated.
+    """
+    chosen = []
+    attempts = COURSE_SAMPLE_ATTEMPTS * count
+    while len(chosen) < count and attempts > 0 and candidates:
+        attempts -= 1
+        i = candidates[rng.randrange(len(candidates))]
+        if i not in taken and i not in chosen and prerequisites_met(prereq_positions[i], taken):
+            chosen.append(i)
+    
+    if len(chosen) < count:
+        eligible = [
+            i for i in candidates
+            if i not in taken and i not in chosen and prerequisites_met(prereq_positions[i], taken)
+        ]
+        chosen.extend(rng.sample(eligible, min(count - len(chosen), len(eligible))))
+    
+    return chosen
+
+def generate_completion_record(student, course, term_id, rng=random, grades=None):
+    """
+    Generate a student's COMPLETED record for a course: grade, perceived
+    difficulty (adjusted for learning style), time spent and instruction mode.
+    The grade is taken from the grades iterator when one is given.
+    """
+    # Generate grade
+    grade = GRADE_SAMPLER.draw(rng) if grades is None else next(grades)
+    
+    # Generate difficulty rating (influenced by learning style match)
+    student_style = student["learningStyle"]
+    base_difficulty = course["avgDifficulty"]
+    
+    # Adjust difficulty based on learning style match
+    style_match_modifier = 0
+    if student_style == "Visual" and "visualLearnerSuccess" in course:
+        style_match_modifier = (course["visualLearnerSuccess"] - 0.8) * 2
+    elif student_style == "Auditory" and "auditoryLearnerSuccess" in course:
+        style_match_modifier = (course["auditoryLearnerSuccess"] - 0.8) * 2
+    elif student_style == "Kinesthetic" and "kinestheticLearnerSuccess" in course:
+        style_match_modifier = (course["kinestheticLearnerSuccess"] - 0.8) * 2
+    elif student_style == "Reading-Writing" and "readingLearnerSuccess" in course:
+        style_match_modifier = (course["readingLearnerSuccess"] - 0.8) * 2
+    
+    perceived_difficulty = max(1, min(5, round(base_difficulty - style_match_modifier)))
+    
+    # Time spent (hours per week)
+    avg_time = course["avgTimeCommitment"]
+    time_spent = max(1, int(avg_time * rng.uniform(0.7, 1.3)))
+    
+    # Instruction mode
+    instruction_mode = rng.choice(course["instructionModes"])
+    
+    # Enjoyment (boolean)
+    enjoyment = grade in ["A", "A-", "B+", "B"] and perceived_difficulty <= 4
+    
+    return {
+        "studentId": student["id"],
+        "courseId": course["id"],
+        "term": term_id,
+        "grade": grade,
+        "difficulty": perceived_difficulty,
+        "timeSpent": time_spent,
+        "instructionMode": instruction_mode,
+        "enjoyment": enjoyment
+    }
+
+def generate_student_course_history(students, courses, terms, prerequisites, rng=random, registry=None, gen=None):
     """
     Generate student course history.
+    Pass the shared EntityRegistry to avoid rebuilding its indexes per shard.
+    With a NumPy Generator gen, grades are drawn from it in batches.
     """
     completed_courses = []
     enrolled_courses = []
+    grades = GRADE_SAMPLER.stream(gen) if gen is not None else None
     
-    # Build prerequisite graph
-    prereq_graph = defaultdict(list)
-    for p in prerequisites:
-        target_id = p["target"]
-        source_id = p["source"]
-        prereq_graph[target_id].append(source_id)
+    if registry is None:
+        registry = EntityRegistry(terms=terms, courses=courses, prerequisites=prerequisites)
+    prereq_positions = registry.history_index["prereq_positions"]
+    courses_by_term_type = registry.history_index["courses_by_term_type"]
+    term_end_dates = registry.term_end_dates
     
     # Current term
-    now = datetime.datetime.now()
-    current_term = get_term_by_date(now)
-    
-    # Find current term object
-    current_term_obj = next((t for t in terms if t["id"] == current_term), None)
-    if not current_term_obj:
-        current_term_obj = terms[-1]  # Use last term if current not found
+    now = reference_now()
+    current_term_obj = registry.current_term
     
     for student in students:
         # Determine how many courses this student has taken
@@ -989,38 +1827,24 @@ def generate_student_course_history(students, courses, terms, prerequisites):
         # Last X terms (chronological order)
         student_terms = [terms[i] for i in enrolled_term_indices]
         
-        # Track courses taken by this student
-        taken_courses = set()
+        # Track courses taken by this student, as positions
+        taken = set()
         
         # For each term
         for term_idx, term in enumerate(student_terms):
             # How many courses in this term?
-            num_courses = random.randint(1, student["preferredCourseLoad"])
-            
-            # Get potential courses for this term
-            term_type = term["type"]  # e.g., "Fall", "Spring"
-            potential_courses = [
-                c for c in courses 
-                if term_type in c["termAvailability"] and c["id"] not in taken_courses
-            ]
-            
-            # Filter out courses where prerequisites aren't met
-            valid_courses = []
-            for course in potential_courses:
-                prereqs = prereq_graph.get(course["id"], [])
-                if all(p in taken_courses for p in prereqs):
-                    valid_courses.append(course)
+            num_courses = rng.randint(1, student["preferredCourseLoad"])
             
-            # If no valid courses, use some without prerequisites
-            if not valid_courses:
-                valid_courses = [c for c in potential_courses if not prereq_graph.get(c["id"], [])]
+            # Courses offered this term type (e.g. "Fall") whose prerequisites are met
+            term_courses = sample_eligible_courses(
+                courses_by_term_type.get(term["type"], []), prereq_positions, taken, num_courses, rng
+            )
             
-            # Select courses for this term
-            term_courses = random.sample(valid_courses, min(num_courses, len(valid_courses)))
-            
-            for course in term_courses:
+            for position in term_courses:
+                course = courses[position]
+                
                 # Add to taken courses
-                taken_courses.add(course["id"])
+                taken.add(position)
                 
                 # If this is the current term, they're enrolled
                 if term["id"] == current_term_obj["id"]:
@@ -1032,157 +1856,330 @@ def generate_student_course_history(students, courses, terms, prerequisites):
                     continue
                 
                 # For past terms, generate completion record
-                if datetime.datetime.strptime(term["endDate"], "%Y-%m-%d") < now:
-                    # Generate grade
-                    grade = weighted_choice(GRADE_DISTRIBUTION)
-                    
-                    # Generate difficulty rating (influenced by learning style match)
-                    student_style = student["learningStyle"]
-                    base_difficulty = course["avgDifficulty"]
-                    
-                    # Adjust difficulty based on learning style match
-                    style_match_modifier = 0
-                    if student_style == "Visual" and "visualLearnerSuccess" in course:
-                        style_match_modifier = (course["visualLearnerSuccess"] - 0.8) * 2
-                    elif student_style == "Auditory" and "auditoryLearnerSuccess" in course:
-                        style_match_modifier = (course["auditoryLearnerSuccess"] - 0.8) * 2
-                    elif student_style == "Kinesthetic" and "kinestheticLearnerSuccess" in course:
-                        style_match_modifier = (course["kinestheticLearnerSuccess"] - 0.8) * 2
-                    elif student_style == "Reading-Writing" and "readingLearnerSuccess" in course:
-                        style_match_modifier = (course["readingLearnerSuccess"] - 0.8) * 2
-                    
-                    perceived_difficulty = max(1, min(5, round(base_difficulty - style_match_modifier)))
-                    
-                    # Time spent (hours per week)
-                    avg_time = course["avgTimeCommitment"]
-                    time_spent = max(1, int(avg_time * random.uniform(0.7, 1.3)))
-                    
-                    # Instruction mode
-                    instruction_mode = random.choice(course["instructionModes"])
-                    
-                    # Enjoyment (boolean)
-                    enjoyment = grade in ["A", "A-", "B+", "B"] and perceived_difficulty <= 4
-                    
-                    completed_courses.append({
-                        "studentId": student["id"],
-                        "courseId": course["id"],
-                        "term": term["id"],
-                        "grade": grade,
-                        "difficulty": perceived_difficulty,
-                        "timeSpent": time_spent,
-                        "instructionMode": instruction_mode,
-                        "enjoyment": enjoyment
-                    })
+                if term_end_dates[term["id"]] < now:
+                    completed_courses.append(generate_completion_record(student, course, term["id"], rng, grades))
     
     return completed_courses, enrolled_courses
 
-def generate_student_similarity(students, completed_courses):
+class StudentStore:
     """
-    Generate similarity relationships between students.
+    What the stages after the student shards need, kept once a shard has been
+    written out: the attributes student similarity compares and every
+    completed course as (student, course, grade tenths, difficulty). Values
+    sit in typed arrays (12 bytes per completion instead of a dict) and
+    category strings and course IDs are stored once, as small integer codes.
     """
-    learning_style_similarity = []
-    performance_similarity = []
     
+    def __init__(self):
+        self.ids = []
+        self.codes = {field: {} for field in ("learningStyle", "preferredPace", "preferredInstructionMode", "courseId")}
+        self.learning_styles = array("b")
+        self.paces = array("b")
+        self.course_loads = array("h")
+        self.instruction_modes = array("b")
+        self.completion_students = array("i")
+        self.completion_courses = array("i")
+        self.completion_grades = array("h")
+        self.completion_difficulties = array("h")
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def code(self, field, value):
+        codes = self.codes[field]
+        return codes.setdefault(value, len(codes))
+    
+    def add_shard(self, students, completed_courses):
+        student_index = {}
+        for student in students:
+            student_index[student["id"]] = len(self.ids)
+            self.ids.append(student["id"])
+            self.learning_styles.append(self.code("learningStyle", student["learningStyle"]))
+            self.paces.append(self.code("preferredPace", student["preferredPace"]))
+            self.course_loads.append(student["preferredCourseLoad"])
+            self.instruction_modes.append(self.code("preferredInstructionMode", student["preferredInstructionMode"]))
+        
+        for completion in completed_courses:
+            if completion["studentId"] not in student_index:
+                continue
+            self.completion_students.append(student_index[completion["studentId"]])
+            self.completion_courses.append(self.code("courseId", completion["courseId"]))
+            self.completion_grades.append(GRADE_POINTS_TENTHS.get(completion["grade"], 0))
+            self.completion_difficulties.append(completion["difficulty"])
+    
+    def course_ids(self):
+        """
+        Course IDs indexed by course code.
+        """
+        return list(self.codes["courseId"])
+
+def generate_student_similarity(store, block_size=STUDENTS_PER_RELATIONSHIP_BLOCK):
+    """
+    Generate similarity relationships between the students of a StudentStore,
+    yielding ("learning_style_similarity" or "performance_similarity", records)
+    for block_size source students at a time.
+    """
     # Group students by learning style
     by_style = defaultdict(list)
-    for student in students:
-        by_style[student["learningStyle"]].append(student)
+    for student, style in enumerate(store.learning_styles):
+        by_style[style].append(student)
     
-    # Group completed courses by student
-    student_courses = defaultdict(list)
-    for completed in completed_courses:
-        student_courses[completed["studentId"]].append(completed)
+    for start in range(0, len(store), block_size):
+        yield "learning_style_similarity", learning_style_similarity_block(
+            store, by_style, start, min(start + block_size, len(store))
+        )
+    
+    yield from generate_performance_similarity(store, block_size)
+
+def learning_style_similarity_block(store, by_style, start, stop):
+    """
+    SIMILAR_LEARNING_STYLE relationships of students start..stop-1.
+    """
+    learning_style_similarity = []
+    ids, paces = store.ids, store.paces
+    course_loads, instruction_modes = store.course_loads, store.instruction_modes
     
-    # For each student
-    for i, student in enumerate(students):
+    for student in range(start, stop):
+        style = store.learning_styles[student]
         # Similar learning style students
-        same_style_students = by_style[student["learningStyle"]]
+        same_style_students = by_style[style]
         
         # Pick a subset to create relationships with
-        num_similar = min(20, len(same_style_students))
+        num_similar = min(LEARNING_STYLE_PEERS, len(same_style_students))
         similar_students = random.sample(same_style_students, num_similar)
         
         for similar in similar_students:
-            if similar["id"] == student["id"]:
+            if similar == student:
                 continue
                 
             # Calculate similarity (higher for same pace, course load)
             base_similarity = 0.7  # Base similarity for same learning style
             
-            if similar["preferredPace"] == student["preferredPace"]:
+            if paces[similar] == paces[student]:
                 base_similarity += 0.1
                 
-            load_diff = abs(similar["preferredCourseLoad"] - student["preferredCourseLoad"])
+            load_diff = abs(course_loads[similar] - course_loads[student])
             base_similarity -= (load_diff * 0.02)
             
-            if similar["preferredInstructionMode"] == student["preferredInstructionMode"]:
+            if instruction_modes[similar] == instruction_modes[student]:
                 base_similarity += 0.1
                 
             similarity_score = round(max(0.1, min(1.0, base_similarity + random.uniform(-0.1, 0.1))), 2)
             
             learning_style_similarity.append({
-                "sourceId": student["id"],
-                "targetId": similar["id"],
+                "sourceId": ids[student],
+                "targetId": ids[similar],
                 "similarity": similarity_score
             })
+    
+    return learning_style_similarity
+
+def performance_similarity_score(pair_count, grade_diff_tenths, difficulty_diff):
+    """
+    Score two students from the summed absolute grade (in tenths) and difficulty
+    differences over their common courses: 70% grades, 30% perceived difficulty.
+    Works element-wise on NumPy arrays as well as on plain numbers.
+    """
+    grade_similarity = 1 - (grade_diff_tenths / pair_count) / 40.0
+    diff_similarity = 1 - (difficulty_diff / pair_count) / 5.0
+    if np is not None and isinstance(pair_count, np.ndarray):
+        return np.maximum(0, grade_similarity) * 0.7 + np.maximum(0, diff_similarity) * 0.3
+    return max(0, grade_similarity) * 0.7 + max(0, diff_similarity) * 0.3
+
+def generate_performance_similarity(store, block_size=STUDENTS_PER_RELATIONSHIP_BLOCK):
+    """
+    Link every student to their PERFORMANCE_SIMILARITY_TOP_K most similar
+    students among those sharing at least PERFORMANCE_SIMILARITY_MIN_COMMON
+    completed courses, yielding ("performance_similarity", records) for
+    block_size source students at a time. Candidates come from a course -> students inverted
+    index, so only students who actually share a course are ever compared.
+    Ties are broken by student order, so the result is deterministic.
+    """
+    # Courses are renumbered in ID order, so common course lists come out sorted
+    store_course_ids = store.course_ids()
+    course_ids = sorted(store_course_ids)
+    course_index = {course_id: i for i, course_id in enumerate(course_ids)}
+    course_of_code = [course_index[course_id] for course_id in store_course_ids]
+    
+    # Sparse student x course matrix as (student, course, grade tenths, difficulty) entries
+    if np is not None:
+        entries = np.column_stack([
+            np.asarray(store.completion_students, dtype=np.int64),
+            np.asarray(course_of_code, dtype=np.int64)[np.asarray(store.completion_courses, dtype=np.int64)],
+            np.asarray(store.completion_grades, dtype=np.int64),
+            np.asarray(store.completion_difficulties, dtype=np.int64)
+        ])
+        top_pairs = top_performance_pairs_vectorized(entries, len(store), course_ids)
+    else:
+        entries = zip(store.completion_students, (course_of_code[code] for code in store.completion_courses),
+                      store.completion_grades, store.completion_difficulties)
+        top_pairs = top_performance_pairs(entries, len(store), course_ids)
+    
+    # Pairs come out grouped by source student
+    performance_similarity = []
+    block_end = block_size
+    for source, target, score, common in top_pairs:
+        if source >= block_end:
+            yield "performance_similarity", performance_similarity
+            performance_similarity = []
+            block_end = (source // block_size + 1) * block_size
+        performance_similarity.append({
+            "sourceId": store.ids[source],
+            "targetId": store.ids[target],
+            "similarity": round(score, 2),
+            "courses": common
+        })
+    
+    if performance_similarity:
+        yield "performance_similarity", performance_similarity
+
+def top_performance_pairs(entries, num_students, course_ids):
+    """
+    Pure-Python top-k search over the inverted index (used without NumPy).
+    Yields (source, target, score, common course IDs) tuples in source order.
+    """
+    taken = [dict() for _ in range(num_students)]
+    students_by_course = defaultdict(list)
+    for student, course, grade, difficulty in entries:
+        taken[student][course] = (grade, difficulty)
+        students_by_course[course].append((student, grade, difficulty))
+    
+    for source in range(num_students):
+        # [common courses, grade difference, difficulty difference] per other student
+        stats = defaultdict(lambda: [0, 0, 0])
+        for course, (grade, difficulty) in taken[source].items():
+            for other, other_grade, other_difficulty in students_by_course[course]:
+                if other != source:
+                    pair = stats[other]
+                    pair[0] += 1
+                    pair[1] += abs(grade - other_grade)
+                    pair[2] += abs(difficulty - other_difficulty)
         
-        # Performance similarity (for students who took same courses)
-        student_taken = {c["courseId"]: c for c in student_courses.get(student["id"], [])}
+        candidates = sorted(
+            (-performance_similarity_score(count, grade_diff, difficulty_diff), other)
+            for other, (count, grade_diff, difficulty_diff) in stats.items()
+            if count >= PERFORMANCE_SIMILARITY_MIN_COMMON
+        )
+        for negative_score, other in candidates[:PERFORMANCE_SIMILARITY_TOP_K]:
+            common = sorted(set(taken[source]).intersection(taken[other]))
+            yield source, other, -negative_score, [course_ids[course] for course in common]
+
+def top_performance_pairs_vectorized(entries, num_students, course_ids):
+    """
+    NumPy top-k search. Each source student's courses are expanded into
+    candidate pairs through the inverted index, keeping only other > source
+    so every pair is scored once; pair statistics are aggregated with one
+    sort of packed (pair, grade diff, difficulty diff) integers. Sources are
+    processed in chunks of about PERFORMANCE_SIMILARITY_PAIR_CHUNK candidate pairs.
+    Yields (source, target, score, common course IDs) tuples in source order.
+    """
+    if len(entries) == 0:
+        return
+    
+    entries = np.asarray(entries, dtype=np.int64)
+    num_courses = len(course_ids)
+    
+    # Inverted index: course -> (student, grade, difficulty), grouped by course
+    order = np.lexsort((entries[:, 0], entries[:, 1]))
+    course_student, course_grade, course_difficulty = (entries[order, i] for i in (0, 2, 3))
+    course_counts = np.bincount(entries[:, 1], minlength=num_courses)
+    course_starts = np.cumsum(course_counts) - course_counts
+    
+    # Rows of the sparse student x course matrix, grouped by student
+    order = np.lexsort((entries[:, 1], entries[:, 0]))
+    student_course, student_grade, student_difficulty = (entries[order, i] for i in (1, 2, 3))
+    student_counts = np.bincount(entries[:, 0], minlength=num_students)
+    student_starts = np.cumsum(student_counts) - student_counts
+    student_pairs = np.cumsum(np.bincount(entries[:, 0], weights=course_counts[entries[:, 1]], minlength=num_students))
+    
+    # Grade and difficulty differences are packed below the pair key
+    difficulty_bits = int(np.abs(np.ptp(entries[:, 3]))).bit_length()
+    grade_bits = int(np.abs(np.ptp(entries[:, 2]))).bit_length()
+    diff_bits = grade_bits + difficulty_bits
+    
+    pair_chunks = []
+    first = 0
+    while first < num_students:
+        # Take whole students until the chunk holds about PAIR_CHUNK candidate pairs
+        done = student_pairs[first - 1] if first else 0
+        last = max(first + 1, int(np.searchsorted(student_pairs, done + PERFORMANCE_SIMILARITY_PAIR_CHUNK, "right")))
+        last = min(last, num_students)
+        lo, hi = student_starts[first], student_starts[last - 1] + student_counts[last - 1]
+        source_of_entry = np.repeat(np.arange(first, last), student_counts[first:last])
+        first = last
+        if lo == hi:
+            continue
         
-        # Only process every few students (for performance)
-        if i % 5 == 0:
-            for other_student in students:
-                if other_student["id"] == student["id"]:
-                    continue
-                    
-                other_taken = {c["courseId"]: c for c in student_courses.get(other_student["id"], [])}
-                
-                # Find courses both students have taken
-                common_courses = set(student_taken.keys()).intersection(set(other_taken.keys()))
-                
-                if len(common_courses) >= 3:  # Only if they have several courses in common
-                    # Calculate grade similarity
-                    grade_map = {
-                        "A": 4.0, "A-": 3.7,
-                        "B+": 3.3, "B": 3.0, "B-": 2.7,
-                        "C+": 2.3, "C": 2.0, "C-": 1.7,
-                        "D+": 1.3, "D": 1.0, "D-": 0.7,
-                        "F": 0.0, "W": 0.0
-                    }
-                    
-                    # Calculate grade difference
-                    grade_diffs = []
-                    for course_id in common_courses:
-                        student_grade = grade_map.get(student_taken[course_id]["grade"], 0)
-                        other_grade = grade_map.get(other_taken[course_id]["grade"], 0)
-                        
-                        grade_diffs.append(abs(student_grade - other_grade))
-                    
-                    avg_grade_diff = sum(grade_diffs) / len(grade_diffs)
-                    grade_similarity = max(0, 1 - (avg_grade_diff / 4.0))
-                    
-                    # Calculate difficulty perception similarity
-                    difficulty_diffs = []
-                    for course_id in common_courses:
-                        student_diff = student_taken[course_id]["difficulty"]
-                        other_diff = other_taken[course_id]["difficulty"]
-                        
-                        difficulty_diffs.append(abs(student_diff - other_diff))
-                    
-                    avg_diff_diff = sum(difficulty_diffs) / len(difficulty_diffs)
-                    diff_similarity = max(0, 1 - (avg_diff_diff / 5.0))
-                    
-                    # Overall similarity
-                    overall_similarity = round((grade_similarity * 0.7 + diff_similarity * 0.3), 2)
-                    
-                    performance_similarity.append({
-                        "sourceId": student["id"],
-                        "targetId": other_student["id"],
-                        "similarity": overall_similarity,
-                        "courses": list(common_courses)
-                    })
+        # Every (source course entry, other student in that course) pair with other > source
+        fanout = course_counts[student_course[lo:hi]]
+        left = np.repeat(np.arange(lo, hi), fanout)
+        right = np.repeat(course_starts[student_course[lo:hi]] - np.cumsum(fanout) + fanout, fanout) + np.arange(len(left))
+        source = source_of_entry[left - lo]
+        other = course_student[right]
+        keep = other > source
+        left, right, source, other = left[keep], right[keep], source[keep], other[keep]
+        if not len(left):
+            # Chunk holds only the highest-numbered students: their pairs were already scored
+            continue
+        
+        packed = (source * num_students + other) << diff_bits
+        packed |= np.abs(student_grade[left] - course_grade[right]) << difficulty_bits
+        packed |= np.abs(student_difficulty[left] - course_difficulty[right])
+        packed.sort()
+        
+        # One run of equal keys per (source, other) pair
+        keys = packed >> diff_bits
+        run_starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        pair_count = np.diff(np.append(run_starts, len(keys)))
+        grade_diff = np.add.reduceat((packed >> difficulty_bits) & ((1 << grade_bits) - 1), run_starts)
+        difficulty_diff = np.add.reduceat(packed & ((1 << difficulty_bits) - 1), run_starts)
+        
+        candidates = pair_count >= PERFORMANCE_SIMILARITY_MIN_COMMON
+        pair_source, pair_other = np.divmod(keys[run_starts[candidates]], num_students)
+        pair_chunks.append((pair_source, pair_other, pair_count[candidates],
+                            grade_diff[candidates], difficulty_diff[candidates]))
+    
+    if not pair_chunks:
+        return
+    
+    # Both directions of every candidate pair
+    pair_source, pair_other, pair_count, grade_diff, difficulty_diff = (
+        np.concatenate([chunk[i] for chunk in pair_chunks]) for i in range(5)
+    )
+    pair_source, pair_other = np.concatenate((pair_source, pair_other)), np.concatenate((pair_other, pair_source))
+    scores = np.tile(performance_similarity_score(pair_count.astype(np.float64), grade_diff, difficulty_diff), 2)
+    
+    # Best first within each source, ties by student order; keep the top k
+    order = np.lexsort((pair_other, -scores, pair_source))
+    ranked_source = pair_source[order]
+    chosen = order[np.arange(len(order)) - np.searchsorted(ranked_source, ranked_source, "left") < PERFORMANCE_SIMILARITY_TOP_K]
+    chosen_source, chosen_other, chosen_scores = pair_source[chosen], pair_other[chosen], scores[chosen]
+    
+    # Common courses: the source's courses (in course order) that the other student also has
+    entry_keys = np.repeat(np.arange(num_students), student_counts) * num_courses + student_course
+    pair_of_row = np.repeat(np.arange(len(chosen)), student_counts[chosen_source])
+    row_entry = np.repeat(student_starts[chosen_source] - np.cumsum(student_counts[chosen_source]) + student_counts[chosen_source], student_counts[chosen_source]) + np.arange(len(pair_of_row))
+    row_course = student_course[row_entry]
+    wanted = chosen_other[pair_of_row] * num_courses + row_course
+    found = np.minimum(np.searchsorted(entry_keys, wanted), len(entry_keys) - 1)
+    shared = entry_keys[found] == wanted
+    pair_of_row, row_course = pair_of_row[shared], row_course[shared]
     
-    return learning_style_similarity, performance_similarity
+    common_courses = np.array(course_ids)[row_course]
+    common_starts = np.searchsorted(pair_of_row, np.arange(len(chosen)), "left")
+    common_ends = np.searchsorted(pair_of_row, np.arange(len(chosen)), "right")
+    
+    # Converted to Python values a block at a time
+    block = STUDENTS_PER_RELATIONSHIP_BLOCK * PERFORMANCE_SIMILARITY_TOP_K
+    for first in range(0, len(chosen), block):
+        rows = slice(first, first + block)
+        courses_start = int(common_starts[first])
+        courses = common_courses[courses_start:int(common_ends[rows][-1])].tolist()
+        for source, other, score, start, end in zip(
+            chosen_source[rows].tolist(), chosen_other[rows].tolist(), chosen_scores[rows].tolist(),
+            (common_starts[rows] - courses_start).tolist(), (common_ends[rows] - courses_start).tolist()
+        ):
+            yield source, other, score, courses[start:end]
 
 def generate_textbooks(courses):
     """
@@ -1241,7 +2238,7 @@ def generate_textbooks(courses):
         level = course["level"]
         
         # Determine number of textbooks (1-3 per course)
-        num_textbooks = random.choices([1, 2, 3], weights=[0.5, 0.3, 0.2])[0]
+        num_textbooks = TEXTBOOKS_PER_COURSE_SAMPLER.draw()
         
         # Determine course category based on name and level
         course_category = None
@@ -1317,22 +2314,19 @@ def generate_textbooks(courses):
     
     return textbooks, course_textbooks
 
-def generate_textbook_interactions(students, courses, textbooks, course_textbooks, terms, completed_courses):
+def generate_textbook_interactions(students, courses, textbooks, course_textbooks, terms, completed_courses,
+                                   rng=random, registry=None):
     """Generate realistic textbook interaction patterns."""
     interactions = []
     page_views = []
     
     # Create lookup for completed courses by student
-    student_courses = defaultdict(list)
-    for comp in completed_courses:
-        student_courses[comp["studentId"]].append(comp)
+    student_courses = group_by(completed_courses, "studentId")
     
-    # Create lookup for course textbooks
-    course_text_lookup = defaultdict(list)
-    for ct in course_textbooks:
-        course_text_lookup[ct["courseId"]].append(
-            next(t for t in textbooks if t["id"] == ct["textbookId"])
-        )
+    # Textbook and term lookups (shards pass in a registry built once)
+    if registry is None:
+        registry = EntityRegistry(terms=terms, courses=courses, textbooks=textbooks,
+                                  course_textbooks=course_textbooks)
     
     for student in students:
         # Get all completed courses for this student
@@ -1340,49 +2334,48 @@ def generate_textbook_interactions(students, courses, textbooks, course_textbook
         
         for comp in student_completed:
             # Get textbooks for this course
-            course_texts = course_text_lookup[comp["courseId"]]
+            course_texts = registry.textbooks_by_course.get(comp["courseId"])
             if not course_texts:
                 continue
                 
             # Generate interaction patterns based on student's learning style
             if student["learningStyle"] == "Visual":
                 # Visual learners tend to read more frequently but for shorter durations
-                num_sessions = random.randint(15, 25)
-                avg_duration = random.randint(2, 5)
+                num_sessions = rng.randint(15, 25)
+                avg_duration = rng.randint(2, 5)
             elif student["learningStyle"] == "Auditory":
                 # Auditory learners might read less frequently but for longer durations
-                num_sessions = random.randint(8, 15)
-                avg_duration = random.randint(5, 10)
+                num_sessions = rng.randint(8, 15)
+                avg_duration = rng.randint(5, 10)
             else:  # Reading-Writing or Kinesthetic
                 # Reading/writing learners have consistent reading patterns
-                num_sessions = random.randint(12, 20)
-                avg_duration = random.randint(3, 7)
+                num_sessions = rng.randint(12, 20)
+                avg_duration = rng.randint(3, 7)
             
             # Get the term dates for this completed course
-            term = next(t for t in terms if t["id"] == comp["term"])
-            term_start = datetime.datetime.strptime(term["startDate"], "%Y-%m-%d")
-            term_end = datetime.datetime.strptime(term["endDate"], "%Y-%m-%d")
+            term_start = registry.term_start_dates[comp["term"]]
+            term_end = registry.term_end_dates[comp["term"]]
             
             # Generate page views for each session
             for session in range(num_sessions):
                 # Randomly select a textbook for this session
-                textbook = random.choice(course_texts)
-                num_pages = random.randint(5, 15)
+                textbook = rng.choice(course_texts)
+                num_pages = rng.randint(5, 15)
                 
                 # Generate timestamps for this session
                 session_start = term_start + datetime.timedelta(
-                    days=random.randint(0, (term_end - term_start).days),
-                    hours=random.randint(8, 22)  # During reasonable hours
+                    days=rng.randint(0, (term_end - term_start).days),
+                    hours=rng.randint(8, 22)  # During reasonable hours
                 )
                 
                 for page in range(num_pages):
                     # Add some randomness to page view duration (in minutes)
-                    duration = random.randint(avg_duration - 1, avg_duration + 1)
+                    duration = rng.randint(avg_duration - 1, avg_duration + 1)
                     
                     # Generate timestamp for this page view
                     timestamp = session_start + datetime.timedelta(
                         minutes=page * duration,
-                        seconds=random.randint(0, 59)
+                        seconds=rng.randint(0, 59)
                     )
                     
                     # Create page view record
@@ -1390,7 +2383,7 @@ def generate_textbook_interactions(students, courses, textbooks, course_textbook
                         "studentId": student["id"],
                         "textbookId": textbook["id"],
                         "courseId": comp["courseId"],
-                        "pageNumber": random.randint(1, textbook["pages"]),
+                        "pageNumber": rng.randint(1, textbook["pages"]),
                         "timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
                         "duration": duration
                     })
@@ -1400,27 +2393,755 @@ def generate_textbook_interactions(students, courses, textbooks, course_textbook
                         "studentId": student["id"],
                         "textbookId": textbook["id"],
                         "courseId": comp["courseId"],
-                        "interactionType": random.choice(["read", "highlight", "note"]),
+                        "interactionType": rng.choice(["read", "highlight", "note"]),
                         "timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
                         "duration": duration
                     })
     
     return interactions, page_views
 
+# Session and duration ranges (inclusive) per learning style; anything else
+# (Reading-Writing, Kinesthetic) uses the default
+INTERACTION_SESSIONS = {"Visual": (15, 25), "Auditory": (8, 15)}
+INTERACTION_DURATIONS = {"Visual": (2, 5), "Auditory": (5, 10)}
+DEFAULT_INTERACTION_SESSIONS = (12, 20)
+DEFAULT_INTERACTION_DURATION = (3, 7)
+INTERACTION_TYPES = ["read", "highlight", "note"]
+
+class ColumnarBatch:
+    """
+    A batch of records held as equal-length NumPy columns instead of dicts.
+    Columns listed in dictionaries hold integer codes into that array of values
+    (e.g. studentId codes into the shard's student IDs). A column listed in
+    offsets holds the items of list values, row i being items[offsets[i]:offsets[i + 1]].
+    """
+    
+    def __init__(self, columns, dictionaries=None, offsets=None):
+        self.columns = columns
+        self.dictionaries = dictionaries or {}
+        self.offsets = offsets or {}
+        first = next(iter(columns), None)
+        if first is None:
+            self.length = 0
+        elif first in self.offsets:
+            self.length = len(self.offsets[first]) - 1
+        else:
+            self.length = len(columns[first])
+    
+    def __len__(self):
+        return self.length
+    
+    def values(self, name):
+        """
+        Return a column as a list of plain Python values (dates as 'YYYY-MM-DD',
+        timestamps as 'YYYY-MM-DD HH:MM:SS', list columns as lists).
+        """
+        column = self.columns[name]
+        if name in self.offsets:
+            items = (self.dictionaries[name][column] if name in self.dictionaries else column).tolist()
+            bounds = self.offsets[name].tolist()
+            return [items[start:stop] for start, stop in zip(bounds, bounds[1:])]
+        if name in self.dictionaries:
+            return self.dictionaries[name][column].tolist()
+        if np.issubdtype(column.dtype, np.datetime64):
+            return [value.replace("T", " ") for value in np.datetime_as_string(column).tolist()]
+        return column.tolist()
+    
+    def slice(self, start, stop):
+        """
+        Return rows [start, stop) as a batch sharing this batch's dictionaries.
+        """
+        columns, offsets = {}, {}
+        for name, column in self.columns.items():
+            if name in self.offsets:
+                bounds = self.offsets[name][start:stop + 1]
+                columns[name] = column[bounds[0]:bounds[-1]]
+                offsets[name] = bounds - bounds[0]
+            else:
+                columns[name] = column[start:stop]
+        return ColumnarBatch(columns, self.dictionaries, offsets)
+    
+    def to_records(self):
+        """
+        Return the batch as a list of record dicts, as the Python engines produce.
+        """
+        names = list(self.columns)
+        return [dict(zip(names, row)) for row in zip(*(self.values(name) for name in names))]
+    
+    def text_matrix(self, name):
+        """
+        Render a column as a (rows, width) uint8 matrix of ASCII text, NUL-padded.
+        Returns None if a value is not plain ASCII or would need CSV quoting.
+        """
+        column = self.columns[name]
+        if name in self.dictionaries:
+            table = csv_text_table(self.dictionaries[name].tolist())
+            return None if table is None else table[column]
+        
+        if column.dtype == np.dtype("datetime64[s]"):
+            days = column.astype("datetime64[D]")
+            first_day = days.min()
+            day_table = csv_text_table(np.arange(first_day, days.max() + 1).tolist())
+            seconds = (column - days).astype(np.int64)
+            return np.concatenate([day_table[(days - first_day).astype(np.int64)], time_of_day_table()[seconds]], axis=1)
+        
+        if np.issubdtype(column.dtype, np.integer) and column.max() - column.min() <= len(column):
+            low = column.min()
+            return csv_text_table(range(low, column.max() + 1))[column - low]
+        
+        uniques, inverse = np.unique(column, return_inverse=True)
+        table = csv_text_table(uniques.tolist())
+        return None if table is None else table[inverse]
+    
+    def csv_text(self, fields, constants=None):
+        """
+        Render the batch as CSV text in the csv module's default dialect.
+        Fields in constants are written with a fixed value on every row.
+        Returns None if any value needs quoting, so the caller can use csv.writer.
+        """
+        constants = constants or {}
+        parts = []
+        for i, field in enumerate(fields):
+            if field in constants:
+                matrix = csv_text_table([constants[field]])[np.zeros(self.length, dtype=np.int64)]
+            else:
+                matrix = self.text_matrix(field)
+            if matrix is None:
+                return None
+            
+            parts.append(matrix)
+            separator = "," if i < len(fields) - 1 else "\r\n"
+            parts.append(np.tile(np.frombuffer(separator.encode(), dtype=np.uint8), (self.length, 1)))
+        
+        text = np.concatenate(parts, axis=1).ravel()
+        return text[text != 0].tobytes().decode("ascii")
+
+def csv_text_table(values):
+    """
+    Render values as a (len(values), width) NUL-padded ASCII matrix for CSV
+    output, or None if any value is not ASCII or contains CSV special characters.
+    """
+    encoded = []
+    for value in values:
+        text = str(value)
+        if not text.isascii() or any(c in text for c in ',"\r\n\0'):
+            return None
+        encoded.append(text.encode("ascii"))
+    
+    width = max(1, max((len(e) for e in encoded), default=1))
+    return np.frombuffer(b"".join(e.ljust(width, b"\0") for e in encoded), dtype=np.uint8).reshape(len(encoded), width)
+
+_time_of_day_table = None
+
+def time_of_day_table():
+    """
+    Return the text matrix of " HH:MM:SS" for every second of a day (built once).
+    """
+    global _time_of_day_table
+    
+    if _time_of_day_table is None:
+        _time_of_day_table = csv_text_table(
+            f" {s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(24 * 60 * 60)
+        )
+    return _time_of_day_table
+
+def generate_textbook_interactions_vectorized(students, textbooks, terms, completed_courses,
+                                              registry, rng=random):
+    """
+    Vectorized generate_textbook_interactions: draws session counts, pages,
+    durations and timestamps for a whole shard as NumPy arrays and returns
+    (interactions, page_views) as ColumnarBatch objects.
+    """
+    gen = np.random.default_rng(rng.getrandbits(128))
+    
+    term_index = {term["id"]: i for i, term in enumerate(terms)}
+    term_starts = np.array([term["startDate"] for term in terms], dtype="datetime64[D]")
+    term_days = (np.array([term["endDate"] for term in terms], dtype="datetime64[D]") - term_starts).astype(np.int64)
+    term_starts = term_starts.astype("datetime64[s]")
+    
+    student_index = {student["id"]: i for i, student in enumerate(students)}
+    
+    # One row per completed course that has textbooks; courses and textbooks
+    # get codes in order of first use
+    comp_students, comp_courses, comp_terms = [], [], []
+    session_ranges, duration_ranges = [], []
+    course_ids, course_codes = [], {}
+    course_text_offsets, course_text_counts, course_texts = [], [], []
+    textbook_ids, textbook_pages, textbook_codes = [], [], {}
+    for comp in completed_courses:
+        course_textbooks = registry.textbooks_by_course.get(comp["courseId"])
+        if comp["studentId"] not in student_index or not course_textbooks:
+            continue
+        
+        course_code = course_codes.get(comp["courseId"])
+        if course_code is None:
+            course_code = course_codes[comp["courseId"]] = len(course_ids)
+            course_ids.append(comp["courseId"])
+            course_text_offsets.append(len(course_texts))
+            course_text_counts.append(len(course_textbooks))
+            for textbook in course_textbooks:
+                if textbook["id"] not in textbook_codes:
+                    textbook_codes[textbook["id"]] = len(textbook_ids)
+                    textbook_ids.append(textbook["id"])
+                    textbook_pages.append(textbook["pages"])
+                course_texts.append(textbook_codes[textbook["id"]])
+        
+        style = students[student_index[comp["studentId"]]]["learningStyle"]
+        comp_students.append(student_index[comp["studentId"]])
+        comp_courses.append(course_code)
+        comp_terms.append(term_index[comp["term"]])
+        session_ranges.append(INTERACTION_SESSIONS.get(style, DEFAULT_INTERACTION_SESSIONS))
+        duration_ranges.append(INTERACTION_DURATIONS.get(style, DEFAULT_INTERACTION_DURATION))
+    
+    if not comp_students:
+        return [], []
+    
+    comp_students = np.array(comp_students)
+    comp_courses = np.array(comp_courses)
+    comp_terms = np.array(comp_terms)
+    session_ranges = np.array(session_ranges)
+    duration_ranges = np.array(duration_ranges)
+    course_text_offsets = np.array(course_text_offsets)
+    course_text_counts = np.array(course_text_counts)
+    course_texts = np.array(course_texts)
+    textbook_pages = np.array(textbook_pages)
+    
+    # Per completed course: number of reading sessions and average page duration
+    num_sessions = gen.integers(session_ranges[:, 0], session_ranges[:, 1] + 1)
+    avg_durations = gen.integers(duration_ranges[:, 0], duration_ranges[:, 1] + 1)
+    
+    # Per session: textbook, page count and a start time during reasonable hours
+    session_comp = np.repeat(np.arange(len(comp_students)), num_sessions)
+    session_course = comp_courses[session_comp]
+    session_term = comp_terms[session_comp]
+    session_textbook = course_texts[
+        course_text_offsets[session_course] + gen.integers(0, course_text_counts[session_course])
+    ]
+    num_pages = gen.integers(5, 16, size=len(session_comp))
+    session_start = (
+        term_starts[session_term]
+        + gen.integers(0, term_days[session_term] + 1) * np.timedelta64(1, "D")
+        + gen.integers(8, 23, size=len(session_comp)) * np.timedelta64(1, "h")
+    )
+    
+    # Per page view: duration around the average, timestamp within the session
+    view_session = np.repeat(np.arange(len(session_comp)), num_pages)
+    page_in_session = np.arange(len(view_session)) - (np.cumsum(num_pages) - num_pages)[view_session]
+    view_comp = session_comp[view_session]
+    view_textbook = session_textbook[view_session]
+    
+    avg_duration = avg_durations[view_comp]
+    duration = gen.integers(avg_duration - 1, avg_duration + 2)
+    timestamp = (
+        session_start[view_session]
+        + (page_in_session * duration) * np.timedelta64(1, "m")
+        + gen.integers(0, 60, size=len(view_session)) * np.timedelta64(1, "s")
+    )
+    
+    dictionaries = {
+        "studentId": np.array([student["id"] for student in students]),
+        "textbookId": np.array(textbook_ids),
+        "courseId": np.array(course_ids),
+        "interactionType": np.array(INTERACTION_TYPES)
+    }
+    shared_columns = {
+        "studentId": comp_students[view_comp],
+        "textbookId": view_textbook,
+        "courseId": comp_courses[view_comp]
+    }
+    
+    page_views = ColumnarBatch({
+        **shared_columns,
+        "pageNumber": gen.integers(1, textbook_pages[view_textbook] + 1),
+        "timestamp": timestamp,
+        "duration": duration
+    }, dictionaries)
+    interactions = ColumnarBatch({
+        **shared_columns,
+        "interactionType": gen.integers(0, len(INTERACTION_TYPES), size=len(view_session)),
+        "timestamp": timestamp,
+        "duration": duration
+    }, dictionaries)
+    
+    return interactions, page_views
+
 # =============================================================================
-#                           EXPORT FUNCTIONS
+#                           STAGE CHECKPOINTS
 # =============================================================================
 
-def export_to_cypher(data, output_dir):
+CHECKPOINT_VERSION = 3  # Bump when a stage's output changes for the same configuration
+CHECKPOINT_REPLAY_ROWS = 50_000  # Records per block when a streamed stage is loaded
+
+# Configuration each stage's output depends on, besides the seed, the
+# reference date and the stages it reads from
+STAGE_CONFIG = {
+    "terms": ["TERMS_TO_GENERATE", "HISTORY_YEARS"],
+    "faculty": ["NUM_FACULTY", "NAME_POOL_SIZE", "UNIQUE_NAMES"],
+    "courses": ["NUM_COURSES"],
+    "textbooks": [],
+    "degrees": [],
+    "prerequisites": ["MAX_PREREQS_PER_COURSE"],
+    "leads_to": ["LEADS_TO_SAME_DEPT_RATE"],
+    "course_similarity": [
+        "SAME_DEPT_SIMILARITY_RATE", "DIFFICULTY_SIMILARITY_SAMPLE", "COURSE_SIMILARITY_TOP_K",
+        "COURSE_SIMILARITY_MAX_TAG_SHARE", "COURSE_SIMILARITY_EXACT_GROUPS",
+        "COURSE_SIMILARITY_MINHASH_BANDS", "COURSE_SIMILARITY_MINHASH_ROWS"
+    ],
+    "teaching": [],
+    "student_shard": [
+        "NUM_STUDENTS", "NUM_FACULTY", "STUDENTS_PER_SHARD", "INTERACTION_ENGINE", "COURSE_SAMPLE_ATTEMPTS",
+        "NAME_POOL_SIZE", "UNIQUE_NAMES"
+    ],
+    "student_degree": [],
+    "student_similarity": [
+        "LEARNING_STYLE_PEERS", "PERFORMANCE_SIMILARITY_TOP_K", "PERFORMANCE_SIMILARITY_MIN_COMMON"
+    ]
+}
+
+def encode_column(prefix, values, arrays):
     """
-    Export data to Cypher script files.
+    Store one record field as arrays named prefix/...; returns its codec.
+    Booleans, ints and floats are stored as typed arrays; strings (and
+    anything else, as JSON) are dictionary-encoded as unique values + codes.
+    """
+    kinds = {type(value) for value in values}
+    if kinds == {bool}:
+        arrays[prefix] = np.array(values, dtype=np.bool_)
+        return "bool"
+    if kinds == {int}:
+        arrays[prefix] = np.array(values, dtype=np.int64)
+        return "int"
+    if kinds == {float}:
+        arrays[prefix] = np.array(values, dtype=np.float64)
+        return "float"
+
+    codec = "str" if kinds == {str} else "json"
+    strings = values if codec == "str" else [json.dumps(value) for value in values]
+    uniques, codes = np.unique(np.array(strings, dtype=str), return_inverse=True)
+    arrays[f"{prefix}/values"] = uniques
+    arrays[f"{prefix}/codes"] = codes.astype(np.int32)
+    return codec
+
+def decode_column(prefix, codec, arrays):
+    """
+    Inverse of encode_column: return the field's values as a list.
+    """
+    if codec in ("bool", "int", "float"):
+        return arrays[prefix].tolist()
+
+    uniques = arrays[f"{prefix}/values"].tolist()
+    codes = arrays[f"{prefix}/codes"].tolist()
+    if codec == "str":
+        return [uniques[code] for code in codes]
+    # Parsed per row so records never share a list or dict
+    return [json.loads(uniques[code]) for code in codes]
+
+def save_checkpoint(path, outputs, rng_states=None):
+    """
+    Write a stage's outputs (lists of records or ColumnarBatches) to one
+    compressed .npz file, atomically.
+    """
+    arrays = {}
+    meta = {"outputs": {}, "rngStates": rng_states}
+    for name, output in outputs.items():
+        if isinstance(output, ColumnarBatch):
+            for column, values in output.columns.items():
+                arrays[f"{name}/columns/{column}"] = values
+            for column, values in output.dictionaries.items():
+                arrays[f"{name}/dictionaries/{column}"] = values
+            for column, values in output.offsets.items():
+                arrays[f"{name}/offsets/{column}"] = values
+            meta["outputs"][name] = {
+                "kind": "batch",
+                "columns": list(output.columns),
+                "dictionaries": list(output.dictionaries),
+                "offsets": list(output.offsets)
+            }
+            continue
+
+        fields = list(output[0]) if output else []
+        if any(list(record) != fields for record in output):
+            # Records with differing fields are kept whole
+            meta["outputs"][name] = {
+                "kind": "records", "length": len(output),
+                "fields": {"": encode_column(f"{name}/records", output, arrays)}
+            }
+            continue
+        meta["outputs"][name] = {
+            "kind": "records", "length": len(output),
+            "fields": {
+                field: encode_column(f"{name}/fields/{field}", [record[field] for record in output], arrays)
+                for field in fields
+            }
+        }
+    arrays["__meta__"] = np.array(json.dumps(meta))
+
+    temp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(temp_path, **arrays)
+    os.replace(temp_path, path)
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint written by save_checkpoint; returns (outputs, rng_states).
+    """
+    with np.load(path, allow_pickle=False) as data:
+        arrays = dict(data)
+    meta = json.loads(str(arrays["__meta__"]))
+
+    outputs = {}
+    for name, spec in meta["outputs"].items():
+        if spec["kind"] == "batch":
+            outputs[name] = ColumnarBatch(
+                {column: arrays[f"{name}/columns/{column}"] for column in spec["columns"]},
+                {column: arrays[f"{name}/dictionaries/{column}"] for column in spec["dictionaries"]},
+                {column: arrays[f"{name}/offsets/{column}"] for column in spec.get("offsets", [])}
+            )
+        elif "" in spec["fields"]:
+            outputs[name] = decode_column(f"{name}/records", spec["fields"][""], arrays)
+        else:
+            columns = [
+                (field, decode_column(f"{name}/fields/{field}", codec, arrays))
+                for field, codec in spec["fields"].items()
+            ]
+            outputs[name] = [
+                {field: values[i] for field, values in columns} for i in range(spec["length"])
+            ]
+    return outputs, meta["rngStates"]
+
+class ColumnarBatchBuilder:
+    """
+    Encode blocks of records of one COLUMNAR_TABLES table as they are
+    generated, and return them all as one ColumnarBatch, so a streamed stage
+    can be checkpointed without keeping its records.
+    """
+
+    def __init__(self, key):
+        self.kinds = COLUMNAR_TABLES[key]
+        self.dictionaries = {name: StringDictionary() for name in self.kinds}
+        self.blocks = defaultdict(list)
+        self.lengths = defaultdict(list)
+
+    def append(self, records):
+        for name, values in encode_columnar_batch(records, self.kinds, self.dictionaries).items():
+            if self.kinds[name] == "string_list":
+                lengths, values = values
+                self.lengths[name].append(lengths)
+            self.blocks[name].append(values)
+
+    def build(self):
+        columns, dictionaries, offsets = {}, {}, {}
+        for name, kind in self.kinds.items():
+            columns[name] = np.concatenate(self.blocks[name])
+            if kind in ("string", "string_list"):
+                dictionaries[name] = np.array(self.dictionaries[name].values(), dtype=str)
+            if kind == "string_list":
+                offsets[name] = np.concatenate(([0], np.cumsum(np.concatenate(self.lengths[name]))))
+        return ColumnarBatch(columns, dictionaries, offsets)
+
+def global_rng_states():
+    """
+    Return the states of the global random module and Faker as JSON-able lists.
+    """
+    return [list(map(lambda part: list(part) if isinstance(part, tuple) else part, rng.getstate()))
+            for rng in (random, fake.random)]
+
+def restore_global_rng_states(states):
+    """
+    Inverse of global_rng_states.
+    """
+    for rng, (version, internal_state, gauss_next) in zip((random, fake.random), states):
+        rng.setstate((version, tuple(internal_state), gauss_next))
+
+class CheckpointStore:
+    """
+    Content-addressed checkpoints of stage outputs, one compressed .npz per
+    stage run. A stage's key hashes the checkpoint version, seed, reference
+    date, its STAGE_CONFIG values and the keys of the stages it reads, so a
+    change recomputes exactly the stages downstream of it.
+
+    Stages drawing from the global random module and Faker also store the
+    generator states they leave behind, so the next stage continues the same
+    random stream whether its predecessor was generated or loaded.
+    With directory=None every stage is generated and nothing is stored.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.keys = {}
+        self.loaded = []
+        self.generated = []
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def stage_key(self, stage, inputs=(), params=None):
+        description = {
+            "version": CHECKPOINT_VERSION,
+            "stage": stage,
+            "seed": RANDOM_SEED,
+            "referenceDate": reference_now().strftime("%Y-%m-%d"),
+            "config": {name: globals()[name] for name in STAGE_CONFIG[stage]},
+            "params": params or {},
+            "inputs": [self.keys[name] for name in inputs]
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def register(self, name, stage, inputs=(), params=None):
+        """
+        Record the key of a stage run elsewhere (e.g. in shard workers) for later inputs.
+        """
+        self.keys[name] = self.stage_key(stage, inputs, params)
+
+    def run(self, stage, generate, inputs=(), params=None, name=None, global_rng=True):
+        """
+        Return generate()'s outputs, a dict of record lists or ColumnarBatches,
+        loading them instead when this stage's checkpoint exists.
+        The key is registered under name (default: stage) for later inputs.
+        """
+        name = name or stage
+        key = self.stage_key(stage, inputs, params)
+        self.keys[name] = key
+        if self.directory is None:
+            return generate()
+
+        path = os.path.join(self.directory, f"{stage}-{key[:20]}.npz")
+        if os.path.exists(path):
+            with profile_stage("load_checkpoint"):
+                outputs, rng_states = load_checkpoint(path)
+            if rng_states:
+                restore_global_rng_states(rng_states)
+            self.loaded.append(name)
+            return outputs
+
+        outputs = generate()
+        with profile_stage("save_checkpoint"):
+            save_checkpoint(path, outputs, global_rng_states() if global_rng else None)
+        self.generated.append(name)
+        return outputs
+
+    def stream(self, stage, generate, inputs=(), params=None, name=None, global_rng=True):
+        """
+        Like run(), for stages too large to keep as records: generate() yields
+        (output name, records) blocks, which are passed straight on. The
+        checkpoint keeps the outputs encoded as ColumnarBatches, and a loaded
+        checkpoint is replayed CHECKPOINT_REPLAY_ROWS records at a time.
+        """
+        name = name or stage
+        key = self.stage_key(stage, inputs, params)
+        self.keys[name] = key
+        if self.directory is None:
+            return generate()
+        return self.stream_checkpoint(os.path.join(self.directory, f"{stage}-{key[:20]}.npz"),
+                                      name, generate, global_rng)
+
+    def stream_checkpoint(self, path, name, generate, global_rng):
+        if os.path.exists(path):
+            with profile_stage("load_checkpoint"):
+                outputs, rng_states = load_checkpoint(path)
+            if rng_states:
+                restore_global_rng_states(rng_states)
+            self.loaded.append(name)
+            for output_name, output in outputs.items():
+                for start in range(0, len(output), CHECKPOINT_REPLAY_ROWS):
+                    stop = start + CHECKPOINT_REPLAY_ROWS
+                    if isinstance(output, ColumnarBatch):
+                        yield output_name, output.slice(start, stop).to_records()
+                    else:
+                        yield output_name, output[start:stop]
+            return
+
+        builders = {}
+        for output_name, records in generate():
+            if output_name not in builders:
+                builders[output_name] = ColumnarBatchBuilder(output_name)
+            builders[output_name].append(records)
+            yield output_name, records
+        with profile_stage("save_checkpoint"):
+            outputs = {output_name: builder.build() for output_name, builder in builders.items()}
+            save_checkpoint(path, outputs, global_rng_states() if global_rng else None)
+        self.generated.append(name)
+
+# =============================================================================
+#                           SHARDED STUDENT GENERATION
+# =============================================================================
+
+# Per-process state for shard workers, set by init_shard_worker()
+_shard_context = None
+
+# Catalog stages every shard reads
+SHARD_CHECKPOINT_INPUTS = ["terms", "courses", "textbooks", "prerequisites"]
+
+def student_shard_specs():
+    """
+    Split the student population into (shard_index, start, count) shards.
+    """
+    return [
+        (shard_index, start, min(STUDENTS_PER_SHARD, NUM_STUDENTS - start))
+        for shard_index, start in enumerate(range(0, NUM_STUDENTS, STUDENTS_PER_SHARD))
+    ]
+
+def generate_student_shard(context, shard_index, start, count):
+    """
+    Generate students, course history and textbook interactions for one shard.
+    Every stage draws from its own RNG stream seeded by (seed, stage, shard);
+    with a checkpoint directory a shard whose inputs are unchanged is loaded.
+    """
+    def generate():
+        with profile_stage("generate_students") as stage:
+            students_rng = shard_rng("students", shard_index)
+            students = generate_students(
+                context["id_allocator"], start, count, students_rng,
+                context["name_pool"], shard_rng("names", shard_index), batch_generator(students_rng)
+            )
+            stage["rows"] = len(students)
+        
+        with profile_stage("generate_student_course_history") as stage:
+            history_rng = shard_rng("history", shard_index)
+            completed_courses, enrolled_courses = generate_student_course_history(
+                students, context["courses"], context["terms"], context["prerequisites"],
+                history_rng, context["registry"], batch_generator(history_rng)
+            )
+            stage["rows"] = len(completed_courses) + len(enrolled_courses)
+        
+        with profile_stage("generate_textbook_interactions") as stage:
+            if INTERACTION_ENGINE == "numpy":
+                textbook_interactions, page_views = generate_textbook_interactions_vectorized(
+                    students, context["textbooks"], context["terms"], completed_courses,
+                    context["registry"], shard_rng("interactions", shard_index)
+                )
+            else:
+                textbook_interactions, page_views = generate_textbook_interactions(
+                    students, context["courses"], context["textbooks"], context["course_textbooks"],
+                    context["terms"], completed_courses, shard_rng("interactions", shard_index),
+                    context["registry"]
+                )
+            stage["rows"] = len(textbook_interactions) + len(page_views)
+        
+        return {
+            "students": students,
+            "completed_courses": completed_courses,
+            "enrolled_courses": enrolled_courses,
+            "textbook_interactions": textbook_interactions,
+            "page_views": page_views
+        }
+    
+    return context["checkpoints"].run(
+        "student_shard", generate, SHARD_CHECKPOINT_INPUTS,
+        {"shard": [shard_index, start, count]}, global_rng=False
+    )
+
+def init_shard_worker(config, context):
+    """
+    Process pool initializer: restore configuration and keep the shared catalog.
+    """
+    global _shard_context
+    
+    apply_config(config)
+    _shard_context = context
+
+def run_shard_in_worker(spec):
+    return generate_student_shard(_shard_context, *spec)
+
+def generate_student_shards(context, workers):
+    """
+    Yield shard results in shard order, using a process pool when workers > 1.
+    At most SHARDS_IN_FLIGHT_PER_WORKER shards per worker are queued or waiting
+    to be consumed, so memory stays bounded however many shards there are.
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
+    specs = student_shard_specs()
     
-    # 1. Export students
-    with open(os.path.join(output_dir, "01_students.cypher"), "w") as f:
-        for student in data["students"]:
+    if workers <= 1 or len(specs) <= 1:
+        for spec in specs:
+            yield generate_student_shard(context, *spec)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_shard_worker,
+                             initargs=(get_config(), context)) as pool:
+        pending = deque()
+        for spec in specs:
+            pending.append(pool.submit(run_shard_in_worker, spec))
+            if len(pending) >= workers * SHARDS_IN_FLIGHT_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+# =============================================================================
+#                           EXPORT FUNCTIONS
+# =============================================================================
+
+CYPHER_SCHEMA = """
+// Uniqueness constraints
+CREATE CONSTRAINT FOR (s:Student) REQUIRE s.id IS UNIQUE;
+CREATE CONSTRAINT FOR (c:Course) REQUIRE c.id IS UNIQUE;
+CREATE CONSTRAINT FOR (d:Degree) REQUIRE d.id IS UNIQUE;
+CREATE CONSTRAINT FOR (f:Faculty) REQUIRE f.id IS UNIQUE;
+CREATE CONSTRAINT FOR (t:Term) REQUIRE t.id IS UNIQUE;
+CREATE CONSTRAINT FOR (r:RequirementGroup) REQUIRE r.id IS UNIQUE;
+
+// Indexes for common lookups
+CREATE INDEX FOR (s:Student) ON (s.learningStyle);
+CREATE INDEX FOR (c:Course) ON (c.department);
+CREATE INDEX FOR (c:Course) ON (c.level);
+CREATE INDEX FOR (d:Degree) ON (d.department);
+CREATE INDEX FOR (d:Degree) ON (d.type);
+CREATE INDEX FOR (t:Term) ON (t.type);
+"""
+
+# Output sinks receive records as they are generated, one batch at a time, via
+# write(key, records) where key is the entity name (e.g. "students"). A sink
+# keeps its files open for the whole run, so nothing needs to stay in memory
+# once it has been written. Keys a sink has no output for are ignored.
+
+class CypherSink:
+    """
+    Stream records into Cypher script files.
+    """
+
+    FILES = {
+        "students": "01_students.cypher",
+        "faculty": "02_faculty.cypher",
+        "terms": "03_terms.cypher",
+        "courses": "04_courses.cypher",
+        "degrees": "05_degrees.cypher",
+        "requirement_groups": "06_requirement_groups.cypher",
+        "prerequisites": "07_course_prerequisites.cypher",
+        "leads_to": "08_leads_to.cypher",
+        "course_similarity": "09_course_similarity.cypher",
+        "student_degree": "10_student_degree.cypher",
+        "teaching": "11_teaching.cypher",
+        "completed_courses": "12_completed_courses.cypher",
+        "enrolled_courses": "13_enrolled_courses.cypher",
+        "student_similarity": "14_student_similarity.cypher",
+        "requirement_degree": "15_requirement_degree.cypher",
+        "course_requirement": "16_course_requirement.cypher",
+        "course_term": "17_course_term.cypher"
+    }
+
+    def __init__(self, output_dir):
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.files = {
+            name: open(os.path.join(output_dir, filename), "w")
+            for name, filename in self.FILES.items()
+        }
+        self.term_ids_by_type = defaultdict(list)
+
+    def write(self, key, records):
+        writer = getattr(self, f"write_{key}", None)
+        if writer is not None:
+            writer(records)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+        # Create indexes and constraints
+        with open(os.path.join(self.output_dir, "00_indexes.cypher"), "w") as f:
+            f.write(CYPHER_SCHEMA)
+
+    def write_students(self, students):
+        f = self.files["students"]
+        for student in students:
             cypher = f"""
 CREATE (s:Student {{
     id: "{student["id"]}",
@@ -1436,10 +3157,10 @@ CREATE (s:Student {{
 }});
 """
             f.write(cypher)
-    
-    # 2. Export faculty
-    with open(os.path.join(output_dir, "02_faculty.cypher"), "w") as f:
-        for faculty in data["faculty"]:
+
+    def write_faculty(self, faculty_members):
+        f = self.files["faculty"]
+        for faculty in faculty_members:
             teaching_styles_str = ", ".join([f'"{style}"' for style in faculty["teachingStyle"]])
             cypher = f"""
 CREATE (f:Faculty {{
@@ -1451,10 +3172,11 @@ CREATE (f:Faculty {{
 }});
 """
             f.write(cypher)
-    
-    # 3. Export terms
-    with open(os.path.join(output_dir, "03_terms.cypher"), "w") as f:
-        for term in data["terms"]:
+
+    def write_terms(self, terms):
+        f = self.files["terms"]
+        for term in terms:
+            self.term_ids_by_type[term["type"]].append(term["id"])
             cypher = f"""
 CREATE (t:Term {{
     id: "{term["id"]}",
@@ -1465,20 +3187,23 @@ CREATE (t:Term {{
 }});
 """
             f.write(cypher)
-            
-    # 4. Export courses
-    with open(os.path.join(output_dir, "04_courses.cypher"), "w") as f:
-        for course in data["courses"]:
+
+    def write_courses(self, courses):
+        """
+        Write course nodes and their OFFERED_IN relationships (terms must be written first).
+        """
+        f = self.files["courses"]
+        for course in courses:
             term_avail_str = ", ".join([f'"{term}"' for term in course["termAvailability"]])
             instruction_modes_str = ", ".join([f'"{mode}"' for mode in course["instructionModes"]])
             tags_str = ", ".join([f'"{tag}"' for tag in course.get("tags", [])])
-            
+
             # Handle optional fields
             visual_success = f', visualLearnerSuccess: {course.get("visualLearnerSuccess", 0.8)}' if "visualLearnerSuccess" in course else ""
             auditory_success = f', auditoryLearnerSuccess: {course.get("auditoryLearnerSuccess", 0.8)}' if "auditoryLearnerSuccess" in course else ""
             kinesthetic_success = f', kinestheticLearnerSuccess: {course.get("kinestheticLearnerSuccess", 0.8)}' if "kinestheticLearnerSuccess" in course else ""
             reading_success = f', readingLearnerSuccess: {course.get("readingLearnerSuccess", 0.8)}' if "readingLearnerSuccess" in course else ""
-            
+
             cypher = f"""
 CREATE (c:Course {{
     id: "{course["id"]}",
@@ -1494,10 +3219,22 @@ CREATE (c:Course {{
 }});
 """
             f.write(cypher)
-            
-    # 5. Export degrees
-    with open(os.path.join(output_dir, "05_degrees.cypher"), "w") as f:
-        for degree in data["degrees"]:
+
+        # Course - Term
+        f = self.files["course_term"]
+        for course in courses:
+            for term_type in course["termAvailability"]:
+                # For each matching term
+                for term_id in self.term_ids_by_type[term_type]:
+                    cypher = f"""
+MATCH (c:Course {{id: "{course["id"]}"}}), (t:Term {{id: "{term_id}"}})
+CREATE (c)-[:OFFERED_IN]->(t);
+"""
+                    f.write(cypher)
+
+    def write_degrees(self, degrees):
+        f = self.files["degrees"]
+        for degree in degrees:
             cypher = f"""
 CREATE (d:Degree {{
     id: "{degree["id"]}",
@@ -1510,10 +3247,10 @@ CREATE (d:Degree {{
 }});
 """
             f.write(cypher)
-            
-    # 6. Export requirement groups
-    with open(os.path.join(output_dir, "06_requirement_groups.cypher"), "w") as f:
-        for req in data["requirement_groups"]:
+
+    def write_requirement_groups(self, requirement_groups):
+        f = self.files["requirement_groups"]
+        for req in requirement_groups:
             cypher = f"""
 CREATE (r:RequirementGroup {{
     id: "{req["id"]}",
@@ -1524,66 +3261,85 @@ CREATE (r:RequirementGroup {{
 }});
 """
             f.write(cypher)
-    
-    # 7. Export relationships: Course Prerequisites
-    with open(os.path.join(output_dir, "07_course_prerequisites.cypher"), "w") as f:
-        for prereq in data["prerequisites"]:
+
+        # Requirement Group - Degree
+        f = self.files["requirement_degree"]
+        for req in requirement_groups:
+            cypher = f"""
+MATCH (r:RequirementGroup {{id: "{req["id"]}"}}), (d:Degree {{id: "{req["degreeId"]}"}})
+CREATE (r)-[:PART_OF]->(d);
+"""
+            f.write(cypher)
+
+        # Course - Requirement Group
+        f = self.files["course_requirement"]
+        for req in requirement_groups:
+            for course_id in req["courses"]:
+                cypher = f"""
+MATCH (c:Course {{id: "{course_id}"}}), (r:RequirementGroup {{id: "{req["id"]}"}})
+CREATE (c)-[:FULFILLS]->(r);
+"""
+                f.write(cypher)
+
+    def write_prerequisites(self, prerequisites):
+        f = self.files["prerequisites"]
+        for prereq in prerequisites:
             min_grade = f', minGrade: "{prereq["minGrade"]}"' if prereq["minGrade"] else ""
             cypher = f"""
 MATCH (source:Course {{id: "{prereq["source"]}"}}), (target:Course {{id: "{prereq["target"]}"}})
 CREATE (source)-[:PREREQUISITE_FOR {{strength: "{prereq["strength"]}"{min_grade}}}]->(target);
 """
             f.write(cypher)
-            
-    # 8. Export relationships: LEADS_TO
-    with open(os.path.join(output_dir, "08_leads_to.cypher"), "w") as f:
-        for lead in data["leads_to"]:
+
+    def write_leads_to(self, leads_to):
+        f = self.files["leads_to"]
+        for lead in leads_to:
             cypher = f"""
 MATCH (source:Course {{id: "{lead["source"]}"}}), (target:Course {{id: "{lead["target"]}"}})
 CREATE (source)-[:LEADS_TO {{commonality: {lead["commonality"]}, successCorrelation: {lead["successCorrelation"]}}}]->(target);
 """
             f.write(cypher)
-            
-    # 9. Export relationships: Course similarity
-    with open(os.path.join(output_dir, "09_course_similarity.cypher"), "w") as f:
-        # Content similarity
-        for sim in data["similarity_content"]:
+
+    def write_similarity_content(self, similarity_content):
+        f = self.files["course_similarity"]
+        for sim in similarity_content:
             cypher = f"""
 MATCH (source:Course {{id: "{sim["source"]}"}}), (target:Course {{id: "{sim["target"]}"}})
 CREATE (source)-[:SIMILAR_CONTENT {{similarity: {sim["similarity"]}}}]->(target);
 """
             f.write(cypher)
-            
-        # Difficulty similarity
-        for sim in data["similarity_difficulty"]:
+
+    def write_similarity_difficulty(self, similarity_difficulty):
+        f = self.files["course_similarity"]
+        for sim in similarity_difficulty:
             cypher = f"""
 MATCH (source:Course {{id: "{sim["source"]}"}}), (target:Course {{id: "{sim["target"]}"}})
 CREATE (source)-[:SIMILAR_DIFFICULTY {{similarity: {sim["similarity"]}}}]->(target);
 """
             f.write(cypher)
-    
-    # 10. Export relationships: Student-Degree
-    with open(os.path.join(output_dir, "10_student_degree.cypher"), "w") as f:
-        for rel in data["student_degree"]:
+
+    def write_student_degree(self, student_degree):
+        f = self.files["student_degree"]
+        for rel in student_degree:
             cypher = f"""
 MATCH (s:Student {{id: "{rel["studentId"]}"}}), (d:Degree {{id: "{rel["degreeId"]}"}})
 CREATE (s)-[:PURSUING]->(d);
 """
             f.write(cypher)
-            
-    # 11. Export relationships: Faculty-Course
-    with open(os.path.join(output_dir, "11_teaching.cypher"), "w") as f:
-        for teach in data["teaching"]:
+
+    def write_teaching(self, teaching):
+        f = self.files["teaching"]
+        for teach in teaching:
             terms_str = ", ".join([f'"{term}"' for term in teach["terms"]])
             cypher = f"""
 MATCH (f:Faculty {{id: "{teach["facultyId"]}"}}), (c:Course {{id: "{teach["courseId"]}"}})
 CREATE (f)-[:TEACHES {{terms: [{terms_str}]}}]->(c);
 """
             f.write(cypher)
-            
-    # 12. Export relationships: Student-Course (Completed)
-    with open(os.path.join(output_dir, "12_completed_courses.cypher"), "w") as f:
-        for comp in data["completed_courses"]:
+
+    def write_completed_courses(self, completed_courses):
+        f = self.files["completed_courses"]
+        for comp in completed_courses:
             enjoyment = "true" if comp["enjoyment"] else "false"
             cypher = f"""
 MATCH (s:Student {{id: "{comp["studentId"]}"}}), (c:Course {{id: "{comp["courseId"]}"}})
@@ -1597,496 +3353,1122 @@ CREATE (s)-[:COMPLETED {{
 }}]->(c);
 """
             f.write(cypher)
-            
-    # 13. Export relationships: Student-Course (Enrolled)
-    with open(os.path.join(output_dir, "13_enrolled_courses.cypher"), "w") as f:
-        for enroll in data["enrolled_courses"]:
+
+    def write_enrolled_courses(self, enrolled_courses):
+        f = self.files["enrolled_courses"]
+        for enroll in enrolled_courses:
             cypher = f"""
 MATCH (s:Student {{id: "{enroll["studentId"]}"}}), (c:Course {{id: "{enroll["courseId"]}"}})
 CREATE (s)-[:ENROLLED_IN]->(c);
 """
             f.write(cypher)
-            
-    # 14. Export relationships: Student similarity
-    with open(os.path.join(output_dir, "14_student_similarity.cypher"), "w") as f:
-        # Learning style similarity
-        for sim in data["learning_style_similarity"]:
+
+    def write_learning_style_similarity(self, learning_style_similarity):
+        f = self.files["student_similarity"]
+        for sim in learning_style_similarity:
             cypher = f"""
 MATCH (source:Student {{id: "{sim["sourceId"]}"}}), (target:Student {{id: "{sim["targetId"]}"}})
 CREATE (source)-[:SIMILAR_LEARNING_STYLE {{similarity: {sim["similarity"]}}}]->(target);
 """
             f.write(cypher)
-            
-        # Performance similarity
-        for sim in data["performance_similarity"]:
+
+    def write_performance_similarity(self, performance_similarity):
+        f = self.files["student_similarity"]
+        for sim in performance_similarity:
             courses_str = ", ".join([f'"{c}"' for c in sim["courses"]])
             cypher = f"""
 MATCH (source:Student {{id: "{sim["sourceId"]}"}}), (target:Student {{id: "{sim["targetId"]}"}})
 CREATE (source)-[:SIMILAR_PERFORMANCE {{similarity: {sim["similarity"]}, courses: [{courses_str}]}}]->(target);
 """
             f.write(cypher)
-            
-    # 15. Export relationships: Requirement Group - Degree
-    with open(os.path.join(output_dir, "15_requirement_degree.cypher"), "w") as f:
-        for req in data["requirement_groups"]:
-            cypher = f"""
-MATCH (r:RequirementGroup {{id: "{req["id"]}"}}), (d:Degree {{id: "{req["degreeId"]}"}})
-CREATE (r)-[:PART_OF]->(d);
-"""
-            f.write(cypher)
-            
-    # 16. Export relationships: Course - Requirement Group
-    with open(os.path.join(output_dir, "16_course_requirement.cypher"), "w") as f:
-        for req in data["requirement_groups"]:
-            for course_id in req["courses"]:
-                cypher = f"""
-MATCH (c:Course {{id: "{course_id}"}}), (r:RequirementGroup {{id: "{req["id"]}"}})
-CREATE (c)-[:FULFILLS]->(r);
-"""
-                f.write(cypher)
-                
-    # 17. Export relationships: Course - Term
-    with open(os.path.join(output_dir, "17_course_term.cypher"), "w") as f:
-        for course in data["courses"]:
-            for term_type in course["termAvailability"]:
-                # For each matching term
-                for term in data["terms"]:
-                    if term["type"] == term_type:
-                        cypher = f"""
-MATCH (c:Course {{id: "{course["id"]}"}}), (t:Term {{id: "{term["id"]}"}})
-CREATE (c)-[:OFFERED_IN]->(t);
-"""
-                        f.write(cypher)
-                        
-    # 18. Create indexes and constraints
-    with open(os.path.join(output_dir, "00_indexes.cypher"), "w") as f:
-        f.write("""
-// Uniqueness constraints
-CREATE CONSTRAINT FOR (s:Student) REQUIRE s.id IS UNIQUE;
-CREATE CONSTRAINT FOR (c:Course) REQUIRE c.id IS UNIQUE;
-CREATE CONSTRAINT FOR (d:Degree) REQUIRE d.id IS UNIQUE;
-CREATE CONSTRAINT FOR (f:Faculty) REQUIRE f.id IS UNIQUE;
-CREATE CONSTRAINT FOR (t:Term) REQUIRE t.id IS UNIQUE;
-CREATE CONSTRAINT FOR (r:RequirementGroup) REQUIRE r.id IS UNIQUE;
 
-// Indexes for common lookups
-CREATE INDEX FOR (s:Student) ON (s.learningStyle);
-CREATE INDEX FOR (c:Course) ON (c.department);
-CREATE INDEX FOR (c:Course) ON (c.level);
-CREATE INDEX FOR (d:Degree) ON (d.department);
-CREATE INDEX FOR (d:Degree) ON (d.type);
-CREATE INDEX FOR (t:Term) ON (t.type);
-""")
+# Batched Cypher export: each statement runs once per batch of rows, which
+# cypher-shell binds to $rows with a preceding ":param" line
+UNWIND_STATEMENTS = {
+    "students": ("students", """UNWIND $rows AS row
+CREATE (s:Student)
+SET s = row, s.enrollmentDate = date(row.enrollmentDate), s.expectedGraduation = date(row.expectedGraduation);"""),
+    "faculty": ("faculty", """UNWIND $rows AS row
+CREATE (f:Faculty)
+SET f = row;"""),
+    "terms": ("terms", """UNWIND $rows AS row
+CREATE (t:Term)
+SET t = row, t.startDate = date(row.startDate), t.endDate = date(row.endDate);"""),
+    "courses": ("courses", """UNWIND $rows AS row
+CREATE (c:Course)
+SET c = row;"""),
+    "degrees": ("degrees", """UNWIND $rows AS row
+CREATE (d:Degree)
+SET d = row;"""),
+    "requirement_groups": ("requirement_groups", """UNWIND $rows AS row
+CREATE (r:RequirementGroup)
+SET r = row;"""),
+    "prerequisites": ("prerequisites", """UNWIND $rows AS row
+MATCH (source:Course {id: row.source}), (target:Course {id: row.target})
+CREATE (source)-[r:PREREQUISITE_FOR]->(target)
+SET r = row {.strength, .minGrade};"""),
+    "leads_to": ("leads_to", """UNWIND $rows AS row
+MATCH (source:Course {id: row.source}), (target:Course {id: row.target})
+CREATE (source)-[r:LEADS_TO]->(target)
+SET r = row {.commonality, .successCorrelation};"""),
+    "similarity_content": ("course_similarity", """UNWIND $rows AS row
+MATCH (source:Course {id: row.source}), (target:Course {id: row.target})
+CREATE (source)-[:SIMILAR_CONTENT {similarity: row.similarity}]->(target);"""),
+    "similarity_difficulty": ("course_similarity", """UNWIND $rows AS row
+MATCH (source:Course {id: row.source}), (target:Course {id: row.target})
+CREATE (source)-[:SIMILAR_DIFFICULTY {similarity: row.similarity}]->(target);"""),
+    "student_degree": ("student_degree", """UNWIND $rows AS row
+MATCH (s:Student {id: row.studentId}), (d:Degree {id: row.degreeId})
+CREATE (s)-[:PURSUING]->(d);"""),
+    "teaching": ("teaching", """UNWIND $rows AS row
+MATCH (f:Faculty {id: row.facultyId}), (c:Course {id: row.courseId})
+CREATE (f)-[:TEACHES {terms: row.terms}]->(c);"""),
+    "completed_courses": ("completed_courses", """UNWIND $rows AS row
+MATCH (s:Student {id: row.studentId}), (c:Course {id: row.courseId})
+CREATE (s)-[r:COMPLETED]->(c)
+SET r = row {.term, .grade, .difficulty, .timeSpent, .instructionMode, .enjoyment};"""),
+    "enrolled_courses": ("enrolled_courses", """UNWIND $rows AS row
+MATCH (s:Student {id: row.studentId}), (c:Course {id: row.courseId})
+CREATE (s)-[:ENROLLED_IN]->(c);"""),
+    "learning_style_similarity": ("student_similarity", """UNWIND $rows AS row
+MATCH (source:Student {id: row.sourceId}), (target:Student {id: row.targetId})
+CREATE (source)-[:SIMILAR_LEARNING_STYLE {similarity: row.similarity}]->(target);"""),
+    "performance_similarity": ("student_similarity", """UNWIND $rows AS row
+MATCH (source:Student {id: row.sourceId}), (target:Student {id: row.targetId})
+CREATE (source)-[:SIMILAR_PERFORMANCE {similarity: row.similarity, courses: row.courses}]->(target);"""),
+    "requirement_degree": ("requirement_degree", """UNWIND $rows AS row
+MATCH (r:RequirementGroup {id: row.id}), (d:Degree {id: row.degreeId})
+CREATE (r)-[:PART_OF]->(d);"""),
+    "course_requirement": ("course_requirement", """UNWIND $rows AS row
+MATCH (c:Course {id: row.courseId}), (r:RequirementGroup {id: row.groupId})
+CREATE (c)-[:FULFILLS]->(r);"""),
+    "course_term": ("course_term", """UNWIND $rows AS row
+MATCH (c:Course {id: row.courseId}), (t:Term {id: row.termId})
+CREATE (c)-[:OFFERED_IN]->(t);""")
+}
 
-def export_to_csv(data, output_dir):
+# Record fields copied into UNWIND rows, per statement
+UNWIND_FIELDS = {
+    "students": ["id", "name", "enrollmentDate", "expectedGraduation", "learningStyle",
+                 "preferredCourseLoad", "preferredPace", "workHoursPerWeek",
+                 "financialAidStatus", "preferredInstructionMode"],
+    "faculty": ["id", "name", "department", "teachingStyle", "avgRating"],
+    "terms": ["id", "name", "startDate", "endDate", "type"],
+    "courses": ["id", "name", "department", "credits", "level", "avgDifficulty", "avgTimeCommitment",
+                "termAvailability", "instructionModes", "tags", "visualLearnerSuccess",
+                "auditoryLearnerSuccess", "kinestheticLearnerSuccess", "readingLearnerSuccess"],
+    "degrees": ["id", "name", "department", "type", "totalCreditsRequired",
+                "coreCreditsRequired", "electiveCreditsRequired"],
+    "requirement_groups": ["id", "name", "description", "minimumCourses", "minimumCredits"],
+    "prerequisites": ["source", "target", "strength", "minGrade"],
+    "leads_to": ["source", "target", "commonality", "successCorrelation"],
+    "similarity_content": ["source", "target", "similarity"],
+    "similarity_difficulty": ["source", "target", "similarity"],
+    "student_degree": ["studentId", "degreeId"],
+    "teaching": ["facultyId", "courseId", "terms"],
+    "completed_courses": ["studentId", "courseId", "term", "grade", "difficulty",
+                          "timeSpent", "instructionMode", "enjoyment"],
+    "enrolled_courses": ["studentId", "courseId"],
+    "learning_style_similarity": ["sourceId", "targetId", "similarity"],
+    "performance_similarity": ["sourceId", "targetId", "similarity", "courses"],
+    "requirement_degree": ["id", "degreeId"],
+    "course_term": ["courseId", "termId"]
+}
+
+def cypher_literal(value):
     """
-    Export data to CSV files for Neo4j Import.
+    Render a Python value as a Cypher literal (maps use the keys as identifiers).
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return json.dumps(value)
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{key}: {cypher_literal(item)}" for key, item in value.items()) + "}"
+    return "[" + ", ".join(cypher_literal(item) for item in value) + "]"
+
+class CypherBatchSink:
+    """
+    Stream records into Cypher scripts that create them in batches with UNWIND,
+    one statement (and transaction) per batch instead of per row.
+    Uses the same file names as CypherSink; 00_indexes.cypher is written
+    first so constraints exist before any MATCH runs.
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
     
-    # 1. Export students
-    with open(os.path.join(output_dir, "students.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "id:ID(Student)", "name", "enrollmentDate", "expectedGraduation", 
-            "learningStyle", "preferredCourseLoad:int", "preferredPace", 
-            "workHoursPerWeek:int", "financialAidStatus", "preferredInstructionMode"
-        ])
+    STATEMENTS = UNWIND_STATEMENTS
+    SCHEMA = CYPHER_SCHEMA
+
+    def __init__(self, output_dir, batch_size=CYPHER_BATCH_SIZE):
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+        if self.SCHEMA:
+            with open(os.path.join(output_dir, "00_indexes.cypher"), "w") as f:
+                f.write(self.SCHEMA)
         
-        for student in data["students"]:
-            writer.writerow([
-                student["id"], 
-                student["name"], 
-                student["enrollmentDate"], 
-                student["expectedGraduation"],
-                student["learningStyle"], 
-                student["preferredCourseLoad"], 
-                student["preferredPace"],
-                student["workHoursPerWeek"], 
-                student["financialAidStatus"], 
-                student["preferredInstructionMode"]
-            ])
-    
-    # 2. Export faculty
-    with open(os.path.join(output_dir, "faculty.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "id:ID(Faculty)", "name", "department", "teachingStyle", "avgRating:float"
-        ])
+        self.batch_size = batch_size
+        file_keys = {file_key for file_key, _ in self.STATEMENTS.values()}
+        self.files = {
+            name: open(os.path.join(output_dir, filename), "w")
+            for name, filename in CypherSink.FILES.items() if name in file_keys
+        }
+        self.buffers = defaultdict(list)
+        self.term_ids_by_type = defaultdict(list)
+
+    def write(self, key, records):
+        if key == "terms":
+            for term in records:
+                self.term_ids_by_type[term["type"]].append(term["id"])
         
-        for faculty in data["faculty"]:
-            writer.writerow([
-                faculty["id"], 
-                faculty["name"], 
-                faculty["department"], 
-                ";".join(faculty["teachingStyle"]), 
-                faculty["avgRating"]
+        if key in UNWIND_FIELDS and key in self.STATEMENTS:
+            fields = UNWIND_FIELDS[key]
+            # Empty strings become null, so the property is left unset as in CypherSink
+            self.add(key, [
+                {field: record.get(field) if record.get(field) != "" else None for field in fields}
+                for record in records
             ])
-    
-    # 3. Export terms
-    with open(os.path.join(output_dir, "terms.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "id:ID(Term)", "name", "startDate", "endDate", "type"
-        ])
         
-        for term in data["terms"]:
-            writer.writerow([
-                term["id"], 
-                term["name"], 
-                term["startDate"], 
-                term["endDate"], 
-                term["type"]
+        if key == "courses":
+            # Course - Term, for each matching term (terms must be written first)
+            self.add("course_term", [
+                {"courseId": course["id"], "termId": term_id}
+                for course in records
+                for term_type in course["termAvailability"]
+                for term_id in self.term_ids_by_type[term_type]
             ])
-            
-    # 4. Export courses
-    with open(os.path.join(output_dir, "courses.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        elif key == "requirement_groups":
+            self.add("requirement_degree", [
+                {field: req[field] for field in UNWIND_FIELDS["requirement_degree"]} for req in records
+            ])
+            self.add("course_requirement", [
+                {"courseId": course_id, "groupId": req["id"]}
+                for req in records for course_id in req["courses"]
+            ])
+
+    def add(self, statement, rows):
+        buffer = self.buffers[statement]
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= self.batch_size:
+                self.flush(statement)
+                buffer = self.buffers[statement]
+
+    def flush(self, statement):
+        rows = self.buffers.pop(statement, None)
+        if not rows:
+            return
+        
+        file_key, cypher = self.STATEMENTS[statement]
+        f = self.files[file_key]
+        f.write(":param {rows: " + cypher_literal(rows) + "}\n")
+        f.write(cypher + "\n")
+
+    def close(self):
+        for statement in list(self.buffers):
+            self.flush(statement)
+        for f in self.files.values():
+            f.close()
+
+def open_csv_file(path, mode="r"):
+    """
+    Open a CSV file as text, through gzip when the name ends in .gz.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", newline="", compresslevel=CSV_GZIP_LEVEL)
+    return open(path, mode, newline="")
+
+def csv_rows_text(rows):
+    """
+    Format rows as CSV text in the csv module's default dialect.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+class CsvFileWriter:
+    """
+    Append blocks of formatted CSV text to one (optionally gzipped) file.
+    With a thread pool, blocks are queued and written in order by at most one
+    pool thread at a time; the shared semaphore bounds the queued blocks.
+    """
+
+    def __init__(self, path, pool=None, slots=None):
+        self.file = open_csv_file(path, "w")
+        self.pool = pool
+        self.slots = slots
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.draining = False
+        self.error = None
+        self.futures = []
+
+    def write(self, text):
+        if self.pool is None:
+            self.file.write(text)
+            return
+
+        self.slots.acquire()
+        with self.lock:
+            if self.error is not None:
+                self.slots.release()
+                raise self.error
+            self.pending.append(text)
+            if not self.draining:
+                self.draining = True
+                self.futures.append(self.pool.submit(self.drain))
+
+    def drain(self):
+        while True:
+            with self.lock:
+                if not self.pending:
+                    self.draining = False
+                    return
+                text = self.pending.popleft()
+            try:
+                self.file.write(text)
+            except BaseException as error:
+                # Drop the blocks still queued and free their slots, so
+                # writers blocked on the semaphore wake up and see the error
+                with self.lock:
+                    self.error = error
+                    self.draining = False
+                    for _ in self.pending:
+                        self.slots.release()
+                    self.pending.clear()
+                raise
+            finally:
+                self.slots.release()
+
+    def close(self):
+        """
+        Wait for queued blocks, raising the first write error, and close the file.
+        """
+        try:
+            for future in self.futures:
+                future.result()
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.file.close()
+
+class CsvSink:
+    """
+    Stream records into CSV files for Neo4j Import.
+    """
+
+    FILES = {
+        "students": ("students.csv", [
+            "id:ID(Student)", "name", "enrollmentDate", "expectedGraduation",
+            "learningStyle", "preferredCourseLoad:int", "preferredPace",
+            "workHoursPerWeek:int", "financialAidStatus", "preferredInstructionMode"
+        ]),
+        "faculty": ("faculty.csv", [
+            "id:ID(Faculty)", "name", "department", "teachingStyle", "avgRating:float"
+        ]),
+        "terms": ("terms.csv", [
+            "id:ID(Term)", "name", "startDate", "endDate", "type"
+        ]),
+        "courses": ("courses.csv", [
             "id:ID(Course)", "name", "department", "credits:int", "level:int",
             "avgDifficulty:float", "avgTimeCommitment:int", "termAvailability",
             "instructionModes", "tags", "visualLearnerSuccess:float", "auditoryLearnerSuccess:float",
             "kinestheticLearnerSuccess:float", "readingLearnerSuccess:float"
-        ])
-        
-        for course in data["courses"]:
-            writer.writerow([
-                course["id"], 
-                course["name"], 
-                course["department"], 
-                course["credits"],
-                course["level"], 
-                course["avgDifficulty"], 
-                course["avgTimeCommitment"],
-                ";".join(course["termAvailability"]), 
-                ";".join(course["instructionModes"]), 
-                ";".join(course.get("tags", [])),
-                course.get("visualLearnerSuccess", ""),
-                course.get("auditoryLearnerSuccess", ""),
-                course.get("kinestheticLearnerSuccess", ""),
-                course.get("readingLearnerSuccess", "")
-            ])
-            
-    # 5. Export degrees
-    with open(os.path.join(output_dir, "degrees.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "degrees": ("degrees.csv", [
             "id:ID(Degree)", "name", "department", "type", "totalCreditsRequired:int",
             "coreCreditsRequired:int", "electiveCreditsRequired:int"
-        ])
-        
-        for degree in data["degrees"]:
-            writer.writerow([
-                degree["id"], 
-                degree["name"], 
-                degree["department"], 
-                degree["type"],
-                degree["totalCreditsRequired"], 
-                degree["coreCreditsRequired"], 
-                degree["electiveCreditsRequired"]
-            ])
-            
-    # 6. Export requirement groups
-    with open(os.path.join(output_dir, "requirement_groups.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "requirement_groups": ("requirement_groups.csv", [
             "id:ID(RequirementGroup)", "name", "description", "minimumCourses:int", "minimumCredits:int"
-        ])
-        
-        for req in data["requirement_groups"]:
-            writer.writerow([
-                req["id"], 
-                req["name"], 
-                req["description"], 
-                req["minimumCourses"],
-                req["minimumCredits"]
-            ])
-    
-    # 7. Export relationship: Prerequisites
-    with open(os.path.join(output_dir, "prerequisites.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "prerequisites": ("prerequisites.csv", [
             ":START_ID(Course)", ":END_ID(Course)", ":TYPE", "strength", "minGrade"
-        ])
-        
-        for prereq in data["prerequisites"]:
-            writer.writerow([
-                prereq["source"],
-                prereq["target"],
-                "PREREQUISITE_FOR",
-                prereq["strength"],
-                prereq.get("minGrade", "")
-            ])
-            
-    # 8. Export relationship: LEADS_TO
-    with open(os.path.join(output_dir, "leads_to.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "leads_to": ("leads_to.csv", [
             ":START_ID(Course)", ":END_ID(Course)", ":TYPE", "commonality:float", "successCorrelation:float"
-        ])
-        
-        for lead in data["leads_to"]:
-            writer.writerow([
-                lead["source"],
-                lead["target"],
-                "LEADS_TO",
-                lead["commonality"],
-                lead["successCorrelation"]
-            ])
-            
-    # 9. Export relationship: Course similarity
-    with open(os.path.join(output_dir, "course_similarity_content.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "similarity_content": ("course_similarity_content.csv", [
             ":START_ID(Course)", ":END_ID(Course)", ":TYPE", "similarity:float"
-        ])
-        
-        for sim in data["similarity_content"]:
-            writer.writerow([
-                sim["source"],
-                sim["target"],
-                "SIMILAR_CONTENT",
-                sim["similarity"]
-            ])
-            
-    with open(os.path.join(output_dir, "course_similarity_difficulty.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "similarity_difficulty": ("course_similarity_difficulty.csv", [
             ":START_ID(Course)", ":END_ID(Course)", ":TYPE", "similarity:float"
-        ])
-        
-        for sim in data["similarity_difficulty"]:
-            writer.writerow([
-                sim["source"],
-                sim["target"],
-                "SIMILAR_DIFFICULTY",
-                sim["similarity"]
-            ])
-    
-    # 10. Export relationship: Student-Degree
-    with open(os.path.join(output_dir, "student_degree.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "student_degree": ("student_degree.csv", [
             ":START_ID(Student)", ":END_ID(Degree)", ":TYPE"
-        ])
-        
-        for rel in data["student_degree"]:
-            writer.writerow([
-                rel["studentId"],
-                rel["degreeId"],
-                "PURSUING"
-            ])
-            
-    # 11. Export relationship: Faculty-Course
-    with open(os.path.join(output_dir, "teaching.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "teaching": ("teaching.csv", [
             ":START_ID(Faculty)", ":END_ID(Course)", ":TYPE", "terms"
-        ])
-        
-        for teach in data["teaching"]:
-            writer.writerow([
-                teach["facultyId"],
-                teach["courseId"],
-                "TEACHES",
-                ";".join(teach["terms"])
-            ])
-            
-    # 12. Export relationship: Student-Course (Completed)
-    with open(os.path.join(output_dir, "completed_courses.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "completed_courses": ("completed_courses.csv", [
             ":START_ID(Student)", ":END_ID(Course)", ":TYPE", "term", "grade",
             "difficulty:int", "timeSpent:int", "instructionMode", "enjoyment:boolean"
-        ])
-        
-        for comp in data["completed_courses"]:
-            writer.writerow([
-                comp["studentId"],
-                comp["courseId"],
-                "COMPLETED",
-                comp["term"],
-                comp["grade"],
-                comp["difficulty"],
-                comp["timeSpent"],
-                comp["instructionMode"],
-                "true" if comp["enjoyment"] else "false"
-            ])
-            
-    # 13. Export relationship: Student-Course (Enrolled)
-    with open(os.path.join(output_dir, "enrolled_courses.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "enrolled_courses": ("enrolled_courses.csv", [
             ":START_ID(Student)", ":END_ID(Course)", ":TYPE"
-        ])
-        
-        for enroll in data["enrolled_courses"]:
-            writer.writerow([
-                enroll["studentId"],
-                enroll["courseId"],
-                "ENROLLED_IN"
-            ])
-            
-    # 14. Export relationship: Student similarity
-    with open(os.path.join(output_dir, "learning_style_similarity.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "learning_style_similarity": ("learning_style_similarity.csv", [
             ":START_ID(Student)", ":END_ID(Student)", ":TYPE", "similarity:float"
-        ])
-        
-        for sim in data["learning_style_similarity"]:
-            writer.writerow([
-                sim["sourceId"],
-                sim["targetId"],
-                "SIMILAR_LEARNING_STYLE",
-                sim["similarity"]
-            ])
-            
-    with open(os.path.join(output_dir, "performance_similarity.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "performance_similarity": ("performance_similarity.csv", [
             ":START_ID(Student)", ":END_ID(Student)", ":TYPE", "similarity:float", "courses"
-        ])
-        
-        for sim in data["performance_similarity"]:
-            writer.writerow([
-                sim["sourceId"],
-                sim["targetId"],
-                "SIMILAR_PERFORMANCE",
-                sim["similarity"],
-                ";".join(sim["courses"])
-            ])
-            
-    # 15. Export relationship: Requirement Group - Degree
-    with open(os.path.join(output_dir, "requirement_degree.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            ":START_ID(RequirementGroup)", ":END_ID(Degree)", ":TYPE"
-        ])
-        
-        for req in data["requirement_groups"]:
-            writer.writerow([
-                req["id"],
-                req["degreeId"],
-                "PART_OF"
-            ])
-            
-    # 16. Export relationship: Course - Requirement Group
-    with open(os.path.join(output_dir, "course_requirement.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            ":START_ID(Course)", ":END_ID(RequirementGroup)", ":TYPE"
-        ])
-        
-        for req in data["requirement_groups"]:
-            for course_id in req["courses"]:
-                writer.writerow([
-                    course_id,
-                    req["id"],
-                    "FULFILLS"
-                ])
-                
-    # 17. Export relationship: Course - Term
-    with open(os.path.join(output_dir, "course_term.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            ":START_ID(Course)", ":END_ID(Term)", ":TYPE"
-        ])
-        
-        for course in data["courses"]:
-            for term_type in course["termAvailability"]:
-                # For each matching term
-                for term in data["terms"]:
-                    if term["type"] == term_type:
-                        writer.writerow([
-                            course["id"],
-                            term["id"],
-                            "OFFERED_IN"
-                        ])
-    
-    # Export textbooks
-    with open(os.path.join(output_dir, "textbooks.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "requirement_degree": ("requirement_degree.csv", [
+            ":START_ID(RequirementGroup)", ":END_ID(Degree)", ":TYPE"
+        ]),
+        "course_requirement": ("course_requirement.csv", [
+            ":START_ID(Course)", ":END_ID(RequirementGroup)", ":TYPE"
+        ]),
+        "course_term": ("course_term.csv", [
+            ":START_ID(Course)", ":END_ID(Term)", ":TYPE"
+        ]),
+        "textbooks": ("textbooks.csv", [
             "id:ID(Textbook)", "name", "publisher", "price:float", "pages:int",
             "edition:int", "publicationYear:int", "isbn", "category"
-        ])
-        
-        for textbook in data["textbooks"]:
-            writer.writerow([
-                textbook["id"],
-                textbook["name"],
-                textbook["publisher"],
-                textbook["price"],
-                textbook["pages"],
-                textbook["edition"],
-                textbook["publicationYear"],
-                textbook["isbn"],
-                textbook["category"]
-            ])
-    
-    # Export course-textbook relationships
-    with open(os.path.join(output_dir, "course_textbooks.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "course_textbooks": ("course_textbooks.csv", [
             ":START_ID(Course)", ":END_ID(Textbook)", ":TYPE",
             "isRequired:boolean", "recommendedOrder:int"
-        ])
-        
-        for rel in data["course_textbooks"]:
-            writer.writerow([
-                rel["courseId"],
-                rel["textbookId"],
-                "REQUIRES" if rel["isRequired"] else "RECOMMENDS",
-                rel["isRequired"],
-                rel["recommendedOrder"]
-            ])
-    
-    # Export textbook page views
-    with open(os.path.join(output_dir, "page_views.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "page_views": ("page_views.csv", [
             ":START_ID(Student)", ":END_ID(Textbook)", ":TYPE",
             "courseId", "pageNumber:int", "timestamp", "duration:int"
-        ])
-        
-        for view in data["page_views"]:
-            writer.writerow([
-                view["studentId"],
-                view["textbookId"],
-                "VIEWED_PAGE",
-                view["courseId"],
-                view["pageNumber"],
-                view["timestamp"],
-                view["duration"]
-            ])
-    
-    # Export textbook interactions
-    with open(os.path.join(output_dir, "textbook_interactions.csv"), "w", newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([
+        ]),
+        "textbook_interactions": ("textbook_interactions.csv", [
             ":START_ID(Student)", ":END_ID(Textbook)", ":TYPE",
             "courseId", "interactionType", "timestamp", "duration:int"
         ])
+    }
+
+    def __init__(self, output_dir, keys=None, compress=False, chunks=1, writers=1):
+        """
+        Open a CSV file (and write its header) for every key, or only for keys.
+        compress gzips every file; with chunks > 1, files in CSV_CHUNKED_FILES
+        are split into that many part files behind a separate header file.
+        With writers > 1 a pool of that many threads compresses and writes.
+        """
+        # Create output directory if it doesn't exist
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.pool = ThreadPoolExecutor(max_workers=writers) if writers > 1 else None
+        slots = threading.Semaphore(writers * CSV_WRITE_QUEUE_PER_WRITER) if self.pool else None
+        suffix = ".gz" if compress else ""
+        self.outputs = {}
+        self.filenames = {}
+        for name, (filename, header) in self.FILES.items():
+            if keys is not None and name not in keys:
+                continue
+
+            if chunks > 1 and name in CSV_CHUNKED_FILES:
+                # neo4j-admin import reads the header file, then every part
+                stem = os.path.splitext(filename)[0]
+                header_filename = f"{stem}.header.csv"
+                with open(os.path.join(output_dir, header_filename), "w", newline="") as f:
+                    csv.writer(f).writerow(header)
+                part_filenames = [f"{stem}.part{i + 1:02d}.csv{suffix}" for i in range(chunks)]
+                self.filenames[name] = [header_filename] + part_filenames
+            else:
+                part_filenames = [filename + suffix]
+                self.filenames[name] = part_filenames
+
+            self.outputs[name] = [
+                CsvFileWriter(os.path.join(output_dir, part_filename), self.pool, slots)
+                for part_filename in part_filenames
+            ]
+            if len(part_filenames) == 1:
+                self.outputs[name][0].write(csv_rows_text([header]))
+        self.term_ids_by_type = defaultdict(list)
+
+    def write(self, key, records):
+        writer = getattr(self, f"write_{key}", None)
+        if writer is not None:
+            writer(records)
+
+    def close(self):
+        try:
+            for outputs in self.outputs.values():
+                for output in outputs:
+                    output.close()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+
+    def chunk_bounds(self, name, length):
+        """
+        Split length rows of a file into one contiguous range per part file.
+        """
+        parts = len(self.outputs[name])
+        step = -(-length // parts)
+        return [(i * step, min(length, (i + 1) * step)) for i in range(parts)]
+
+    def write_rows(self, name, rows):
+        rows = list(rows)
+        for output, (start, stop) in zip(self.outputs[name], self.chunk_bounds(name, len(rows))):
+            if start < stop:
+                output.write(csv_rows_text(rows[start:stop]))
+
+    def write_batch(self, name, batch, fields, constants):
+        """
+        Write a ColumnarBatch, rendering the text with NumPy when no value needs quoting.
+        """
+        for output, (start, stop) in zip(self.outputs[name], self.chunk_bounds(name, len(batch))):
+            if start >= stop:
+                continue
+            part = batch if stop - start == len(batch) else batch.slice(start, stop)
+            text = part.csv_text(fields, constants)
+            if text is None:
+                text = csv_rows_text(zip(*(
+                    itertools.repeat(constants[field]) if field in constants else part.values(field)
+                    for field in fields
+                )))
+            output.write(text)
+
+    def write_students(self, students):
+        self.write_rows("students", [[
+            student["id"],
+            student["name"],
+            student["enrollmentDate"],
+            student["expectedGraduation"],
+            student["learningStyle"],
+            student["preferredCourseLoad"],
+            student["preferredPace"],
+            student["workHoursPerWeek"],
+            student["financialAidStatus"],
+            student["preferredInstructionMode"]
+        ] for student in students])
+
+    def write_faculty(self, faculty_members):
+        self.write_rows("faculty", [[
+            faculty["id"],
+            faculty["name"],
+            faculty["department"],
+            ";".join(faculty["teachingStyle"]),
+            faculty["avgRating"]
+        ] for faculty in faculty_members])
+
+    def write_terms(self, terms):
+        for term in terms:
+            self.term_ids_by_type[term["type"]].append(term["id"])
+
+        self.write_rows("terms", [[
+            term["id"],
+            term["name"],
+            term["startDate"],
+            term["endDate"],
+            term["type"]
+        ] for term in terms])
+
+    def write_courses(self, courses):
+        """
+        Write course nodes and their OFFERED_IN relationships (terms must be written first).
+        """
+        self.write_rows("courses", [[
+            course["id"],
+            course["name"],
+            course["department"],
+            course["credits"],
+            course["level"],
+            course["avgDifficulty"],
+            course["avgTimeCommitment"],
+            ";".join(course["termAvailability"]),
+            ";".join(course["instructionModes"]),
+            ";".join(course.get("tags", [])),
+            course.get("visualLearnerSuccess", ""),
+            course.get("auditoryLearnerSuccess", ""),
+            course.get("kinestheticLearnerSuccess", ""),
+            course.get("readingLearnerSuccess", "")
+        ] for course in courses])
+
+        # Course - Term, for each matching term
+        self.write_rows("course_term", [[
+            course["id"],
+            term_id,
+            "OFFERED_IN"
+        ] for course in courses
+          for term_type in course["termAvailability"]
+          for term_id in self.term_ids_by_type[term_type]])
+
+    def write_course_term(self, offerings):
+        self.write_rows("course_term", [[
+            offering["courseId"],
+            offering["termId"],
+            "OFFERED_IN"
+        ] for offering in offerings])
+
+    def write_degrees(self, degrees):
+        self.write_rows("degrees", [[
+            degree["id"],
+            degree["name"],
+            degree["department"],
+            degree["type"],
+            degree["totalCreditsRequired"],
+            degree["coreCreditsRequired"],
+            degree["electiveCreditsRequired"]
+        ] for degree in degrees])
+
+    def write_requirement_groups(self, requirement_groups):
+        self.write_rows("requirement_groups", [[
+            req["id"],
+            req["name"],
+            req["description"],
+            req["minimumCourses"],
+            req["minimumCredits"]
+        ] for req in requirement_groups])
+
+        # Requirement Group - Degree
+        self.write_rows("requirement_degree", [[
+            req["id"],
+            req["degreeId"],
+            "PART_OF"
+        ] for req in requirement_groups])
+
+        # Course - Requirement Group
+        self.write_rows("course_requirement", [[
+            course_id,
+            req["id"],
+            "FULFILLS"
+        ] for req in requirement_groups for course_id in req["courses"]])
+
+    def write_prerequisites(self, prerequisites):
+        self.write_rows("prerequisites", [[
+            prereq["source"],
+            prereq["target"],
+            "PREREQUISITE_FOR",
+            prereq["strength"],
+            prereq.get("minGrade", "")
+        ] for prereq in prerequisites])
+
+    def write_leads_to(self, leads_to):
+        self.write_rows("leads_to", [[
+            lead["source"],
+            lead["target"],
+            "LEADS_TO",
+            lead["commonality"],
+            lead["successCorrelation"]
+        ] for lead in leads_to])
+
+    def write_similarity_content(self, similarity_content):
+        self.write_rows("similarity_content", [[
+            sim["source"],
+            sim["target"],
+            "SIMILAR_CONTENT",
+            sim["similarity"]
+        ] for sim in similarity_content])
+
+    def write_similarity_difficulty(self, similarity_difficulty):
+        self.write_rows("similarity_difficulty", [[
+            sim["source"],
+            sim["target"],
+            "SIMILAR_DIFFICULTY",
+            sim["similarity"]
+        ] for sim in similarity_difficulty])
+
+    def write_student_degree(self, student_degree):
+        self.write_rows("student_degree", [[
+            rel["studentId"],
+            rel["degreeId"],
+            "PURSUING"
+        ] for rel in student_degree])
+
+    def write_teaching(self, teaching):
+        self.write_rows("teaching", [[
+            teach["facultyId"],
+            teach["courseId"],
+            "TEACHES",
+            ";".join(teach["terms"])
+        ] for teach in teaching])
+
+    def write_completed_courses(self, completed_courses):
+        self.write_rows("completed_courses", [[
+            comp["studentId"],
+            comp["courseId"],
+            "COMPLETED",
+            comp["term"],
+            comp["grade"],
+            comp["difficulty"],
+            comp["timeSpent"],
+            comp["instructionMode"],
+            "true" if comp["enjoyment"] else "false"
+        ] for comp in completed_courses])
+
+    def write_enrolled_courses(self, enrolled_courses):
+        self.write_rows("enrolled_courses", [[
+            enroll["studentId"],
+            enroll["courseId"],
+            "ENROLLED_IN"
+        ] for enroll in enrolled_courses])
+
+    def write_learning_style_similarity(self, learning_style_similarity):
+        self.write_rows("learning_style_similarity", [[
+            sim["sourceId"],
+            sim["targetId"],
+            "SIMILAR_LEARNING_STYLE",
+            sim["similarity"]
+        ] for sim in learning_style_similarity])
+
+    def write_performance_similarity(self, performance_similarity):
+        self.write_rows("performance_similarity", [[
+            sim["sourceId"],
+            sim["targetId"],
+            "SIMILAR_PERFORMANCE",
+            sim["similarity"],
+            ";".join(sim["courses"])
+        ] for sim in performance_similarity])
+
+    def write_textbooks(self, textbooks):
+        self.write_rows("textbooks", [[
+            textbook["id"],
+            textbook["name"],
+            textbook["publisher"],
+            textbook["price"],
+            textbook["pages"],
+            textbook["edition"],
+            textbook["publicationYear"],
+            textbook["isbn"],
+            textbook["category"]
+        ] for textbook in textbooks])
+
+    def write_course_textbooks(self, course_textbooks):
+        self.write_rows("course_textbooks", [[
+            rel["courseId"],
+            rel["textbookId"],
+            "REQUIRES" if rel["isRequired"] else "RECOMMENDS",
+            rel["isRequired"],
+            rel["recommendedOrder"]
+        ] for rel in course_textbooks])
+
+    def write_page_views(self, page_views):
+        if isinstance(page_views, ColumnarBatch):
+            self.write_batch("page_views", page_views, [
+                "studentId", "textbookId", ":TYPE", "courseId", "pageNumber", "timestamp", "duration"
+            ], {":TYPE": "VIEWED_PAGE"})
+            return
         
-        for interaction in data["textbook_interactions"]:
-            writer.writerow([
-                interaction["studentId"],
-                interaction["textbookId"],
-                "INTERACTED_WITH",
-                interaction["courseId"],
-                interaction["interactionType"],
-                interaction["timestamp"],
-                interaction["duration"]
-            ])
+        self.write_rows("page_views", [[
+            view["studentId"],
+            view["textbookId"],
+            "VIEWED_PAGE",
+            view["courseId"],
+            view["pageNumber"],
+            view["timestamp"],
+            view["duration"]
+        ] for view in page_views])
+
+    def write_textbook_interactions(self, textbook_interactions):
+        if isinstance(textbook_interactions, ColumnarBatch):
+            self.write_batch("textbook_interactions", textbook_interactions, [
+                "studentId", "textbookId", ":TYPE", "courseId", "interactionType", "timestamp", "duration"
+            ], {":TYPE": "INTERACTED_WITH"})
+            return
+        
+        self.write_rows("textbook_interactions", [[
+            interaction["studentId"],
+            interaction["textbookId"],
+            "INTERACTED_WITH",
+            interaction["courseId"],
+            interaction["interactionType"],
+            interaction["timestamp"],
+            interaction["duration"]
+        ] for interaction in textbook_interactions])
+
+COLUMNAR_DIR = "columnar"  # Under the output directory
+
+# Record fields and column kinds of every columnar table. "string" columns are
+# int32 codes into a per-column dictionary (missing values are ""), numbers are
+# typed arrays (missing floats are NaN) and dates/timestamps are datetime64
+COLUMNAR_TABLES = {
+    "students": {
+        "id": "string", "name": "string", "enrollmentDate": "date", "expectedGraduation": "date",
+        "learningStyle": "string", "preferredCourseLoad": "int", "preferredPace": "string",
+        "workHoursPerWeek": "int", "financialAidStatus": "string", "preferredInstructionMode": "string"
+    },
+    "faculty": {
+        "id": "string", "name": "string", "department": "string", "teachingStyle": "string_list",
+        "avgRating": "float"
+    },
+    "terms": {"id": "string", "name": "string", "startDate": "date", "endDate": "date", "type": "string"},
+    "courses": {
+        "id": "string", "name": "string", "department": "string", "credits": "int", "level": "int",
+        "avgDifficulty": "int", "avgTimeCommitment": "int", "termAvailability": "string_list",
+        "instructionModes": "string_list", "tags": "string_list", "visualLearnerSuccess": "float",
+        "auditoryLearnerSuccess": "float", "kinestheticLearnerSuccess": "float",
+        "readingLearnerSuccess": "float"
+    },
+    "textbooks": {
+        "id": "string", "name": "string", "publisher": "string", "price": "float", "pages": "int",
+        "edition": "int", "publicationYear": "int", "isbn": "string", "category": "string"
+    },
+    "course_textbooks": {"courseId": "string", "textbookId": "string", "isRequired": "bool", "recommendedOrder": "int"},
+    "degrees": {
+        "id": "string", "name": "string", "department": "string", "type": "string",
+        "totalCreditsRequired": "int", "coreCreditsRequired": "int", "electiveCreditsRequired": "int"
+    },
+    "requirement_groups": {
+        "id": "string", "name": "string", "description": "string", "minimumCourses": "int",
+        "minimumCredits": "int", "degreeId": "string", "courses": "string_list"
+    },
+    "prerequisites": {"source": "string", "target": "string", "strength": "string", "minGrade": "string"},
+    "leads_to": {"source": "string", "target": "string", "commonality": "float", "successCorrelation": "float"},
+    "similarity_content": {"source": "string", "target": "string", "similarity": "float"},
+    "similarity_difficulty": {"source": "string", "target": "string", "similarity": "float"},
+    "teaching": {"facultyId": "string", "courseId": "string", "terms": "string_list"},
+    "completed_courses": {
+        "studentId": "string", "courseId": "string", "term": "string", "grade": "string",
+        "difficulty": "int", "timeSpent": "int", "instructionMode": "string", "enjoyment": "bool"
+    },
+    "enrolled_courses": {"studentId": "string", "courseId": "string", "term": "string"},
+    "student_degree": {"studentId": "string", "degreeId": "string"},
+    "learning_style_similarity": {"sourceId": "string", "targetId": "string", "similarity": "float"},
+    "performance_similarity": {
+        "sourceId": "string", "targetId": "string", "similarity": "float", "courses": "string_list"
+    },
+    "page_views": {
+        "studentId": "string", "textbookId": "string", "courseId": "string", "pageNumber": "int",
+        "timestamp": "timestamp", "duration": "int"
+    },
+    "textbook_interactions": {
+        "studentId": "string", "textbookId": "string", "courseId": "string", "interactionType": "string",
+        "timestamp": "timestamp", "duration": "int"
+    }
+}
+
+# NumPy dtype of each column kind (string columns hold dictionary codes)
+COLUMNAR_DTYPES = {
+    "string": "int32", "string_list": "int32", "int": "int32", "float": "float64",
+    "bool": "bool", "date": "datetime64[D]", "timestamp": "datetime64[s]"
+}
+
+NPY_HEADER_BYTES = 128  # Fixed, so the header can be rewritten with the final row count
+
+def write_npy_header(f, dtype, length):
+    """
+    Write a version 1.0 .npy header for a 1-D array, padded to NPY_HEADER_BYTES.
+    """
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (
+        np.lib.format.dtype_to_descr(np.dtype(dtype)), length
+    )
+    header = header.ljust(NPY_HEADER_BYTES - 11) + "\n"
+    f.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1"))
+
+class NpyColumnFile:
+    """
+    A 1-D .npy file appended to in blocks; the header is finalized on close.
+    """
+
+    def __init__(self, path, dtype):
+        self.file = open(path, "wb")
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        write_npy_header(self.file, self.dtype, 0)
+
+    def append(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        self.file.write(values.tobytes())
+        self.length += len(values)
+
+    def close(self):
+        self.file.seek(0)
+        write_npy_header(self.file, self.dtype, self.length)
+        self.file.close()
+
+class StringDictionary:
+    """
+    Intern strings as int32 codes in first-seen order.
+    """
+
+    def __init__(self):
+        self.codes = {}
+
+    def encode(self, values):
+        codes = self.codes
+        for value in values:
+            if value not in codes:
+                codes[value] = len(codes)
+        return np.array([codes[value] for value in values], dtype=np.int32)
+
+    def values(self):
+        return list(self.codes)
+
+def encode_columnar_batch(records, kinds, dictionaries):
+    """
+    Encode records (a list of dicts or a ColumnarBatch) into typed arrays per
+    column. Strings become codes into dictionaries[name]; list columns become
+    (lengths, item codes).
+    """
+    encoded = {}
+    for name, kind in kinds.items():
+        if isinstance(records, ColumnarBatch) and name in records.dictionaries:
+            # Recode the batch's own dictionary once instead of every row
+            recode = dictionaries[name].encode(records.dictionaries[name].tolist())
+            encoded[name] = recode[records.columns[name]]
+            continue
+
+        if isinstance(records, ColumnarBatch):
+            values = records.columns[name]
+        else:
+            values = [record.get(name) for record in records]
+
+        if kind == "string":
+            encoded[name] = dictionaries[name].encode(["" if value is None else value for value in values])
+        elif kind == "string_list":
+            lists = [value or [] for value in values]
+            encoded[name] = (
+                np.array([len(items) for items in lists], dtype=np.int64),
+                dictionaries[name].encode([item for items in lists for item in items])
+            )
+        elif kind == "float":
+            encoded[name] = np.array([np.nan if value in (None, "") else value for value in values], dtype=np.float64)
+        else:
+            encoded[name] = np.asarray(values, dtype=COLUMNAR_DTYPES[kind])
+    return encoded
+
+class NpyTableWriter:
+    """
+    Write one table as a directory of .npy files: <column>.npy holds values or
+    dictionary codes, <column>.dictionary.npy the dictionary of a string
+    column and <column>.offsets.npy the row boundaries of a list column.
+    """
+
+    def __init__(self, directory, kinds):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.kinds = kinds
+        self.columns = {
+            name: NpyColumnFile(os.path.join(directory, f"{name}.npy"), COLUMNAR_DTYPES[kind])
+            for name, kind in kinds.items()
+        }
+        self.offsets = {}
+        for name, kind in kinds.items():
+            if kind == "string_list":
+                self.offsets[name] = NpyColumnFile(os.path.join(directory, f"{name}.offsets.npy"), "int64")
+                self.offsets[name].append([0])
+
+    def append(self, encoded):
+        for name, values in encoded.items():
+            if name in self.offsets:
+                lengths, values = values
+                self.offsets[name].append(self.columns[name].length + np.cumsum(lengths))
+            self.columns[name].append(values)
+
+    def close(self, dictionaries):
+        for column in itertools.chain(self.columns.values(), self.offsets.values()):
+            column.close()
+        for name, kind in self.kinds.items():
+            if kind in ("string", "string_list"):
+                np.save(os.path.join(self.directory, f"{name}.dictionary.npy"),
+                        np.array(dictionaries[name].values(), dtype=str))
+
+class ParquetTableWriter:
+    """
+    Write one table as a Parquet file, one row group per block. String columns
+    are Arrow dictionary columns, so they read back as categoricals.
+    """
+
+    def __init__(self, path, kinds):
+        arrow_types = {
+            "string": pa.dictionary(pa.int32(), pa.string()), "string_list": pa.list_(pa.string()),
+            "int": pa.int32(), "float": pa.float64(), "bool": pa.bool_(),
+            "date": pa.date32(), "timestamp": pa.timestamp("s")
+        }
+        self.kinds = kinds
+        self.schema = pa.schema([(name, arrow_types[kind]) for name, kind in kinds.items()])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.dictionaries = None
+
+    def append(self, encoded, dictionaries):
+        arrays = []
+        for name, kind in self.kinds.items():
+            values = encoded[name]
+            if kind == "string":
+                # Row groups carry only the dictionary values they use
+                uniques, codes = np.unique(values, return_inverse=True)
+                all_values = dictionaries[name].values()
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(codes.astype(np.int32)), pa.array([all_values[code] for code in uniques.tolist()], pa.string())
+                ))
+            elif kind == "string_list":
+                lengths, codes = values
+                all_values = dictionaries[name].values()
+                offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+                arrays.append(pa.ListArray.from_arrays(
+                    pa.array(offsets), pa.array([all_values[code] for code in codes.tolist()], pa.string())
+                ))
+            else:
+                arrays.append(pa.array(values))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self, dictionaries):
+        self.writer.close()
+
+class ColumnarSink:
+    """
+    Stream records into typed, dictionary-encoded columnar tables under
+    output_dir: a Parquet file per table with format="parquet" (needs
+    pyarrow), otherwise an .npy directory per table (NumPy only, see
+    load_columnar_table). schema.json lists every table's rows and columns.
+    """
+
+    def __init__(self, output_dir, format="npy", keys=None):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.format = format
+        self.keys = keys
+        self.tables = {}
+        self.dictionaries = {}
+        self.rows = defaultdict(int)
+
+    def table(self, key):
+        if key not in self.tables:
+            kinds = COLUMNAR_TABLES[key]
+            if self.format == "parquet":
+                self.tables[key] = ParquetTableWriter(os.path.join(self.output_dir, f"{key}.parquet"), kinds)
+            else:
+                self.tables[key] = NpyTableWriter(os.path.join(self.output_dir, key), kinds)
+            self.dictionaries[key] = {name: StringDictionary() for name in kinds}
+        return self.tables[key]
+
+    def write(self, key, records):
+        if key not in COLUMNAR_TABLES or (self.keys is not None and key not in self.keys) or not len(records):
+            return
+
+        table = self.table(key)
+        encoded = encode_columnar_batch(records, COLUMNAR_TABLES[key], self.dictionaries[key])
+        if self.format == "parquet":
+            table.append(encoded, self.dictionaries[key])
+        else:
+            table.append(encoded)
+        self.rows[key] += len(records)
+
+    def close(self):
+        for key, table in self.tables.items():
+            table.close(self.dictionaries[key])
+
+        schema = {
+            "format": self.format,
+            "tables": {
+                key: {"rows": self.rows[key], "columns": COLUMNAR_TABLES[key]} for key in self.tables
+            }
+        }
+        with open(os.path.join(self.output_dir, "schema.json"), "w") as f:
+            json.dump(schema, f, indent=2)
+
+def load_columnar_table(directory, key, mmap=True):
+    """
+    Load a table written by ColumnarSink in the .npy layout as a ColumnarBatch
+    (memory-mapped by default, so opening even large tables is instant).
+    Use batch.values(name) or batch.to_records() for plain Python values.
+    """
+    with open(os.path.join(directory, "schema.json")) as f:
+        kinds = json.load(f)["tables"][key]["columns"]
+
+    mmap_mode = "r" if mmap else None
+    columns, dictionaries, offsets = {}, {}, {}
+    for name, kind in kinds.items():
+        path = os.path.join(directory, key, name)
+        columns[name] = np.load(f"{path}.npy", mmap_mode=mmap_mode)
+        if kind in ("string", "string_list"):
+            dictionaries[name] = np.load(f"{path}.dictionary.npy")
+        if kind == "string_list":
+            offsets[name] = np.load(f"{path}.offsets.npy", mmap_mode=mmap_mode)
+    return ColumnarBatch(columns, dictionaries, offsets)
+
+class DatasetSinks:
+    """
+    Fan records out to several sinks and count the rows written per key.
+    """
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+        self.row_counts = defaultdict(int)
+
+    def write(self, key, records):
+        self.row_counts[key] += len(records)
+        with profile_stage(f"export_{key}") as stage:
+            stage["rows"] = len(records)
+            for sink in self.sinks:
+                sink.write(key, records)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+# Terms are written before courses, because course rows link to term IDs
+EXPORT_KEY_ORDER = [
+    "students", "faculty", "terms", "courses", "degrees", "requirement_groups",
+    "prerequisites", "leads_to", "similarity_content", "similarity_difficulty",
+    "student_degree", "teaching", "completed_courses", "enrolled_courses",
+    "learning_style_similarity", "performance_similarity", "textbooks",
+    "course_textbooks", "page_views", "textbook_interactions"
+]
+
+def export_data(data, sink):
+    """
+    Write an in-memory data dictionary to a sink and close it.
+    """
+    for key in EXPORT_KEY_ORDER:
+        if key in data:
+            sink.write(key, data[key])
+    sink.close()
+
+def export_to_cypher(data, output_dir):
+    """
+    Export data to Cypher script files.
+    """
+    export_data(data, CypherSink(output_dir))
+
+def export_to_csv(data, output_dir):
+    """
+    Export data to CSV files for Neo4j Import.
+    """
+    export_data(data, CsvSink(output_dir))
+
+# neo4j-admin import arguments: (option, label or relationship types, CsvSink key)
+NEO4J_IMPORT_FILES = [
+    ("nodes", "Student", "students"),
+    ("nodes", "Faculty", "faculty"),
+    ("nodes", "Course", "courses"),
+    ("nodes", "Degree", "degrees"),
+    ("nodes", "Term", "terms"),
+    ("nodes", "RequirementGroup", "requirement_groups"),
+    ("nodes", "Textbook", "textbooks"),
+    ("relationships", "PREREQUISITE_FOR", "prerequisites"),
+    ("relationships", "LEADS_TO", "leads_to"),
+    ("relationships", "SIMILAR_CONTENT", "similarity_content"),
+    ("relationships", "SIMILAR_DIFFICULTY", "similarity_difficulty"),
+    ("relationships", "PURSUING", "student_degree"),
+    ("relationships", "TEACHES", "teaching"),
+    ("relationships", "COMPLETED", "completed_courses"),
+    ("relationships", "ENROLLED_IN", "enrolled_courses"),
+    ("relationships", "SIMILAR_LEARNING_STYLE", "learning_style_similarity"),
+    ("relationships", "SIMILAR_PERFORMANCE", "performance_similarity"),
+    ("relationships", "PART_OF", "requirement_degree"),
+    ("relationships", "FULFILLS", "course_requirement"),
+    ("relationships", "OFFERED_IN", "course_term"),
+    ("relationships", "REQUIRES,RECOMMENDS", "course_textbooks"),
+    ("relationships", "VIEWED_PAGE", "page_views"),
+    ("relationships", "INTERACTED_WITH", "textbook_interactions")
+]
 
-def generate_neo4j_import_script(output_dir):
+def generate_neo4j_import_script(output_dir, csv_files=None):
     """
     Generate a shell script to import the CSV files into Neo4j.
     The script is idempotent - it will destroy and recreate the target database.
+    csv_files maps CsvSink keys to their file names, header file first
+    (CsvSink.filenames); by default every key has its one plain CSV file.
     """
     script_path = os.path.join(output_dir, "import_to_neo4j.sh")
+    if csv_files is None:
+        csv_files = {key: [filename] for key, (filename, _) in CsvSink.FILES.items()}
+    
+    required_files = "\n".join(
+        f'    "{filename}"' for _, _, key in NEO4J_IMPORT_FILES for filename in csv_files[key]
+    )
+    import_arguments = "".join(
+        f'  --{option}="{target}=' + ",".join(f"$IMPORT_DIR/{filename}" for filename in csv_files[key]) + '" \\\n'
+        for option, target, key in NEO4J_IMPORT_FILES
+    )
     
     with open(script_path, "w") as f:
         f.write("""#!/bin/bash
@@ -2120,14 +4502,7 @@ fi
 
 # Check for required CSV files
 required_files=(
-    "students.csv" "faculty.csv" "courses.csv" "degrees.csv" "terms.csv"
-    "requirement_groups.csv" "textbooks.csv" "prerequisites.csv" "leads_to.csv"
-    "course_similarity_content.csv" "course_similarity_difficulty.csv"
-    "student_degree.csv" "teaching.csv" "completed_courses.csv"
-    "enrolled_courses.csv" "learning_style_similarity.csv"
-    "performance_similarity.csv" "requirement_degree.csv"
-    "course_requirement.csv" "course_term.csv" "course_textbooks.csv"
-    "page_views.csv" "textbook_interactions.csv"
+{required_files}
 )
 
 for file in "${required_files[@]}"; do
@@ -2153,30 +4528,7 @@ echo "Creating fresh database..."
 
 # Run the import command with proper quoting
 "$NEO4J_HOME/bin/neo4j-admin" database import full \\
-  --nodes="Student=$IMPORT_DIR/students.csv" \\
-  --nodes="Faculty=$IMPORT_DIR/faculty.csv" \\
-  --nodes="Course=$IMPORT_DIR/courses.csv" \\
-  --nodes="Degree=$IMPORT_DIR/degrees.csv" \\
-  --nodes="Term=$IMPORT_DIR/terms.csv" \\
-  --nodes="RequirementGroup=$IMPORT_DIR/requirement_groups.csv" \\
-  --nodes="Textbook=$IMPORT_DIR/textbooks.csv" \\
-  --relationships="PREREQUISITE_FOR=$IMPORT_DIR/prerequisites.csv" \\
-  --relationships="LEADS_TO=$IMPORT_DIR/leads_to.csv" \\
-  --relationships="SIMILAR_CONTENT=$IMPORT_DIR/course_similarity_content.csv" \\
-  --relationships="SIMILAR_DIFFICULTY=$IMPORT_DIR/course_similarity_difficulty.csv" \\
-  --relationships="PURSUING=$IMPORT_DIR/student_degree.csv" \\
-  --relationships="TEACHES=$IMPORT_DIR/teaching.csv" \\
-  --relationships="COMPLETED=$IMPORT_DIR/completed_courses.csv" \\
-  --relationships="ENROLLED_IN=$IMPORT_DIR/enrolled_courses.csv" \\
-  --relationships="SIMILAR_LEARNING_STYLE=$IMPORT_DIR/learning_style_similarity.csv" \\
-  --relationships="SIMILAR_PERFORMANCE=$IMPORT_DIR/performance_similarity.csv" \\
-  --relationships="PART_OF=$IMPORT_DIR/requirement_degree.csv" \\
-  --relationships="FULFILLS=$IMPORT_DIR/course_requirement.csv" \\
-  --relationships="OFFERED_IN=$IMPORT_DIR/course_term.csv" \\
-  --relationships="REQUIRES,RECOMMENDS=$IMPORT_DIR/course_textbooks.csv" \\
-  --relationships="VIEWED_PAGE=$IMPORT_DIR/page_views.csv" \\
-  --relationships="INTERACTED_WITH=$IMPORT_DIR/textbook_interactions.csv" \\
-  --delimiter="," \\
+{import_arguments}  --delimiter="," \\
   --array-delimiter=";" \\
   --ignore-empty-strings=true \\
   --ignore-extra-columns=true \\
@@ -2195,7 +4547,7 @@ else
     echo "Import failed. Check the error messages above for details."
     exit 1
 fi
-""")
+""".replace("{required_files}", required_files).replace("{import_arguments}", import_arguments))
     
     # Make the script executable
     os.chmod(script_path, 0o755)
@@ -2243,6 +4595,10 @@ Execute the Cypher scripts in numerical order using the Neo4j Browser or Cypher-
 cat 00_indexes.cypher 01_students.cypher 02_faculty.cypher [...] | bin/cypher-shell -u neo4j -p [password]
 ```
 
+Scripts generated with `--cypher-format unwind` create rows in batches: each
+`:param {rows: [...]}` line is followed by an `UNWIND $rows AS row` statement,
+so they must be run through cypher-shell. This is much faster for large datasets.
+
 ### Option 2: Bulk Import (Faster)
 
 1. Stop your Neo4j server
@@ -2250,6 +4606,55 @@ cat 00_indexes.cypher 01_students.cypher 02_faculty.cypher [...] | bin/cypher-sh
 3. Run the script: `./import_to_neo4j.sh`
 4. Update your neo4j.conf to use the imported database
 
+Datasets generated with `--csv-compression gzip` have `.csv.gz` files, and
+with `--csv-chunks N` the page view, interaction and completed course files
+are split into a header file plus N parts. The import script lists exactly
+the files that were written, and neo4j-admin reads the parts in parallel.
+
+The import skips duplicate nodes and relationships to missing nodes without
+failing, so check the files first with `validate_dataset.py` (next to the
+generator). It reads every file once and reports bad values, duplicate IDs
+and dangling relationships, exiting with status 1 on any problem:
+
+```
+python validate_dataset.py csv/
+```
+
+### Option 3: Bulk Load into a Running Database
+
+`load_to_neo4j.py` (next to the generator) loads the CSV files over bolt using
+batched UNWIND transactions, without stopping Neo4j. It reads the
+NEO4J_URI, NEO4J_USER and NEO4J_PASSWORD environment variables:
+
+```
+python load_to_neo4j.py csv/ --batch-size 5000 --workers 4
+```
+
+## Columnar Tables
+
+With `--columnar`, every node and relationship list is also written to
+`columnar/` with typed columns: numbers and dates keep their types and
+strings are stored as integer codes into a per-column dictionary.
+`schema.json` lists each table's row count and column types. Parquet
+tables (`<table>.parquet`, written when pyarrow is installed) read with
+pandas or pyarrow. The NumPy layout (`<table>/<column>.npy`) loads
+memory-mapped through the generator:
+
+```
+from generate_synthetic_dataset import load_columnar_table
+views = load_columnar_table("columnar", "page_views")
+views.columns["duration"].mean(), views.values("studentId")[:5]
+```
+
+## Incremental Updates
+
+`generate_synthetic_dataset.py --output-dir <this directory> --advance-terms N`
+simulates N more terms: current enrollments are completed, students enroll
+in the next term and the finished term gets its textbook activity. Each term
+is written to `deltas/NN_<Term>/` with only the new nodes and relationships.
+Apply the delta Cypher scripts in order with cypher-shell; they use MERGE, so
+re-running one is harmless, and completed courses replace their ENROLLED_IN.
+
 ## Sample Queries
 
 See the accompanying documentation for sample queries that demonstrate using
@@ -2463,14 +4868,373 @@ LIMIT 20
 </html>
 """)
 
+# =============================================================================
+#                           INCREMENTAL GENERATION
+# =============================================================================
+
+DELTA_DIR = "deltas"  # Under the output directory, one subdirectory per advanced term
+
+# Delta scripts MERGE instead of CREATE, so applying one twice is harmless;
+# completing a course also removes the ENROLLED_IN relationship it replaces
+DELTA_STATEMENTS = {
+    "terms": ("terms", """UNWIND $rows AS row
+MERGE (t:Term {id: row.id})
+SET t += row, t.startDate = date(row.startDate), t.endDate = date(row.endDate);"""),
+    "completed_courses": ("completed_courses", """UNWIND $rows AS row
+MATCH (s:Student {id: row.studentId}), (c:Course {id: row.courseId})
+MERGE (s)-[r:COMPLETED {term: row.term}]->(c)
+SET r += row {.grade, .difficulty, .timeSpent, .instructionMode, .enjoyment}
+WITH s, c
+OPTIONAL MATCH (s)-[e:ENROLLED_IN]->(c)
+DELETE e;"""),
+    "enrolled_courses": ("enrolled_courses", """UNWIND $rows AS row
+MATCH (s:Student {id: row.studentId}), (c:Course {id: row.courseId})
+MERGE (s)-[:ENROLLED_IN]->(c);"""),
+    "course_term": ("course_term", """UNWIND $rows AS row
+MATCH (c:Course {id: row.courseId}), (t:Term {id: row.termId})
+MERGE (c)-[:OFFERED_IN]->(t);""")
+}
+
+# Keys written to every delta, terms before the relationships that use them
+DELTA_KEYS = [
+    "terms", "course_term", "completed_courses", "enrolled_courses",
+    "page_views", "textbook_interactions"
+]
+
+class CypherDeltaSink(CypherBatchSink):
+    """
+    Stream delta records into batched UNWIND scripts that MERGE them into an
+    existing database (constraints already exist, so no 00_indexes.cypher).
+    """
+
+    STATEMENTS = DELTA_STATEMENTS
+    SCHEMA = None
+
+# Typed CSV columns ("pages:int") and ';'-joined list columns read back as state
+CSV_TYPE_PARSERS = {"int": int, "float": float, "boolean": lambda value: value == "true"}
+CSV_LIST_FIELDS = {"termAvailability", "instructionModes", "tags"}
+
+# Record keys for the start/end ID columns of relationship files read back as state
+STATE_ID_FIELDS = {
+    "prerequisites": ("source", "target"),
+    "course_textbooks": ("courseId", "textbookId"),
+    "completed_courses": ("studentId", "courseId"),
+    "enrolled_courses": ("studentId", "courseId")
+}
+
+def read_csv_records(paths, id_fields=()):
+    """
+    Read records back from the CSV files CsvSink wrote for one key: a file
+    with a header row, or a header file followed by its (gzipped) parts.
+    Typed columns and list columns are converted, empty typed values are left
+    out, relationship start/end IDs get the keys in id_fields and :TYPE
+    columns are dropped.
+    """
+    columns = None
+    for path in paths:
+        with open_csv_file(path) as f:
+            reader = csv.reader(f)
+            if columns is None:
+                columns = []
+                for column in next(reader):
+                    name, _, kind = column.partition(":")
+                    if kind.startswith("START_ID"):
+                        name = id_fields[0]
+                    elif kind.startswith("END_ID"):
+                        name = id_fields[1]
+                    elif kind == "TYPE":
+                        name = None
+                    columns.append((name, CSV_TYPE_PARSERS.get(kind)))
+
+            for row in reader:
+                record = {}
+                for (name, parse), value in zip(columns, row):
+                    if name is None or (value == "" and parse is not None):
+                        continue
+                    if name in CSV_LIST_FIELDS:
+                        value = value.split(";") if value else []
+                    elif parse is not None:
+                        value = parse(value)
+                    record[name] = value
+                yield record
+
+def load_dataset_state(output_dir):
+    """
+    Load what advancing a generated dataset needs: the catalog, students,
+    every completed (student, course) pair and the current enrollments.
+    State is the base CSV files plus every delta in the manifest, in order;
+    page views and interactions are never read back.
+    """
+    with open(os.path.join(output_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    manifest.setdefault("deltas", [])
+
+    def read(key, directory=os.path.join(output_dir, "csv"), csv_files=manifest.get("csvFiles", {})):
+        # Deltas are always plain CSV files; the base files may be gzipped or chunked
+        filenames = csv_files.get(key, [CsvSink.FILES[key][0]])
+        paths = [os.path.join(directory, filename) for filename in filenames]
+        return read_csv_records(paths, STATE_ID_FIELDS.get(key, ()))
+
+    terms = list(read("terms"))
+    completed = [(comp["studentId"], comp["courseId"]) for comp in read("completed_courses")]
+    enrolled = list(read("enrolled_courses"))
+    for delta in manifest["deltas"]:
+        delta_csv_dir = os.path.join(output_dir, delta["directory"], "csv")
+        terms.extend(read("terms", delta_csv_dir, {}))
+        completed.extend(
+            (comp["studentId"], comp["courseId"]) for comp in read("completed_courses", delta_csv_dir, {})
+        )
+        enrolled = list(read("enrolled_courses", delta_csv_dir, {}))
+
+    # History was generated relative to this date (the run date if none was pinned)
+    if manifest["deltas"]:
+        reference_date = manifest["deltas"][-1]["referenceDate"]
+    else:
+        reference_date = manifest["config"].get("REFERENCE_DATE") or manifest["generatedAt"][:10]
+
+    return {
+        "manifest": manifest,
+        "reference_date": reference_date,
+        "terms": terms,
+        "courses": list(read("courses")),
+        "prerequisites": list(read("prerequisites")),
+        "textbooks": list(read("textbooks")),
+        "course_textbooks": list(read("course_textbooks")),
+        "students": list(read("students")),
+        "completed": completed,
+        "enrolled": enrolled
+    }
+
+def advance_term(state, registry, taken):
+    """
+    Advance the dataset by one term: every current enrollment is completed,
+    students who have not graduated enroll in the next term, and the finished
+    term gets its textbook page views and interactions.
+    taken maps student IDs to the course positions they have taken and is
+    updated in place. Returns the next term and the delta records by key.
+    """
+    terms = state["terms"]
+    courses = state["courses"]
+    finished = registry.current_term
+    delta = {key: [] for key in DELTA_KEYS}
+
+    # The next term is a new Term node unless it was already generated
+    finished_index = terms.index(finished)
+    if finished_index + 1 < len(terms):
+        next_term = terms[finished_index + 1]
+    else:
+        next_term = following_term(finished)
+        terms.append(next_term)
+        registry.add_term(next_term)
+        delta["terms"].append(next_term)
+        delta["course_term"] = [
+            {"courseId": course["id"], "termId": next_term["id"]}
+            for course in courses if next_term["type"] in course["termAvailability"]
+        ]
+
+    def term_rng(stage):
+        return random.Random(f"{RANDOM_SEED}:{stage}:{next_term['id']}")
+
+    # Finish the current term
+    students_by_id = {student["id"]: student for student in state["students"]}
+    history_rng = term_rng("history")
+    gen = batch_generator(history_rng)
+    grades = GRADE_SAMPLER.stream(gen) if gen is not None else None
+    delta["completed_courses"] = [
+        generate_completion_record(
+            students_by_id[enroll["studentId"]], registry.courses[enroll["courseId"]], finished["id"],
+            history_rng, grades
+        )
+        for enroll in state["enrolled"]
+    ]
+
+    # Enroll students who have not graduated in the next term
+    prereq_positions = registry.history_index["prereq_positions"]
+    candidates = registry.history_index["courses_by_term_type"].get(next_term["type"], [])
+    for student in state["students"]:
+        if student["expectedGraduation"] < next_term["startDate"]:
+            continue
+
+        student_taken = taken[student["id"]]
+        num_courses = history_rng.randint(1, student["preferredCourseLoad"])
+        for position in sample_eligible_courses(
+            candidates, prereq_positions, student_taken, num_courses, history_rng
+        ):
+            student_taken.add(position)
+            delta["enrolled_courses"].append({
+                "studentId": student["id"],
+                "courseId": courses[position]["id"],
+                "term": next_term["id"]
+            })
+
+    # Textbook activity of the finished term
+    active_students = [
+        students_by_id[student_id]
+        for student_id in dict.fromkeys(comp["studentId"] for comp in delta["completed_courses"])
+    ]
+    if INTERACTION_ENGINE == "numpy":
+        delta["textbook_interactions"], delta["page_views"] = generate_textbook_interactions_vectorized(
+            active_students, state["textbooks"], terms, delta["completed_courses"],
+            registry, term_rng("interactions")
+        )
+    else:
+        delta["textbook_interactions"], delta["page_views"] = generate_textbook_interactions(
+            active_students, courses, state["textbooks"], state["course_textbooks"], terms,
+            delta["completed_courses"], term_rng("interactions"), registry
+        )
+
+    return next_term, delta
+
+def advance_dataset(output_dir, num_terms, cypher_batch_size=CYPHER_BATCH_SIZE):
+    """
+    Advance the dataset in output_dir by num_terms terms. Each term is written
+    to its own delta directory (MERGE Cypher scripts and CSV files holding
+    only the new nodes and relationships) and recorded in the manifest.
+    """
+    global REFERENCE_DATE
+
+    state = load_dataset_state(output_dir)
+    manifest = state["manifest"]
+    apply_config(manifest["config"])
+    if INTERACTION_ENGINE == "numpy" and np is None:
+        raise SystemExit("This dataset was generated with the numpy interaction engine, which requires NumPy")
+    REFERENCE_DATE = state["reference_date"]
+
+    registry = EntityRegistry(
+        state["terms"], state["courses"], state["textbooks"], state["course_textbooks"], state["prerequisites"]
+    )
+    positions = {course["id"]: i for i, course in enumerate(state["courses"])}
+    taken = defaultdict(set)
+    for student_id, course_id in state["completed"]:
+        taken[student_id].add(positions[course_id])
+    for enroll in state["enrolled"]:
+        taken[enroll["studentId"]].add(positions[enroll["courseId"]])
+
+    for _ in range(num_terms):
+        start_time = time.time()
+        finished = registry.current_term
+        next_term, delta = advance_term(state, registry, taken)
+
+        name = f"{len(manifest['deltas']) + 1:02d}_{next_term['id']}"
+        directory = os.path.join(DELTA_DIR, name)
+        print(f"Advancing from {finished['id']} to {next_term['id']} -> {directory}")
+
+        sinks = DatasetSinks([
+            CypherDeltaSink(os.path.join(output_dir, directory, "cypher"), cypher_batch_size),
+            CsvSink(os.path.join(output_dir, directory, "csv"), DELTA_KEYS)
+        ])
+        for key in DELTA_KEYS:
+            sinks.write(key, delta[key])
+        sinks.close()
+
+        # The next term is now the current one
+        state["enrolled"] = delta["enrolled_courses"]
+        REFERENCE_DATE = next_term["startDate"]
+        registry.current_term = next_term
+
+        manifest["deltas"].append({
+            "term": next_term["id"],
+            "directory": directory,
+            "referenceDate": REFERENCE_DATE,
+            "generatedAt": datetime.datetime.now().isoformat(timespec="seconds"),
+            "elapsedSeconds": round(time.time() - start_time, 2),
+            "rowCounts": dict(sinks.row_counts)
+        })
+        with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        for key in DELTA_KEYS:
+            print(f"- {sinks.row_counts[key]} {key}")
+
 # =============================================================================
 #                           MAIN FUNCTION
 # =============================================================================
 
-def main():
+def parse_args(argv=None):
+    """
+    Parse command line options.
+    """
+    parser = argparse.ArgumentParser(description="Generate the synthetic UMBC Neo4j dataset.")
+    parser.add_argument("--scale-factor", choices=list(SCALE_FACTOR_PRESETS),
+                        help="Size preset; SF1 is the default 500-student dataset")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED,
+                        help=f"Random seed (default: {RANDOM_SEED})")
+    parser.add_argument("--reference-date",
+                        help="Generate history as if today were YYYY-MM-DD (default: the real date, or "
+                             f"{SCALE_FACTOR_REFERENCE_DATE} when a scale factor is used)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR,
+                        help=f"Output directory (default: {OUTPUT_DIR})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for per-student generation; output is identical for any value "
+                             "(default: all cores)")
+    parser.add_argument("--cypher-format", choices=["per-row", "unwind"], default="per-row",
+                        help="Cypher scripts with one statement per row, or batched UNWIND statements "
+                             "(default: per-row)")
+    parser.add_argument("--cypher-batch-size", type=int, default=CYPHER_BATCH_SIZE,
+                        help=f"Rows per UNWIND statement (default: {CYPHER_BATCH_SIZE})")
+    parser.add_argument("--csv-compression", choices=["none", "gzip"], default="none",
+                        help="Compress the CSV files (neo4j-admin import reads .csv.gz) (default: none)")
+    parser.add_argument("--csv-chunks", type=int, default=1, metavar="N",
+                        help="Split " + ", ".join(CSV_CHUNKED_FILES) + " into N part files behind a "
+                             "header file, so neo4j-admin import can read them in parallel (default: 1)")
+    parser.add_argument("--csv-writers", type=int, default=CSV_WRITERS, metavar="N",
+                        help="Threads compressing and writing CSV files; output is identical for any "
+                             f"value (default: {CSV_WRITERS})")
+    parser.add_argument("--columnar", choices=["auto", "parquet", "npy"],
+                        help=f"Also write typed, dictionary-encoded tables to {COLUMNAR_DIR}/: Parquet files "
+                             "(needs pyarrow) or NumPy .npy directories; auto picks Parquet when pyarrow "
+                             "is installed")
+    parser.add_argument("--unique-names", action="store_true",
+                        help="Give every student and faculty member a distinct full name (a middle "
+                             "initial is added once first/last-name pairs run out)")
+    parser.add_argument("--interaction-engine", choices=["numpy", "python"], default=INTERACTION_ENGINE,
+                        help=f"Engine for textbook page views and interactions and for batched weighted draws "
+                             f"of student attributes and grades (default: {INTERACTION_ENGINE})")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Write per-stage wall time, CPU time, peak memory (tracemalloc) and rows per "
+                             "second to PATH as JSON; shard stages are only broken down with --workers 1")
+    parser.add_argument("--advance-terms", type=int, default=0, metavar="N",
+                        help="Instead of generating, advance the dataset in --output-dir by N terms and "
+                             f"write MERGE-based delta exports to {DELTA_DIR}/ (uses the manifest's configuration)")
+    parser.add_argument("--checkpoint-dir", metavar="DIR",
+                        help="Keep each stage's output in DIR keyed by the seed and the configuration it "
+                             "depends on, and reuse it instead of regenerating when nothing upstream changed "
+                             "(requires NumPy)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """
     Main function to run the data generation process.
     """
+    global OUTPUT_DIR, REFERENCE_DATE, INTERACTION_ENGINE, PROFILER, UNIQUE_NAMES
+    
+    args = parse_args(argv)
+    OUTPUT_DIR = args.output_dir
+    if args.advance_terms:
+        advance_dataset(OUTPUT_DIR, args.advance_terms, args.cypher_batch_size)
+        return
+    if args.interaction_engine == "numpy" and np is None:
+        raise SystemExit("--interaction-engine numpy requires NumPy (pip install numpy)")
+    INTERACTION_ENGINE = args.interaction_engine
+    UNIQUE_NAMES = args.unique_names or UNIQUE_NAMES
+    if args.scale_factor:
+        apply_scale_factor(args.scale_factor)
+        # Benchmark datasets must not depend on the day they are generated
+        REFERENCE_DATE = args.reference_date or SCALE_FACTOR_REFERENCE_DATE
+    elif args.reference_date:
+        REFERENCE_DATE = args.reference_date
+    seed_generators(args.seed)
+    if args.profile:
+        PROFILER = StageProfiler()
+    if args.columnar and np is None:
+        raise SystemExit("--columnar requires NumPy (pip install numpy)")
+    if args.columnar == "parquet" and pa is None:
+        raise SystemExit("--columnar parquet requires pyarrow (pip install pyarrow)")
+    if args.checkpoint_dir and np is None:
+        raise SystemExit("--checkpoint-dir requires NumPy (pip install numpy)")
+    checkpoints = CheckpointStore(args.checkpoint_dir)
+    start_time = time.time()
+    
     print("UMBC Neo4j Graph Database Generator")
     print("===================================")
     print(f"Generating synthetic data with:")
@@ -2478,93 +5242,174 @@ def main():
     print(f"- {NUM_COURSES} courses")
     print(f"- {NUM_FACULTY} faculty")
     print(f"- {NUM_DEGREES} degree programs")
+    print(f"- scale factor {SCALE_FACTOR}, seed {RANDOM_SEED}")
     
     # Create output directory
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
+    cypher_dir = os.path.join(OUTPUT_DIR, "cypher")
+    csv_dir = os.path.join(OUTPUT_DIR, "csv")
+    
+    # Records are streamed to the Cypher and CSV files as each stage finishes;
+    # only the catalog and small per-student lookups are kept in memory
+    if args.cypher_format == "unwind":
+        cypher_sink = CypherBatchSink(cypher_dir, args.cypher_batch_size)
+    else:
+        cypher_sink = CypherSink(cypher_dir)
+    csv_sink = CsvSink(csv_dir, compress=args.csv_compression == "gzip",
+                       chunks=args.csv_chunks, writers=args.csv_writers)
+    sinks = DatasetSinks([cypher_sink, csv_sink])
+    if args.columnar:
+        columnar_format = args.columnar
+        if columnar_format == "auto":
+            columnar_format = "parquet" if pa is not None else "npy"
+        sinks.sinks.append(ColumnarSink(os.path.join(OUTPUT_DIR, COLUMNAR_DIR), columnar_format))
+    
     # Generate the data
     print("\nGenerating terms...")
-    terms = generate_terms()
-    
-    print("Generating students...")
-    students = generate_students()
+    with profile_stage("generate_terms") as stage:
+        terms = checkpoints.run("terms", lambda: {"terms": generate_terms()})["terms"]
+        stage["rows"] = len(terms)
+    sinks.write("terms", terms)
     
     print("Generating faculty...")
-    faculty, faculty_by_dept = generate_faculty()
+    with profile_stage("generate_faculty") as stage:
+        name_pool = NamePool(population=NUM_STUDENTS + NUM_FACULTY if UNIQUE_NAMES else None)
+        # Unique faculty names are numbered after the students'
+        faculty = checkpoints.run(
+            "faculty", lambda: {"faculty": generate_faculty(name_pool)[0]}, ["terms"],
+            {"population": NUM_STUDENTS + NUM_FACULTY} if UNIQUE_NAMES else None
+        )["faculty"]
+        faculty_by_dept = group_by(faculty, "department")
+        stage["rows"] = len(faculty)
+    sinks.write("faculty", faculty)
     
     print("Generating courses...")
-    courses, dept_courses = generate_courses(faculty_by_dept)
+    with profile_stage("generate_courses") as stage:
+        course_ids = IdAllocator(random.Random(f"{RANDOM_SEED}:course-ids"))
+        courses = checkpoints.run(
+            "courses", lambda: {"courses": generate_courses(faculty_by_dept, course_ids)[0]}, ["faculty"]
+        )["courses"]
+        dept_courses = group_by(courses, "department")
+        stage["rows"] = len(courses)
+    sinks.write("courses", courses)
     
     print("Generating textbooks...")
-    textbooks, course_textbooks = generate_textbooks(courses)
+    with profile_stage("generate_textbooks") as stage:
+        outputs = checkpoints.run(
+            "textbooks", lambda: dict(zip(["textbooks", "course_textbooks"], generate_textbooks(courses))),
+            ["courses"]
+        )
+        textbooks, course_textbooks = outputs["textbooks"], outputs["course_textbooks"]
+        stage["rows"] = len(textbooks) + len(course_textbooks)
+    sinks.write("textbooks", textbooks)
+    sinks.write("course_textbooks", course_textbooks)
     
     print("Generating degrees and requirement groups...")
-    degrees, requirement_groups = generate_degrees(dept_courses)
+    with profile_stage("generate_degrees") as stage:
+        outputs = checkpoints.run(
+            "degrees", lambda: dict(zip(["degrees", "requirement_groups"], generate_degrees(dept_courses))),
+            ["textbooks"]
+        )
+        degrees, requirement_groups = outputs["degrees"], outputs["requirement_groups"]
+        stage["rows"] = len(degrees) + len(requirement_groups)
+    sinks.write("degrees", degrees)
+    sinks.write("requirement_groups", requirement_groups)
     
     print("Generating prerequisites...")
-    prerequisites = generate_prerequisites(courses)
+    with profile_stage("generate_prerequisites") as stage:
+        catalog = CourseCatalogIndex(courses)
+        prerequisites = checkpoints.run(
+            "prerequisites", lambda: {"prerequisites": generate_prerequisites(courses, catalog)}, ["degrees"]
+        )["prerequisites"]
+        stage["rows"] = len(prerequisites)
+    sinks.write("prerequisites", prerequisites)
     
     print("Generating leads_to relationships...")
-    leads_to = generate_leads_to_relationships(courses, prerequisites)
+    with profile_stage("generate_leads_to_relationships") as stage:
+        leads_to = checkpoints.run(
+            "leads_to",
+            lambda: {"leads_to": generate_leads_to_relationships(courses, prerequisites, catalog)},
+            ["prerequisites"]
+        )["leads_to"]
+        stage["rows"] = len(leads_to)
+    sinks.write("leads_to", leads_to)
     
     print("Generating course similarity...")
-    similarity_content, similarity_difficulty = generate_course_similarity(courses)
-    
-    print("Generating student-degree relationships...")
-    student_degree = generate_student_degree_relationships(students, degrees)
+    with profile_stage("generate_course_similarity") as stage:
+        outputs = checkpoints.run(
+            "course_similarity",
+            lambda: dict(zip(["similarity_content", "similarity_difficulty"], generate_course_similarity(courses))),
+            ["leads_to"]
+        )
+        similarity_content, similarity_difficulty = outputs["similarity_content"], outputs["similarity_difficulty"]
+        stage["rows"] = len(similarity_content) + len(similarity_difficulty)
+    sinks.write("similarity_content", similarity_content)
+    sinks.write("similarity_difficulty", similarity_difficulty)
     
     print("Generating teaching relationships...")
-    teaching = generate_teaching_relationships(faculty_by_dept, courses)
-    
-    print("Generating student course history...")
-    completed_courses, enrolled_courses = generate_student_course_history(students, courses, terms, prerequisites)
+    with profile_stage("generate_teaching_relationships") as stage:
+        teaching = checkpoints.run(
+            "teaching", lambda: {"teaching": generate_teaching_relationships(faculty_by_dept, courses)},
+            ["course_similarity"]
+        )["teaching"]
+        stage["rows"] = len(teaching)
+    sinks.write("teaching", teaching)
     
-    print("Generating textbook interactions...")
-    textbook_interactions, page_views = generate_textbook_interactions(
-        students, courses, textbooks, course_textbooks, terms, completed_courses
-    )
-    
-    print("Generating student similarity...")
-    learning_style_similarity, performance_similarity = generate_student_similarity(students, completed_courses)
-    
-    # Combine all data
-    data = {
-        "students": students,
-        "faculty": faculty,
+    # Students, their course history and textbook interactions are generated
+    # in shards that only need the catalog above
+    shard_context = {
+        "id_allocator": IdAllocator(random.Random(f"{RANDOM_SEED}:campus-ids")),
         "courses": courses,
-        "textbooks": textbooks,
-        "course_textbooks": course_textbooks,
-        "textbook_interactions": textbook_interactions,
-        "page_views": page_views,
-        "degrees": degrees,
         "terms": terms,
-        "requirement_groups": requirement_groups,
         "prerequisites": prerequisites,
-        "leads_to": leads_to,
-        "similarity_content": similarity_content,
-        "similarity_difficulty": similarity_difficulty,
-        "student_degree": student_degree,
-        "teaching": teaching,
-        "completed_courses": completed_courses,
-        "enrolled_courses": enrolled_courses,
-        "learning_style_similarity": learning_style_similarity,
-        "performance_similarity": performance_similarity
+        "textbooks": textbooks,
+        "course_textbooks": course_textbooks,
+        "registry": EntityRegistry(terms, courses, textbooks, course_textbooks, prerequisites),
+        "checkpoints": checkpoints,
+        "name_pool": name_pool
     }
+    # Shards run in worker processes, so their combined key is derived here
+    checkpoints.register(
+        "student_shards", "student_shard", SHARD_CHECKPOINT_INPUTS, {"shards": student_shard_specs()}
+    )
     
-    # Export the data
-    print("\nExporting data...")
+    print(f"Generating students, course history and textbook interactions "
+          f"({len(student_shard_specs())} shards, {args.workers} workers)...")
+    student_store = StudentStore()
+    with profile_stage("generate_student_shards") as stage:
+        for shard in generate_student_shards(shard_context, args.workers):
+            for key, records in shard.items():
+                sinks.write(key, records)
+            student_store.add_shard(shard["students"], shard["completed_courses"])
+        stage["rows"] = len(student_store)
     
-    cypher_dir = os.path.join(OUTPUT_DIR, "cypher")
-    csv_dir = os.path.join(OUTPUT_DIR, "csv")
+    # Student relationships are written a block of students at a time
+    print("Generating student-degree relationships...")
+    with profile_stage("generate_student_degree_relationships") as stage:
+        for key, records in checkpoints.stream(
+            "student_degree",
+            lambda: generate_student_degree_relationships(student_store.ids, degrees),
+            ["teaching", "student_shards"]
+        ):
+            sinks.write(key, records)
+            stage["rows"] += len(records)
     
-    print("Exporting Cypher scripts...")
-    export_to_cypher(data, cypher_dir)
+    print("Generating student similarity...")
+    with profile_stage("generate_student_similarity") as stage:
+        for key, records in checkpoints.stream(
+            "student_similarity", lambda: generate_student_similarity(student_store), ["student_degree"]
+        ):
+            sinks.write(key, records)
+            stage["rows"] += len(records)
     
-    print("Exporting CSV files...")
-    export_to_csv(data, csv_dir)
+    print("\nFinishing Cypher scripts and CSV files...")
+    with profile_stage("export_close"):
+        sinks.close()
+    row_counts = sinks.row_counts
     
     print("Generating Neo4j import script...")
-    generate_neo4j_import_script(csv_dir)
+    generate_neo4j_import_script(csv_dir, csv_sink.filenames)
     
     print("Creating README...")
     create_readme(OUTPUT_DIR)
@@ -2572,27 +5417,43 @@ def main():
     print("Creating Neo4j Browser guide...")
     create_neo4j_browser_guide(OUTPUT_DIR)
     
+    print("Writing manifest...")
+    write_manifest(OUTPUT_DIR, dict(row_counts), time.time() - start_time, csv_sink.filenames)
+    
+    if PROFILER is not None:
+        print(f"Writing stage profile to {args.profile}...")
+        write_profile(args.profile, PROFILER, time.time() - start_time, args.workers)
+    
+    if args.checkpoint_dir:
+        # Shards run in worker processes are not counted here
+        print(f"Checkpoints in {args.checkpoint_dir}: "
+              f"loaded {', '.join(dict.fromkeys(checkpoints.loaded)) or 'none'}; "
+              f"generated {', '.join(dict.fromkeys(checkpoints.generated)) or 'none'}")
+    
     # Summary statistics
     print("\nGenerated Data Summary:")
-    print(f"- {len(students)} students")
-    print(f"- {len(courses)} courses")
-    print(f"- {len(faculty)} faculty")
-    print(f"- {len(textbooks)} textbooks")
-    print(f"- {len(textbook_interactions)} textbook interactions")
-    print(f"- {len(page_views)} page views")
-    print(f"- {len(degrees)} degree programs")
-    print(f"- {len(requirement_groups)} requirement groups")
-    print(f"- {len(terms)} academic terms")
-    print(f"- {len(prerequisites)} prerequisite relationships")
-    print(f"- {len(completed_courses)} completed course records")
-    print(f"- {len(enrolled_courses)} enrolled course records")
+    print(f"- {row_counts['students']} students")
+    print(f"- {row_counts['courses']} courses")
+    print(f"- {row_counts['faculty']} faculty")
+    print(f"- {row_counts['textbooks']} textbooks")
+    print(f"- {row_counts['textbook_interactions']} textbook interactions")
+    print(f"- {row_counts['page_views']} page views")
+    print(f"- {row_counts['degrees']} degree programs")
+    print(f"- {row_counts['requirement_groups']} requirement groups")
+    print(f"- {row_counts['terms']} academic terms")
+    print(f"- {row_counts['prerequisites']} prerequisite relationships")
+    print(f"- {row_counts['completed_courses']} completed course records")
+    print(f"- {row_counts['enrolled_courses']} enrolled course records")
     
     print(f"\nOutput files written to {OUTPUT_DIR}")
     print("- Cypher scripts: ./cypher/")
     print("- CSV files: ./csv/")
     print("- Import script: ./csv/import_to_neo4j.sh")
+    if args.columnar:
+        print(f"- Columnar tables: ./{COLUMNAR_DIR}/")
     print("- README: ./README.md")
     print("- Browser Guide: ./umbc_guide.html")
+    print("- Manifest: ./manifest.json")
     
     print("\nDone!")
 
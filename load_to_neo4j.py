@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+UMBC Neo4j Bulk Loader
+
+This script loads the CSV files written by generate_synthetic_dataset.py
+into a running Neo4j database over the bolt driver, as an alternative to the
+offline neo4j-admin import in import_to_neo4j.sh.
+
+Rows are sent in batched UNWIND transactions. All node files are loaded in
+parallel, then the relationship files one batch at a time, since concurrent
+relationship batches lock the same end nodes and deadlock each other.
+Transient errors (deadlocks, leader switches) are retried with backoff. Lost
+connections are only retried for node batches, whose MERGE makes a repeated
+batch harmless.
+"""
+
+import csv
+import os
+import re
+import gzip
+import sys
+import time
+import datetime
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from neo4j import GraphDatabase
+from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# =============================================================================
+#                           CONFIGURATION SETTINGS
+# =============================================================================
+
+# Neo4j connection (same variables as the API server)
+NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or None   # None uses the server default
+
+# Default input: the CSV directory of the generator's default output
+CSV_DIR = os.path.join("umbc_data", "csv")
+
+BATCH_SIZE = 5000           # Rows per UNWIND transaction
+WORKERS = 4                 # Node files loaded concurrently (relationship files load serially)
+MAX_RETRIES = 5             # Attempts per batch on transient errors
+RETRY_BASE_DELAY = 0.5      # Seconds; doubles on every retry
+PROGRESS_INTERVAL = 5.0     # Seconds between progress lines
+
+# Columns without a type in the CSV header that hold ";"-separated lists or
+# dates, converted the same way as in the generator's Cypher export
+ARRAY_DELIMITER = ";"
+ARRAY_PROPERTIES = {"teachingStyle", "termAvailability", "instructionModes", "tags", "terms", "courses"}
+DATE_PROPERTIES = {"enrollmentDate", "expectedGraduation", "startDate", "endDate"}
+
+# =============================================================================
+#                           CSV PARSING
+# =============================================================================
+
+class CsvHeaderError(ValueError):
+    """Raised for a CSV header the loader cannot map to nodes or relationships"""
+
+# ID, ID(Student), START_ID(Student), END_ID(Course)
+ID_COLUMN_TYPE = re.compile(r"^(?P<field>ID|START_ID|END_ID)(?:\((?P<label>[^()]*)\))?$")
+
+def parse_header(header):
+    """
+    Parse a neo4j-admin CSV header into a description of the file.
+
+    Returns a dict with kind ("node" or "relationship"), the node label or
+    start/end labels, the column index of the ID/start/end/type fields, and
+    the (index, name, type) of every property column. Returns None for files
+    that are neither nodes nor relationships. Raises CsvHeaderError when an
+    ID column is malformed or a relationship end lacks its "(Label)", which
+    the MATCH on the end nodes needs.
+    """
+    spec = {"kind": None, "properties": [], "type_column": None}
+
+    for index, column in enumerate(header):
+        name, _, column_type = column.partition(":")
+        id_match = ID_COLUMN_TYPE.match(column_type)
+        field = column_type.split("(")[0]
+        if id_match is None and field in ("ID", "START_ID", "END_ID"):
+            raise CsvHeaderError(f"Malformed ID column {column!r}, expected e.g. ':{field}(Label)'")
+
+        if id_match and id_match["field"] == "ID":
+            spec["kind"] = "node"
+            # A node file without a label takes it from the file name
+            spec["label"] = id_match["label"] or None
+            spec["id_column"] = index
+            spec["properties"].append((index, name or "id", "string"))
+        elif id_match:
+            if not id_match["label"]:
+                raise CsvHeaderError(f"Relationship column {column!r} needs the node label, "
+                                     f"e.g. ':{id_match['field']}(Student)'")
+            end = "start" if id_match["field"] == "START_ID" else "end"
+            spec["kind"] = "relationship"
+            spec[f"{end}_label"] = id_match["label"]
+            spec[f"{end}_column"] = index
+        elif column_type == "TYPE":
+            spec["type_column"] = index
+        else:
+            spec["properties"].append((index, name, column_type.lower() or "string"))
+
+    if spec["kind"] == "relationship" and not ("start_column" in spec and "end_column" in spec):
+        raise CsvHeaderError("Relationship header needs both a :START_ID(Label) and an :END_ID(Label) column")
+    return spec if spec["kind"] else None
+
+def convert_value(value, name, column_type):
+    """
+    Convert one CSV field to the driver value for its property (None skips it).
+    """
+    if value == "":
+        return None
+    if column_type.endswith("[]"):
+        return [convert_value(item, name, column_type[:-2]) for item in value.split(ARRAY_DELIMITER)]
+    if column_type in ("int", "long", "short", "byte"):
+        return int(value)
+    if column_type in ("float", "double"):
+        return float(value)
+    if column_type == "boolean":
+        return value.lower() == "true"
+    if column_type == "date" or (column_type == "string" and name in DATE_PROPERTIES):
+        return datetime.date.fromisoformat(value)
+    if column_type == "string" and name in ARRAY_PROPERTIES:
+        return value.split(ARRAY_DELIMITER)
+    return value
+
+def row_properties(row, spec):
+    """
+    Return the property map for a CSV row, leaving out empty fields.
+    """
+    properties = {}
+    for index, name, column_type in spec["properties"]:
+        value = convert_value(row[index], name, column_type)
+        if value is not None:
+            properties[name] = value
+    return properties
+
+def open_csv(path):
+    """
+    Open a CSV file for reading, through gzip when the name ends in .gz.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, newline="")
+
+def read_batches(path, spec, batch_size):
+    """
+    Yield (cypher, rows) batches for a CSV file, streaming it from disk.
+    Relationship rows are grouped by type, since a type cannot be a parameter.
+    """
+    with open_csv(path) as f:
+        reader = csv.reader(f)
+        if spec["has_header"]:
+            next(reader)
+
+        if spec["kind"] == "node":
+            cypher = node_statement(spec["label"])
+            rows = []
+            for row in reader:
+                rows.append({"id": row[spec["id_column"]], "props": row_properties(row, spec)})
+                if len(rows) >= batch_size:
+                    yield cypher, rows
+                    rows = []
+            if rows:
+                yield cypher, rows
+            return
+
+        rows_by_type = defaultdict(list)
+        for row in reader:
+            rel_type = row[spec["type_column"]] if spec["type_column"] is not None else spec["default_type"]
+            rows = rows_by_type[rel_type]
+            rows.append({
+                "start": row[spec["start_column"]],
+                "end": row[spec["end_column"]],
+                "props": row_properties(row, spec)
+            })
+            if len(rows) >= batch_size:
+                yield relationship_statement(spec, rel_type), rows
+                rows_by_type[rel_type] = []
+        for rel_type, rows in rows_by_type.items():
+            if rows:
+                yield relationship_statement(spec, rel_type), rows
+
+# students.csv, students.csv.gz, page_views.header.csv, page_views.part01.csv.gz
+CSV_FILENAME = re.compile(r"^(?P<stem>.+?)(?:\.(?P<role>header|part\d+))?\.csv(?:\.gz)?$")
+
+def scan_csv_dir(csv_dir):
+    """
+    Return (node_files, relationship_files) as lists of (path, spec), in file name order.
+    Files split by the generator's --csv-chunks are a header file plus part
+    files without a header row; every part is loaded as its own file.
+    """
+    node_files, relationship_files = [], []
+    parts = defaultdict(list)
+    headers = []
+
+    for filename in sorted(os.listdir(csv_dir)):
+        match = CSV_FILENAME.match(filename)
+        if match is None:
+            continue
+        if match["role"] and match["role"].startswith("part"):
+            parts[match["stem"]].append(os.path.join(csv_dir, filename))
+            continue
+
+        path = os.path.join(csv_dir, filename)
+        with open_csv(path) as f:
+            header = next(csv.reader(f), None)
+        try:
+            spec = parse_header(header or [])
+        except CsvHeaderError as e:
+            raise CsvHeaderError(f"{filename}: {e}") from None
+        if spec is None:
+            print(f"Skipping {filename}: not a node or relationship file")
+            continue
+
+        stem = match["stem"]
+        spec["has_header"] = True
+        if spec["kind"] == "node":
+            spec["label"] = spec["label"] or stem.title()
+        else:
+            spec["default_type"] = stem.upper()
+        if match["role"] == "header":
+            headers.append((stem, spec))
+        else:
+            (node_files if spec["kind"] == "node" else relationship_files).append((path, spec))
+
+    for stem, spec in headers:
+        files = node_files if spec["kind"] == "node" else relationship_files
+        files.extend((path, dict(spec, has_header=False)) for path in parts[stem])
+
+    return node_files, relationship_files
+
+# =============================================================================
+#                           CYPHER STATEMENTS
+# =============================================================================
+
+def constraint_statement(label):
+    return f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:`{label}`) REQUIRE n.id IS UNIQUE"
+
+def node_statement(label):
+    # MERGE keeps the first node for a duplicate ID, like --skip-duplicate-nodes,
+    # and makes reloading a node file harmless
+    return (
+        "UNWIND $rows AS row "
+        f"MERGE (n:`{label}` {{id: row.id}}) "
+        "ON CREATE SET n += row.props"
+    )
+
+def relationship_statement(spec, rel_type):
+    # Rows whose start or end node does not exist are skipped, like --skip-bad-relationships
+    return (
+        "UNWIND $rows AS row "
+        f"MATCH (a:`{spec['start_label']}` {{id: row.start}}) "
+        f"MATCH (b:`{spec['end_label']}` {{id: row.end}}) "
+        f"CREATE (a)-[r:`{rel_type}`]->(b) "
+        "SET r = row.props"
+    )
+
+# =============================================================================
+#                           LOADING
+# =============================================================================
+
+# Errors worth retrying: neo4j transient errors (e.g. deadlocks) are always
+# rolled back; after a lost connection the batch may or may not have been
+# committed, so those are only retried for idempotent (MERGE) statements
+TRANSIENT_ERRORS = (TransientError,)
+CONNECTION_ERRORS = (ServiceUnavailable, SessionExpired)
+
+class LoadProgress:
+    """
+    Thread-safe row counters with periodic rows/second reporting.
+    """
+
+    def __init__(self, interval=PROGRESS_INTERVAL):
+        self.lock = threading.Lock()
+        self.interval = interval
+        self.start_time = time.time()
+        self.last_report = self.start_time
+        self.rows = 0
+        self.rows_by_file = defaultdict(int)
+        self.retries = 0
+
+    def add(self, filename, count):
+        with self.lock:
+            self.rows += count
+            self.rows_by_file[filename] += count
+            now = time.time()
+            if now - self.last_report >= self.interval:
+                self.last_report = now
+                print(f"  {self.rows:,} rows loaded ({self.rate():,.0f} rows/s)")
+
+    def retried(self):
+        with self.lock:
+            self.retries += 1
+
+    def rate(self):
+        elapsed = time.time() - self.start_time
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+def run_batch(driver, database, cypher, rows, progress, idempotent=True):
+    """
+    Run one batch in its own auto-commit transaction, retrying transient errors.
+    Lost connections are retried too when the statement is idempotent; a
+    relationship CREATE is not, since a retried batch could duplicate edges.
+    """
+    retryable = TRANSIENT_ERRORS + CONNECTION_ERRORS if idempotent else TRANSIENT_ERRORS
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            with driver.session(database=database) as session:
+                session.run(cypher, rows=rows).consume()
+            return
+        except retryable as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = RETRY_BASE_DELAY * 2 ** (attempt - 1)
+            print(f"  Transient error ({type(e).__name__}), retrying in {delay:.1f}s: {e}")
+            progress.retried()
+            time.sleep(delay)
+
+def load_file(driver, database, path, spec, batch_size, progress):
+    """
+    Load one CSV file batch by batch and return (rows, seconds).
+    """
+    filename = os.path.basename(path)
+    start_time = time.time()
+    rows_loaded = 0
+
+    for cypher, rows in read_batches(path, spec, batch_size):
+        run_batch(driver, database, cypher, rows, progress, idempotent=spec["kind"] == "node")
+        rows_loaded += len(rows)
+        progress.add(filename, len(rows))
+
+    elapsed = time.time() - start_time
+    print(f"  {filename}: {rows_loaded:,} rows in {elapsed:.1f}s "
+          f"({rows_loaded / elapsed if elapsed > 0 else 0:,.0f} rows/s)")
+    return rows_loaded, elapsed
+
+def load_phase(driver, database, files, batch_size, workers, progress):
+    """
+    Load independent files on up to workers threads; raises the first error
+    after all finish.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(load_file, driver, database, path, spec, batch_size, progress)
+            for path, spec in files
+        ]
+        for future in futures:
+            future.result()
+
+def load_dataset(driver, csv_dir=CSV_DIR, database=NEO4J_DATABASE, batch_size=BATCH_SIZE, workers=WORKERS):
+    """
+    Load every node and relationship CSV in csv_dir through driver.
+
+    driver only needs session(database=...) returning a context manager whose
+    run(cypher, **params) result has consume(), so a local stand-in can be
+    passed instead of a real neo4j driver. Returns the LoadProgress totals.
+    """
+    node_files, relationship_files = scan_csv_dir(csv_dir)
+    progress = LoadProgress()
+
+    print("Creating constraints...")
+    for label in sorted({spec["label"] for _, spec in node_files}):
+        run_batch(driver, database, constraint_statement(label), [], progress)
+
+    # Relationships need both end nodes, so every node file finishes first
+    print(f"Loading {len(node_files)} node files...")
+    load_phase(driver, database, node_files, batch_size, workers, progress)
+
+    # CREATE locks both end nodes, and relationship files share end nodes
+    # (students, courses), so concurrent batches would deadlock and retry
+    print(f"Loading {len(relationship_files)} relationship files...")
+    load_phase(driver, database, relationship_files, batch_size, 1, progress)
+
+    return progress
+
+# =============================================================================
+#                           MAIN
+# =============================================================================
+
+def parse_args(argv=None):
+    """
+    Parse command line options.
+    """
+    parser = argparse.ArgumentParser(description="Load the generated UMBC CSV files into a running Neo4j database.")
+    parser.add_argument("csv_dir", nargs="?", default=CSV_DIR,
+                        help=f"Directory with the generated CSV files (default: {CSV_DIR})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Rows per transaction (default: {BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"Node files loaded concurrently; relationship files load serially "
+                             f"(default: {WORKERS})")
+    parser.add_argument("--database", default=NEO4J_DATABASE,
+                        help="Target database (default: NEO4J_DATABASE or the server default)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Connect with the NEO4J_* settings and load the dataset.
+    """
+    args = parse_args(argv)
+    if not os.path.isdir(args.csv_dir):
+        print(f"Error: CSV directory not found: {args.csv_dir}")
+        sys.exit(1)
+
+    print(f"Loading {args.csv_dir} into {NEO4J_URI}")
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    try:
+        driver.verify_connectivity()
+        progress = load_dataset(driver, args.csv_dir, args.database, args.batch_size, args.workers)
+    except CsvHeaderError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        driver.close()
+
+    elapsed = time.time() - progress.start_time
+    print(f"\nLoaded {progress.rows:,} rows in {elapsed:.1f}s ({progress.rate():,.0f} rows/s, "
+          f"{progress.retries} retries)")
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,19 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 import google.generativeai as genai
+from google.generativeai import caching
+from google.api_core.exceptions import ResourceExhausted
 from neo4j import GraphDatabase
+from gemini_limiter import GeminiRateLimiter, GeminiQueueFullError, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
 import json
 import os
+import re
 from dotenv import load_dotenv
 import random
+import asyncio
+import time
+import datetime
+from collections import deque
 
 # Load environment variables
 load_dotenv()
@@ -25,7 +33,85 @@ app.add_middleware(
 
 # Configure Gemini API
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-pro')
+
+# Model routing: the fast model answers by default, the slower one is only
+# used when the fast answer fails validation or reports low confidence
+GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-1.5-flash")
+GEMINI_SLOW_MODEL = os.getenv("GEMINI_SLOW_MODEL", "gemini-pro")
+GEMINI_LOW_CONFIDENCE = float(os.getenv("GEMINI_LOW_CONFIDENCE", "0.6"))
+GEMINI_DEFAULT_LATENCY_BUDGET_MS = int(os.getenv("GEMINI_DEFAULT_LATENCY_BUDGET_MS", "8000"))
+GEMINI_LATENCY_EWMA_ALPHA = 0.2
+
+# Tail-latency protection: hedge calls slower than the observed p95 and stop
+# calling Gemini altogether while it keeps failing
+GEMINI_HEDGING_ENABLED = os.getenv("GEMINI_HEDGING_ENABLED", "true").lower() == "true"
+GEMINI_HEDGE_MIN_DELAY_MS = int(os.getenv("GEMINI_HEDGE_MIN_DELAY_MS", "500"))
+GEMINI_LATENCY_WINDOW = 200
+GEMINI_HEDGE_MIN_SAMPLES = 20
+GEMINI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("GEMINI_BREAKER_FAILURE_THRESHOLD", "5"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+
+# Client-side rate limiting: pace calls under the per-minute quota instead of
+# letting Gemini reject them. A burst of B allows at most quota + B calls in
+# any one-minute window, so keep it small.
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+GEMINI_RATE_LIMIT_BURST = int(os.getenv("GEMINI_RATE_LIMIT_BURST", "1"))
+GEMINI_QUEUE_MAX_SIZE = int(os.getenv("GEMINI_QUEUE_MAX_SIZE", "100"))
+models = {
+    GEMINI_FAST_MODEL: genai.GenerativeModel(GEMINI_FAST_MODEL),
+    GEMINI_SLOW_MODEL: genai.GenerativeModel(GEMINI_SLOW_MODEL)
+}
+
+# Context caching for the full static prompt prefix, one cache per model.
+# Gemini only caches content above a per-model minimum size (and 1.5 models
+# only when explicitly versioned, e.g. gemini-1.5-flash-002); below it the
+# short inline prefix is sent instead. GEMINI_PROMPT_CACHE_MIN_TOKENS
+# overrides the minimum for every model.
+GEMINI_PROMPT_CACHE_ENABLED = os.getenv("GEMINI_PROMPT_CACHE_ENABLED", "true").lower() == "true"
+GEMINI_PROMPT_CACHE_TTL_MINUTES = int(os.getenv("GEMINI_PROMPT_CACHE_TTL_MINUTES", "60"))
+GEMINI_PROMPT_CACHE_RETRY_SECONDS = float(os.getenv("GEMINI_PROMPT_CACHE_RETRY_SECONDS", "300"))
+GEMINI_PROMPT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_PROMPT_CACHE_MIN_TOKENS", "0"))
+PROMPT_CACHE_MIN_TOKENS_BY_FAMILY = {
+    "gemini-1.5-": 32768,
+    "gemini-2.0-": 4096,
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-pro": 4096
+}
+prompt_caches = {
+    model_name: {
+        "model": None,
+        "expires_at": 0.0,
+        "retry_after": 0.0,
+        "prefix_tokens": None,
+        "lock": asyncio.Lock()
+    }
+    for model_name in models
+}
+
+# Running Gemini token counters, exposed through /metrics
+gemini_metrics = {
+    "requests": 0,
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "cached_input_tokens": 0,
+    "uncached_input_tokens": 0,
+    "cached_prefix_requests": 0,
+    "inline_prefix_requests": 0,
+    "last_request": {"input_tokens": 0, "output_tokens": 0, "cached_input_tokens": 0, "uncached_input_tokens": 0},
+    "escalations": 0,
+    "hedges": 0,
+    "hedge_wins": 0,
+    "breaker_trips": 0,
+    "breaker_rejections": 0,
+    "rate_limit_rejections": 0,
+    "upstream_rate_limited": 0
+}
+
+# Micro-batching: pack short playlists arriving in a burst into one Gemini prompt
+GEMINI_BATCH_MODE = os.getenv("GEMINI_BATCH_MODE", "false").lower() == "true"
+GEMINI_BATCH_MAX_SIZE = int(os.getenv("GEMINI_BATCH_MAX_SIZE", "8"))
+GEMINI_BATCH_WINDOW_MS = int(os.getenv("GEMINI_BATCH_WINDOW_MS", "50"))
+GEMINI_BATCH_MAX_PLAYLIST_CHARS = int(os.getenv("GEMINI_BATCH_MAX_PLAYLIST_CHARS", "2000"))
 
 # Neo4j connection
 neo4j_uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
@@ -37,9 +123,12 @@ driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
 # Pydantic models
 class PlaylistInput(BaseModel):
     playlist_string: str
+    latency_budget_ms: Optional[int] = None
+    background: bool = False  # Batch or re-analysis work, queued behind interactive calls
 
 class PlaylistFileInput(BaseModel):
     file_path: str
+    background: bool = False
 
 class VibeResponse(BaseModel):
     user_display: Dict
@@ -135,13 +224,12 @@ def get_personality_description(category):
     }
     return descriptions.get(category, "You have a unique study style!")
 
-async def analyze_playlist_with_gemini(playlist_string: str) -> Dict:
-    """Send playlist to Gemini for vibe analysis"""
-    
-    prompt = f"""
-    Analyze this Spotify playlist and create a fun, quirky Spotify-style genre description using 2-4 random buzzwords.
-
-    Playlist: {playlist_string}
+# Static prompt prefix: the style examples, category definitions and output
+# format never change between requests. The full version, with every
+# buzzword template as an example, is context-cached when the model allows
+# it; otherwise the short version below is sent inline with each request
+VIBE_CACHED_PREFIX = """
+    You analyze Spotify playlists and create a fun, quirky Spotify-style genre description using 2-4 random buzzwords.
 
     Examples of the style I want:
     - "Vampire Rage Football" (for aggressive rap/trap)
@@ -156,63 +244,652 @@ async def analyze_playlist_with_gemini(playlist_string: str) -> Dict:
 
     Also categorize into one of these backend categories:
     - deep_focus: Ambient, instrumental, calming music for deep concentration
-    - energetic_focus: Upbeat, rhythmic music for active studying  
+    - energetic_focus: Upbeat, rhythmic music for active studying
     - balanced_focus: Diverse, moderate energy for flexible studying
     - intense_focus: Complex, challenging music for high-pressure studying
     - social_focus: Familiar, collaborative music for group studying
 
-    Return ONLY valid JSON in this exact format:
-    {{
+    More buzzword combos we like, by backend category:
+""" + "\n".join(
+    f'    - "{buzzword}" ({category})' for category, buzzwords in BUZZWORD_TEMPLATES.items() for buzzword in buzzwords
+) + """
+
+    What each backend category says about a student:
+""" + "\n".join(
+    f"    - {category}: {get_personality_description(category)}" for category in BUZZWORD_TEMPLATES
+) + """
+
+    Each result is a JSON object in this exact format:
+    {
         "spotify_vibe": "Your Creative Buzzword Combo",
         "backend_category": "deep_focus",
         "reasoning": "why this buzzword combo fits the music",
         "confidence": 0.85
-    }}
+    }
+    """
+
+VIBE_PROMPT_PREFIX = """
+    Give each Spotify playlist a fun, quirky 2-4 buzzword genre name with unexpected word combinations
+    (e.g. "Vampire Rage Football", "Cottagecore Study Indie", "Neon Cyberpunk Vibes", "Academic Dark Academia").
+    backend_category is one of: deep_focus (ambient/instrumental), energetic_focus (upbeat/rhythmic),
+    balanced_focus (diverse/moderate), intense_focus (complex/challenging), social_focus (familiar/collaborative).
+    Result format: {"spotify_vibe": str, "backend_category": str, "reasoning": str, "confidence": float}
+    """
+
+def build_vibe_prompt(playlist_string: str) -> str:
+    """Build the dynamic suffix of the single-playlist vibe analysis prompt"""
+    
+    return f"""
+    Playlist: {playlist_string}
+
+    Return ONLY the result as a JSON object.
+    """
+
+def build_batch_vibe_prompt(playlist_strings: List[str]) -> str:
+    """Build the dynamic suffix of a prompt that asks for a JSON array of vibe results"""
+    
+    numbered_playlists = "\n".join(
+        f"    Playlist {i + 1}: {playlist}" for i, playlist in enumerate(playlist_strings)
+    )
+    
+    return f"""
+{numbered_playlists}
+
+    Analyze each playlist separately. Return ONLY a JSON array with exactly {len(playlist_strings)} results
+    in playlist order, each with an added "playlist_index" (1-based).
+    """
+
+def prompt_cache_min_tokens(model_name: str) -> Optional[int]:
+    """Smallest prefix Gemini caches for model_name, or None when the model cannot use context caching"""
+    
+    name = model_name.removeprefix("models/")
+    for family, min_tokens in PROMPT_CACHE_MIN_TOKENS_BY_FAMILY.items():
+        if not name.startswith(family):
+            continue
+        if family == "gemini-1.5-" and re.search(r"-\d{3}$", name) is None:
+            return None
+        return GEMINI_PROMPT_CACHE_MIN_TOKENS or min_tokens
+    return None
+
+def prompt_cache_state(model_name: str) -> str:
+    """How the static prefix currently reaches model_name, for /metrics"""
+    
+    prompt_cache = prompt_caches[model_name]
+    min_tokens = prompt_cache_min_tokens(model_name)
+    if not GEMINI_PROMPT_CACHE_ENABLED or min_tokens is None:
+        return "inline"
+    if prompt_cache["prefix_tokens"] is not None and prompt_cache["prefix_tokens"] < min_tokens:
+        return "inline_below_minimum"
+    if prompt_cache["model"] is not None and time.monotonic() < prompt_cache["expires_at"]:
+        return "active"
+    if prompt_cache["retry_after"] > time.monotonic():
+        return "retry_pending"
+    return "not_created"
+
+async def get_prompt_model(model_name: str):
+    """
+    Return (model, prefix) for the next call to model_name: a model on the
+    context-cached full prefix with an empty prefix, or the plain model with
+    the short prefix sent inline. The full prefix is counted once per model
+    against the cache minimum; a failed cache creation is retried after
+    GEMINI_PROMPT_CACHE_RETRY_SECONDS.
+    """
+    
+    if prompt_cache_state(model_name) in ("inline", "inline_below_minimum"):
+        return models[model_name], VIBE_PROMPT_PREFIX
+    
+    prompt_cache = prompt_caches[model_name]
+    async with prompt_cache["lock"]:
+        now = time.monotonic()
+        if prompt_cache["model"] is not None and now < prompt_cache["expires_at"]:
+            return prompt_cache["model"], ""
+        
+        if now >= prompt_cache["retry_after"]:
+            try:
+                if prompt_cache["prefix_tokens"] is None:
+                    counted = await models[model_name].count_tokens_async(VIBE_CACHED_PREFIX)
+                    prompt_cache["prefix_tokens"] = counted.total_tokens
+                min_tokens = prompt_cache_min_tokens(model_name)
+                if prompt_cache["prefix_tokens"] < min_tokens:
+                    print(f"Static prefix is {prompt_cache['prefix_tokens']} tokens, below the {min_tokens}-token "
+                          f"cache minimum of {model_name}; sending the short prefix inline")
+                    return models[model_name], VIBE_PROMPT_PREFIX
+                
+                cached_content = await asyncio.to_thread(
+                    caching.CachedContent.create,
+                    model=model_name,
+                    display_name="vibe-prompt-prefix",
+                    system_instruction=VIBE_CACHED_PREFIX,
+                    ttl=datetime.timedelta(minutes=GEMINI_PROMPT_CACHE_TTL_MINUTES)
+                )
+                prompt_cache["model"] = genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+                # Refresh a minute early so we never send a request against an expired cache
+                prompt_cache["expires_at"] = now + GEMINI_PROMPT_CACHE_TTL_MINUTES * 60 - 60
+                return prompt_cache["model"], ""
+            except Exception as e:
+                print(f"Prompt caching failed for {model_name}, sending the short prefix inline for now: {e}")
+                prompt_cache["retry_after"] = now + GEMINI_PROMPT_CACHE_RETRY_SECONDS
+                prompt_cache["model"] = None
+    
+    return models[model_name], VIBE_PROMPT_PREFIX
+
+def record_token_usage(response, cached_prefix: bool = False) -> Dict:
+    """
+    Add one response's token usage to the running Gemini metrics. Input
+    tokens are split into those served from the context cache and the rest.
     """
     
+    usage = getattr(response, "usage_metadata", None)
+    input_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    cached_input_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+    tokens = {
+        "input_tokens": input_tokens,
+        "output_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        "cached_input_tokens": cached_input_tokens,
+        "uncached_input_tokens": input_tokens - cached_input_tokens
+    }
+    
+    gemini_metrics["requests"] += 1
+    gemini_metrics["cached_prefix_requests" if cached_prefix else "inline_prefix_requests"] += 1
+    for key, value in tokens.items():
+        gemini_metrics[key] += value
+    gemini_metrics["last_request"] = tokens
+    
+    return tokens
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Stops calling the upstream after repeated failures. After the reset
+    timeout one probe request is let through; success closes the circuit,
+    failure opens it again. clock can be replaced in tests.
+    """
+    
+    def __init__(self, failure_threshold: int, reset_seconds: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+    
+    def allow_request(self) -> bool:
+        now = self.clock()
+        if self.state == "closed":
+            return True
+        if self.state == "open" and now - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            self.probe_started_at = 0.0
+        # Only one probe at a time; a probe that never reported back expires
+        if self.state == "half_open" and now - self.probe_started_at >= self.reset_seconds:
+            self.probe_started_at = now
+            return True
+        return False
+    
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or (
+            self.state == "closed" and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.state = "open"
+            self.opened_at = self.clock()
+            gemini_metrics["breaker_trips"] += 1
+            print(f"Gemini circuit breaker opened after {self.consecutive_failures} consecutive failures")
+
+gemini_breaker = CircuitBreaker(GEMINI_BREAKER_FAILURE_THRESHOLD, GEMINI_BREAKER_RESET_SECONDS)
+
+gemini_rate_limiter = GeminiRateLimiter(
+    GEMINI_REQUESTS_PER_MINUTE, GEMINI_RATE_LIMIT_BURST, GEMINI_QUEUE_MAX_SIZE, gemini_metrics
+)
+
+async def generate_vibe_content(model_name: str, prompt_suffix: str, playlist_chars: int,
+                                priority: int = PRIORITY_INTERACTIVE, batched: bool = False,
+                                granted: Optional[asyncio.Event] = None):
+    """
+    Send the static prefix (context-cached when possible) plus the dynamic
+    suffix to Gemini. granted is set once the rate limiter lets the call through.
+    """
+    
+    if not gemini_breaker.allow_request():
+        gemini_metrics["breaker_rejections"] += 1
+        raise CircuitOpenError("Gemini circuit breaker is open")
+    
+    model, prefix = await get_prompt_model(model_name)
+    await gemini_rate_limiter.acquire(priority)
+    if granted is not None:
+        granted.set()
+    
+    start = time.monotonic()
     try:
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prefix + prompt_suffix)
+    except ResourceExhausted:
+        gemini_rate_limiter.penalize()
+        gemini_breaker.record_failure()
+        raise
+    except Exception:
+        gemini_breaker.record_failure()
+        raise
+    gemini_breaker.record_success()
+    model_router.record_latency(model_name, (time.monotonic() - start) * 1000, playlist_chars, batched)
+    record_token_usage(response, cached_prefix=not prefix)
+    
+    return response
+
+def compact_playlist_string(playlist_string: str) -> str:
+    """Collapse whitespace and drop repeated track entries before sending a playlist to Gemini"""
+    
+    entries = [' '.join(entry.split()) for entry in playlist_string.split('. ')]
+    unique_entries = list(dict.fromkeys(entry for entry in entries if entry))
+    return '. '.join(unique_entries)
+
+class ModelRouter:
+    """
+    Picks the Gemini model for each request. The fast model answers first
+    unless it is predicted to overrun the latency budget for the playlist
+    size; the slow model is only tried when that answer is unusable and the
+    remaining budget allows it.
+    """
+    
+    def __init__(self, fast_model: str, slow_model: str):
+        self.fast_model = fast_model
+        self.slow_model = slow_model
+        # Priors until we have observed real calls
+        self.latency_ms = {fast_model: 1500.0, slow_model: 4000.0}
+        self.playlist_chars = {fast_model: 2000.0, slow_model: 2000.0}
+        self.calls = {fast_model: 0, slow_model: 0}
+        self.recent_latency_ms = {
+            fast_model: deque(maxlen=GEMINI_LATENCY_WINDOW),
+            slow_model: deque(maxlen=GEMINI_LATENCY_WINDOW)
+        }
+    
+    def record_latency(self, model_name: str, latency_ms: float, playlist_chars: int, batched: bool = False):
+        """
+        Fold one observed call into the per-model moving averages. Batched
+        calls are left out of the window behind the single-request p95.
+        """
         
-        # Clean the response text
-        response_text = response.text.strip()
+        alpha = GEMINI_LATENCY_EWMA_ALPHA
+        self.latency_ms[model_name] += alpha * (latency_ms - self.latency_ms[model_name])
+        self.playlist_chars[model_name] += alpha * (max(playlist_chars, 1) - self.playlist_chars[model_name])
+        self.calls[model_name] += 1
+        if not batched:
+            self.recent_latency_ms[model_name].append(latency_ms)
+    
+    def predict_latency_ms(self, model_name: str, playlist_chars: int) -> float:
+        """Predicted latency, scaled up for playlists larger than what we usually see"""
         
-        # Remove any markdown formatting
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
+        return self.latency_ms[model_name] * max(1.0, playlist_chars / self.playlist_chars[model_name])
+    
+    def hedge_delay_ms(self, model_name: str) -> float:
+        """How long to wait before hedging: the observed p95, or twice the average until we have samples"""
         
-        response_text = response_text.strip()
+        samples = sorted(self.recent_latency_ms[model_name])
+        if len(samples) < GEMINI_HEDGE_MIN_SAMPLES:
+            return max(GEMINI_HEDGE_MIN_DELAY_MS, 2 * self.latency_ms[model_name])
         
-        # Parse JSON
-        result = json.loads(response_text)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return max(GEMINI_HEDGE_MIN_DELAY_MS, p95)
+    
+    def choose_model(self, playlist_chars: int, latency_budget_ms: float) -> str:
+        """Pick the first model predicted to fit the budget, or the one predicted fastest when none does"""
         
-        # Validate the response has required fields
-        required_fields = ["spotify_vibe", "backend_category", "reasoning", "confidence"]
-        if not all(field in result for field in required_fields):
-            raise ValueError("Missing required fields in Gemini response")
-            
-        return result
+        candidates = [self.fast_model, self.slow_model]
+        for model_name in candidates:
+            if self.predict_latency_ms(model_name, playlist_chars) <= latency_budget_ms:
+                return model_name
         
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw response: {response.text}")
-        # Fallback response
+        return min(candidates, key=lambda model_name: self.predict_latency_ms(model_name, playlist_chars))
+    
+    def escalation_model(self, model_name: str, result: Optional[Dict],
+                         playlist_chars: int, remaining_budget_ms: float) -> Optional[str]:
+        """Return the model to escalate to, or None when the first answer should stand"""
+        
+        if model_name == self.slow_model:
+            return None
+        if result is not None and result_confidence(result) >= GEMINI_LOW_CONFIDENCE:
+            return None
+        if self.predict_latency_ms(self.slow_model, playlist_chars) > remaining_budget_ms:
+            print(f"Not escalating to {self.slow_model}: latency budget exhausted")
+            return None
+        
+        return self.slow_model
+    
+    def snapshot(self) -> Dict:
         return {
-            "spotify_vibe": random.choice(BUZZWORD_TEMPLATES["balanced_focus"]),
-            "backend_category": "balanced_focus",
-            "reasoning": "Fallback due to parsing error",
-            "confidence": 0.5
+            model_name: {
+                "calls": self.calls[model_name],
+                "avg_latency_ms": round(self.latency_ms[model_name], 1),
+                "hedge_delay_ms": round(self.hedge_delay_ms(model_name), 1),
+                "avg_playlist_chars": round(self.playlist_chars[model_name])
+            }
+            for model_name in self.calls
         }
+
+model_router = ModelRouter(GEMINI_FAST_MODEL, GEMINI_SLOW_MODEL)
+
+def result_confidence(result: Dict) -> float:
+    """Confidence reported by Gemini, treating unparseable values as zero"""
+    
+    try:
+        return float(result["confidence"])
+    except (TypeError, ValueError):
+        return 0.0
+
+def clean_gemini_response_text(response_text: str) -> str:
+    """Strip whitespace and markdown code fences from a Gemini response"""
+    
+    response_text = response_text.strip()
+    
+    # Remove any markdown formatting
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    
+    return response_text.strip()
+
+def validate_vibe_result(result) -> Dict:
+    """Validate a single vibe result has the required fields and a known backend category"""
+    
+    required_fields = ["spotify_vibe", "backend_category", "reasoning", "confidence"]
+    if not isinstance(result, dict) or not all(field in result for field in required_fields):
+        raise ValueError("Missing required fields in Gemini response")
+    if result["backend_category"] not in BUZZWORD_TEMPLATES:
+        raise ValueError(f"Unknown backend category {result['backend_category']!r} in Gemini response")
+    
+    return {field: result[field] for field in required_fields}
+
+def fallback_vibe_result(reason: str) -> Dict:
+    """Fallback vibe used when Gemini cannot give us a usable answer"""
+    
+    return {
+        "spotify_vibe": random.choice(BUZZWORD_TEMPLATES["balanced_focus"]),
+        "backend_category": "balanced_focus",
+        "reasoning": reason,
+        "confidence": 0.5
+    }
+
+async def request_vibe_from_model(model_name: str, playlist_string: str,
+                                  priority: int = PRIORITY_INTERACTIVE,
+                                  granted: Optional[asyncio.Event] = None) -> Optional[Dict]:
+    """Ask one model for a vibe; returns None when its output fails validation"""
+    
+    response = await generate_vibe_content(
+        model_name, build_vibe_prompt(playlist_string), len(playlist_string), priority, granted=granted
+    )
+    
+    try:
+        # Parse JSON and validate the response has required fields
+        return validate_vibe_result(json.loads(clean_gemini_response_text(response.text)))
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Invalid response from {model_name}: {e}")
+        print(f"Raw response: {response.text}")
+        return None
+
+async def hedged_request_vibe(model_name: str, playlist_string: str,
+                             priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
+    """
+    Ask one model for a vibe. If the call runs past the observed p95 a
+    duplicate is issued; the first valid answer wins and the other is cancelled.
+    The clock starts when the rate limiter lets the call through: a call
+    still queued for quota is never hedged, since the hedge would only join
+    the same queue.
+    """
+    
+    granted = asyncio.Event()
+    primary = asyncio.create_task(request_vibe_from_model(model_name, playlist_string, priority, granted))
+    if not GEMINI_HEDGING_ENABLED:
+        return await primary
+    
+    granted_wait = asyncio.create_task(granted.wait())
+    try:
+        await asyncio.wait({primary, granted_wait}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        granted_wait.cancel()
+    if not primary.done():
+        await asyncio.wait({primary}, timeout=model_router.hedge_delay_ms(model_name) / 1000)
+    if primary.done():
+        return primary.result()
+    
+    gemini_metrics["hedges"] += 1
+    # Hedges are speculative, so they wait behind real requests for quota
+    hedge = asyncio.create_task(request_vibe_from_model(model_name, playlist_string, PRIORITY_BACKGROUND))
+    pending = {primary, hedge}
+    answered = False
+    error = None
+    
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                answered = True
+                if task.result() is not None:
+                    if task is hedge:
+                        gemini_metrics["hedge_wins"] += 1
+                    return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    
+    # Neither call produced a valid answer
+    if not answered:
+        raise error
+    return None
+
+async def analyze_playlist_with_gemini(playlist_string: str, latency_budget_ms: Optional[int] = None,
+                                       priority: int = PRIORITY_INTERACTIVE) -> Dict:
+    """Send playlist to Gemini for vibe analysis, escalating to the slower model when needed"""
+    
+    if latency_budget_ms is None:
+        latency_budget_ms = GEMINI_DEFAULT_LATENCY_BUDGET_MS
+    start = time.monotonic()
+    
+    model_name = model_router.choose_model(len(playlist_string), latency_budget_ms)
+    try:
+        result = await hedged_request_vibe(model_name, playlist_string, priority)
+    except GeminiQueueFullError:
+        raise
+    except CircuitOpenError:
+        return fallback_vibe_result("Fallback while Gemini circuit breaker is open")
     except Exception as e:
-        print(f"Gemini API error: {e}")
-        # Fallback response
-        return {
-            "spotify_vibe": random.choice(BUZZWORD_TEMPLATES["balanced_focus"]),
-            "backend_category": "balanced_focus", 
-            "reasoning": "Fallback due to API error",
-            "confidence": 0.5
-        }
+        print(f"Gemini API error ({model_name}): {e}")
+        return fallback_vibe_result("Fallback due to API error")
+    
+    remaining_ms = latency_budget_ms - (time.monotonic() - start) * 1000
+    return await escalate_vibe_result(model_name, playlist_string, result, remaining_ms, priority)
+
+async def escalate_vibe_result(model_name: str, playlist_string: str, result: Optional[Dict],
+                               remaining_ms: float, priority: int = PRIORITY_INTERACTIVE) -> Dict:
+    """
+    Retry a missing or low-confidence answer from model_name on the slower
+    model when the remaining latency budget allows it, falling back when
+    there is still no valid answer.
+    """
+    
+    fallback_reason = "Fallback due to parsing error"
+    escalation = model_router.escalation_model(model_name, result, len(playlist_string), remaining_ms)
+    if escalation:
+        gemini_metrics["escalations"] += 1
+        try:
+            escalated = await hedged_request_vibe(escalation, playlist_string, priority)
+            if escalated is not None:
+                result = escalated
+        except GeminiQueueFullError:
+            print(f"Not escalating to {escalation}: Gemini queue is full")
+        except Exception as e:
+            print(f"Gemini API error ({escalation}): {e}")
+            fallback_reason = "Fallback due to API error"
+    
+    if result is None:
+        return fallback_vibe_result(fallback_reason)
+    
+    return result
+
+async def analyze_playlist_batch_with_gemini(playlist_strings: List[str],
+                                             priority: int = PRIORITY_INTERACTIVE) -> List[Optional[Dict]]:
+    """
+    Send several short playlists to Gemini in one prompt.
+    Returns one validated result per playlist, or None for items that failed to parse.
+    """
+    
+    response = await generate_vibe_content(
+        model_router.fast_model,
+        build_batch_vibe_prompt(playlist_strings),
+        sum(len(playlist) for playlist in playlist_strings),
+        priority,
+        batched=True
+    )
+    
+    results = [None] * len(playlist_strings)
+    try:
+        items = json.loads(clean_gemini_response_text(response.text))
+    except json.JSONDecodeError as e:
+        print(f"Batch JSON decode error: {e}")
+        return results
+    
+    if not isinstance(items, list):
+        print("Batch response was not a JSON array")
+        return results
+    
+    for position, item in enumerate(items):
+        # Prefer the index Gemini echoed back, fall back to array position
+        index = position
+        if isinstance(item, dict) and isinstance(item.get("playlist_index"), int):
+            index = item["playlist_index"] - 1
+        if not 0 <= index < len(results) or results[index] is not None:
+            continue
+        
+        try:
+            results[index] = validate_vibe_result(item)
+        except ValueError as e:
+            print(f"Batch item {index + 1} failed validation: {e}")
+    
+    return results
+
+class GeminiMicroBatcher:
+    """
+    Collects playlists that arrive within a short window and analyzes them
+    with a single Gemini call. Items that fail validation are retried alone,
+    and low-confidence answers are escalated like single requests, each
+    within its own latency budget.
+    """
+    
+    def __init__(self, max_batch_size: int, window_ms: int):
+        self.max_batch_size = max_batch_size
+        self.window_ms = window_ms
+        self.pending = []
+        self.window_task = None
+        # Running batches, referenced so they are not garbage-collected mid-flight
+        self.batch_tasks = set()
+    
+    async def submit(self, playlist_string: str, latency_budget_ms: Optional[int] = None) -> Dict:
+        """Queue a playlist for the next batch and wait for its result"""
+        
+        if latency_budget_ms is None:
+            latency_budget_ms = GEMINI_DEFAULT_LATENCY_BUDGET_MS
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((playlist_string, latency_budget_ms, time.monotonic(), future))
+        
+        if len(self.pending) >= self.max_batch_size:
+            self._flush()
+        elif self.window_task is None:
+            self.window_task = asyncio.create_task(self._flush_after_window())
+        
+        return await future
+    
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window_ms / 1000)
+        self.window_task = None
+        self._flush()
+    
+    def _flush(self):
+        # The flushed items end the current window; the next submit starts a new one
+        if self.window_task is not None:
+            self.window_task.cancel()
+            self.window_task = None
+        
+        while self.pending:
+            batch = self.pending[:self.max_batch_size]
+            self.pending = self.pending[self.max_batch_size:]
+            task = asyncio.create_task(self._run_batch(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+    
+    async def _run_batch(self, batch):
+        """Analyze one batch and resolve every caller's future, whatever happens"""
+        
+        try:
+            results = await self._analyze_batch(batch)
+        except asyncio.CancelledError:
+            for *_, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            print(f"Gemini batch error: {e}")
+            results = [e] * len(batch)
+        
+        for (*_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    async def _analyze_batch(self, batch) -> List:
+        """Return one result (or exception) per batch item"""
+        
+        playlists = [playlist for playlist, *_ in batch]
+        
+        if len(playlists) == 1:
+            results = [None]
+        else:
+            try:
+                results = await analyze_playlist_batch_with_gemini(playlists)
+            except GeminiQueueFullError as e:
+                # Retrying each item alone would only add to the backlog
+                return [e] * len(playlists)
+            except Exception as e:
+                print(f"Gemini batch error: {e}")
+                results = [None] * len(playlists)
+        
+        # Retry items that failed to parse on their own and escalate
+        # low-confidence answers, each within what is left of its budget
+        now = time.monotonic()
+        followups = []
+        for (playlist, latency_budget_ms, submitted_at, _), result in zip(batch, results):
+            remaining_ms = latency_budget_ms - (now - submitted_at) * 1000
+            if result is None:
+                followups.append(analyze_playlist_with_gemini(playlist, remaining_ms))
+            else:
+                followups.append(escalate_vibe_result(model_router.fast_model, playlist, result, remaining_ms))
+        
+        return await asyncio.gather(*followups, return_exceptions=True)
+
+gemini_batcher = GeminiMicroBatcher(GEMINI_BATCH_MAX_SIZE, GEMINI_BATCH_WINDOW_MS)
+
+async def analyze_playlist_vibe(playlist_string: str, latency_budget_ms: Optional[int] = None,
+                                priority: int = PRIORITY_INTERACTIVE) -> Dict:
+    """Analyze a playlist, packing short interactive playlists into micro-batches when batch mode is on"""
+    
+    playlist_string = compact_playlist_string(playlist_string)
+    latency_budget_ms = latency_budget_ms or GEMINI_DEFAULT_LATENCY_BUDGET_MS
+    
+    if (GEMINI_BATCH_MODE and priority == PRIORITY_INTERACTIVE
+            and len(playlist_string) <= GEMINI_BATCH_MAX_PLAYLIST_CHARS):
+        return await gemini_batcher.submit(playlist_string, latency_budget_ms)
+    
+    return await analyze_playlist_with_gemini(playlist_string, latency_budget_ms, priority)
 
 def find_students_by_vibe(backend_category: str) -> List[Dict]:
     """Find students from Neo4j with matching vibe category"""
@@ -348,7 +1025,11 @@ async def analyze_playlist(playlist_input: PlaylistInput):
     
     try:
         # Step 1: Analyze playlist with Gemini
-        gemini_result = await analyze_playlist_with_gemini(playlist_input.playlist_string)
+        gemini_result = await analyze_playlist_vibe(
+            playlist_input.playlist_string,
+            playlist_input.latency_budget_ms,
+            PRIORITY_BACKGROUND if playlist_input.background else PRIORITY_INTERACTIVE
+        )
         
         # Step 2: Find matching students
         matching_students = find_students_by_vibe(gemini_result["backend_category"])
@@ -379,6 +1060,8 @@ async def analyze_playlist(playlist_input: PlaylistInput):
             matching_results=matching_results
         )
         
+    except GeminiQueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Service busy, please retry shortly: {str(e)}")
     except Exception as e:
         print(f"Error in analyze_playlist: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -394,7 +1077,7 @@ async def analyze_playlist_file(file_input: PlaylistFileInput):
         # Step 2: Use the existing analysis function
         playlist_input = PlaylistInput(
             playlist_string=playlist_string,
-            user_name=file_input.user_name
+            background=file_input.background
         )
         
         return await analyze_playlist(playlist_input)
@@ -501,7 +1184,7 @@ async def analyze_playlist_json(file_input: PlaylistFileInput):
         playlist_string = read_playlist_json(file_input.file_path)
         
         # Step 2: Use the existing analysis function
-        playlist_input = PlaylistInput(playlist_string=playlist_string)
+        playlist_input = PlaylistInput(playlist_string=playlist_string, background=file_input.background)
         
         return await analyze_playlist(playlist_input)
         
@@ -556,6 +1239,22 @@ async def test_connection():
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Get Gemini request and token usage counters"""
+    requests_made = gemini_metrics["requests"]
+    return {
+        "gemini": {
+            **gemini_metrics,
+            "avg_input_tokens_per_request": gemini_metrics["input_tokens"] / requests_made if requests_made else 0,
+            "avg_output_tokens_per_request": gemini_metrics["output_tokens"] / requests_made if requests_made else 0,
+            "prompt_cache": {model_name: prompt_cache_state(model_name) for model_name in models},
+            "models": model_router.snapshot(),
+            "breaker_state": gemini_breaker.state,
+            "rate_limiter": gemini_rate_limiter.snapshot()
+        }
+    }
+
 @app.get("/vibe-distribution")
 async def get_vibe_distribution():
     """Get distribution of study vibes in the database"""
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import benchmark_generator
+
+
+def stage_report(**runs):
+    """A report whose runs map scale factor -> {stage: wall seconds}"""
+    return {"runs": {
+        scale_factor: {
+            "totalWallSeconds": sum(stages.values()),
+            "stages": [{"stage": stage, "wallSeconds": seconds, "peakMemoryBytes": 0}
+                       for stage, seconds in stages.items()]
+        }
+        for scale_factor, stages in runs.items()
+    }}
+
+
+BASELINE = stage_report(
+    SF1={"generate_students": 2.0, "generate_courses": 1.0, "export_csv": 0.2},
+    SF10={"generate_students": 20.0}
+)
+
+
+def test_stages_slower_than_the_threshold_are_regressions():
+    report = stage_report(
+        SF1={"generate_students": 2.6, "generate_courses": 1.2, "export_csv": 0.2},
+        SF10={"generate_students": 26.0}
+    )
+
+    regressions = benchmark_generator.find_regressions(report, BASELINE, threshold=0.25, min_seconds=0.5)
+
+    assert regressions == [("SF1", "generate_students", 2.0, 2.6), ("SF10", "generate_students", 20.0, 26.0)]
+
+
+def test_stages_within_the_threshold_are_not_regressions():
+    report = stage_report(SF1={"generate_students": 2.5, "generate_courses": 0.4, "export_csv": 0.25})
+
+    assert benchmark_generator.find_regressions(report, BASELINE, threshold=0.25, min_seconds=0.1) == []
+
+
+def test_stages_below_min_seconds_in_the_baseline_are_skipped():
+    report = stage_report(SF1={"generate_students": 2.0, "generate_courses": 5.0, "export_csv": 5.0})
+
+    assert benchmark_generator.find_regressions(report, BASELINE, threshold=0.25, min_seconds=0.5) == [
+        ("SF1", "generate_courses", 1.0, 5.0)
+    ]
+    assert benchmark_generator.find_regressions(report, BASELINE, threshold=0.25, min_seconds=1.5) == []
+
+
+def test_stages_and_scale_factors_missing_from_the_baseline_are_skipped():
+    report = stage_report(SF1={"generate_textbooks": 9.0}, SF100={"generate_students": 900.0})
+
+    assert benchmark_generator.find_regressions(report, BASELINE) == []
+    assert benchmark_generator.find_regressions(report, {}) == []
+
+
+def test_main_exits_with_status_1_on_regressions(tmp_path, monkeypatch, capsys):
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(BASELINE))
+    report = stage_report(SF1={"generate_students": 3.0, "export_csv": 1.0})
+    monkeypatch.setattr(benchmark_generator, "run_benchmark", lambda *args: report)
+    argv = ["--scale-factors", "SF1", "--output", str(tmp_path / "report.json"), "--baseline", str(baseline_path)]
+
+    with pytest.raises(SystemExit) as exit_info:
+        benchmark_generator.main(argv + ["--min-seconds", "0.5"])
+    assert exit_info.value.code == 1
+    assert "SF1 generate_students: 2.000s -> 3.000s (+50%)" in capsys.readouterr().out
+
+    # Raising --min-seconds above the baseline stage time filters it out
+    benchmark_generator.main(argv + ["--min-seconds", "2.5"])
+    assert "No stage regressed" in capsys.readouterr().out
+    with open(tmp_path / "report.json") as f:
+        assert json.load(f) == report
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from gemini_limiter import GeminiQueueFullError, GeminiRateLimiter, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+
+
+class FakeClock:
+    """Monotonic clock whose sleeps only end when the test advances it"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleepers = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        future = asyncio.get_running_loop().create_future()
+        self.sleepers.append((self.now + seconds, future))
+        await future
+
+    def advance(self, seconds):
+        self.now += seconds
+        for wake_at, future in list(self.sleepers):
+            if wake_at <= self.now:
+                self.sleepers.remove((wake_at, future))
+                if not future.done():
+                    future.set_result(None)
+
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def run_with_limiter(scenario, max_queue_size=10):
+    """Run scenario(limiter, clock, call) against a 1-call-per-second limiter whose only token is spent"""
+    clock = FakeClock()
+    limiter = GeminiRateLimiter(60, 1, max_queue_size, clock=clock, sleep=clock.sleep)
+    granted = []
+
+    async def call(name, priority=PRIORITY_INTERACTIVE):
+        await limiter.acquire(priority)
+        granted.append(name)
+
+    async def main():
+        await limiter.acquire()
+        try:
+            await scenario(limiter, clock, call, granted)
+        finally:
+            limiter.dispatcher.cancel()
+            await settle()
+
+    asyncio.run(main())
+    return limiter
+
+
+def test_interactive_calls_are_released_before_background_work():
+    async def scenario(limiter, clock, call, granted):
+        tasks = [asyncio.create_task(call("background-1", PRIORITY_BACKGROUND)),
+                 asyncio.create_task(call("background-2", PRIORITY_BACKGROUND)),
+                 asyncio.create_task(call("interactive", PRIORITY_INTERACTIVE))]
+        await settle()
+        assert granted == []
+
+        for expected in (["interactive"], ["interactive", "background-1"],
+                         ["interactive", "background-1", "background-2"]):
+            clock.advance(1)
+            await settle()
+            assert granted == expected
+        await asyncio.gather(*tasks)
+
+    run_with_limiter(scenario)
+
+
+def test_cancelled_waiters_give_up_their_place_without_spending_a_token():
+    async def scenario(limiter, clock, call, granted):
+        gave_up = asyncio.create_task(call("gave-up"))
+        waiting = asyncio.create_task(call("waiting"))
+        await settle()
+        gave_up.cancel()
+        await settle()
+        assert limiter.queued == 1
+
+        clock.advance(1)
+        await settle()
+        assert granted == ["waiting"]
+        assert limiter.queued == 0
+        assert limiter.tokens < 1
+        await waiting
+
+        # The next token goes to the next caller, not to the cancelled entry
+        late = asyncio.create_task(call("late"))
+        clock.advance(1)
+        await settle()
+        assert granted == ["waiting", "late"]
+        await late
+
+    run_with_limiter(scenario)
+
+
+def test_full_queue_rejects_new_callers_until_a_waiter_leaves():
+    async def scenario(limiter, clock, call, granted):
+        first = asyncio.create_task(call("first"))
+        second = asyncio.create_task(call("second"))
+        await settle()
+
+        with pytest.raises(GeminiQueueFullError):
+            await limiter.acquire()
+        assert limiter.metrics["rate_limit_rejections"] == 1
+
+        first.cancel()
+        await settle()
+        third = asyncio.create_task(call("third"))
+        for _ in range(2):
+            clock.advance(1)
+            await settle()
+        assert granted == ["second", "third"]
+        await asyncio.gather(second, third)
+
+    run_with_limiter(scenario, max_queue_size=2)
+
+
+def test_upstream_rate_limit_drains_the_bucket():
+    async def scenario(limiter, clock, call, granted):
+        clock.advance(1)
+        limiter.penalize()
+        task = asyncio.create_task(call("after-penalty"))
+        await settle()
+        assert granted == []
+        assert limiter.metrics["upstream_rate_limited"] == 1
+
+        clock.advance(1)
+        await settle()
+        assert granted == ["after-penalty"]
+        await task
+
+    run_with_limiter(scenario)
@@ -0,0 +1,426 @@
+import csv
+import filecmp
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+from collections import deque
+
+import pytest
+
+import generate_synthetic_dataset as generator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def random_completions(num_students, num_courses, per_student, seed=7):
+    rng = random.Random(seed)
+    entries = []
+    for student in range(num_students):
+        for course in rng.sample(range(num_courses), per_student):
+            entries.append((student, course, rng.choice([0, 10, 20, 30, 40]), rng.randint(1, 10)))
+    return entries
+
+
+def test_vectorized_pairs_when_last_chunk_has_only_highest_students(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(generator, "PERFORMANCE_SIMILARITY_PAIR_CHUNK", 6)
+    entries = [(student, course, 30, 5) for student in range(3) for course in range(3)]
+    course_ids = ["C0", "C1", "C2"]
+
+    pairs = list(generator.top_performance_pairs_vectorized(entries, 3, course_ids))
+
+    assert pairs == list(generator.top_performance_pairs(entries, 3, course_ids))
+    assert len(pairs) == 6
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 50, 5_000_000])
+def test_vectorized_pairs_match_pure_python_for_any_chunk_size(monkeypatch, chunk):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(generator, "PERFORMANCE_SIMILARITY_PAIR_CHUNK", chunk)
+    entries = random_completions(num_students=40, num_courses=12, per_student=6)
+    course_ids = [f"C{course:03d}" for course in range(12)]
+
+    vectorized = list(generator.top_performance_pairs_vectorized(entries, 40, course_ids))
+    expected = list(generator.top_performance_pairs(entries, 40, course_ids))
+
+    assert [(s, o, c) for s, o, _, c in vectorized] == [(s, o, c) for s, o, _, c in expected]
+    assert [round(score, 9) for *_, score, _ in vectorized] == [round(score, 9) for *_, score, _ in expected]
+
+
+def test_csv_file_writer_surfaces_pool_write_errors(tmp_path):
+    pool = generator.ThreadPoolExecutor(max_workers=2)
+    slots = generator.threading.Semaphore(2 * generator.CSV_WRITE_QUEUE_PER_WRITER)
+    writer = generator.CsvFileWriter(str(tmp_path / "out.csv"), pool, slots)
+
+    def fail(text):
+        raise OSError(28, "No space left on device")
+    writer.file.write = fail
+
+    with pytest.raises(OSError):
+        for _ in range(100):
+            writer.write("row\n")
+    assert writer.pending == deque()
+    with pytest.raises(OSError):
+        writer.close()
+    pool.shutdown()
+
+
+def test_course_history_index_lists_prerequisite_positions():
+    courses = [{"id": course_id, "termAvailability": ["Fall"]} for course_id in ("C0", "C1", "C2")]
+    prerequisites = [
+        {"source": "C0", "target": "C2"},
+        {"source": "C1", "target": "C2"},
+        {"source": "C0", "target": "C2"},
+        {"source": "X9", "target": "C1"},
+    ]
+
+    index = generator.build_course_history_index(courses, prerequisites)
+    prereqs = index["prereq_positions"]
+
+    assert prereqs == [(), (-1,), (0, 1)]
+    assert generator.sample_eligible_courses([0, 1, 2], prereqs, {0}, 3, random.Random(1)) == []
+    assert generator.sample_eligible_courses([0, 1, 2], prereqs, set(), 3, random.Random(1)) == [0]
+    assert generator.prerequisites_met(prereqs[2], {0, 1})
+
+
+def small_student_store(num_students=60, seed=3):
+    rng = random.Random(seed)
+    students = [{
+        "id": f"S{student:03d}",
+        "learningStyle": rng.choice(["Visual", "Auditory"]),
+        "preferredPace": rng.choice(["Fast", "Slow"]),
+        "preferredCourseLoad": rng.randint(1, 5),
+        "preferredInstructionMode": rng.choice(["Online", "In-person"])
+    } for student in range(num_students)]
+    completed_courses = [{
+        "studentId": student["id"], "courseId": f"C{course:02d}",
+        "grade": rng.choice(["A", "B", "C"]), "difficulty": rng.randint(1, 5)
+    } for student in students for course in rng.sample(range(15), 6)]
+    store = generator.StudentStore()
+    store.add_shard(students, completed_courses)
+    return store
+
+
+def collect_blocks(blocks):
+    outputs = {}
+    for key, records in blocks:
+        outputs.setdefault(key, []).extend(records)
+    return outputs
+
+
+def test_student_similarity_blocks_do_not_change_output():
+    store = small_student_store()
+
+    random.seed(11)
+    whole = collect_blocks(generator.generate_student_similarity(store, block_size=len(store)))
+    random.seed(11)
+    blocks = list(generator.generate_student_similarity(store, block_size=7))
+
+    assert collect_blocks(blocks) == whole
+    assert max(len({record["sourceId"] for record in records}) for _, records in blocks) <= 7
+
+
+def test_streamed_checkpoint_replays_generated_blocks(tmp_path):
+    pytest.importorskip("numpy")
+    store = small_student_store()
+    checkpoints = generator.CheckpointStore(str(tmp_path))
+
+    random.seed(11)
+    generated = collect_blocks(checkpoints.stream(
+        "student_similarity", lambda: generator.generate_student_similarity(store, block_size=7)
+    ))
+    loaded = collect_blocks(checkpoints.stream(
+        "student_similarity", lambda: pytest.fail("checkpoint was not used")
+    ))
+
+    assert checkpoints.generated == ["student_similarity"]
+    assert loaded == generated
+    assert generated["performance_similarity"]
+
+
+@pytest.mark.parametrize("exact_groups", [2000, 0])
+def test_tag_set_candidates_ignore_common_tags_on_both_paths(monkeypatch, exact_groups):
+    monkeypatch.setattr(generator, "COURSE_SIMILARITY_EXACT_GROUPS", exact_groups)
+    common = {"CS", "L100"}
+    # Identical informative tags always collide in an LSH band
+    tag_sets = [frozenset({"CS", "L100", "a", "b"}), frozenset({"CS", "a", "b"}), frozenset({"CS", "L100", "c"})]
+
+    candidates = generator.similar_tag_set_candidates(tag_sets, common)
+
+    assert {group: dict(others) for group, others in candidates.items() if others} == {0: {1: 0.75}, 1: {0: 0.75}}
+
+
+def test_name_pool_draws_more_names_for_large_unique_populations():
+    pytest.importorskip("faker")
+    pool = generator.NamePool(seed="test", size=20)
+    base = len(pool.distinct_first_names) * len(pool.distinct_last_names) * 26
+    population = base * 4
+
+    names = pool.unique(0, population, population)
+
+    assert len(set(names)) == population
+    # Populations the original pool covers keep their names
+    assert pool.unique(0, 50, base) == generator.NamePool(seed="test", size=20).unique(0, 50, base)
+
+
+def test_id_allocator_hands_out_distinct_campus_ids():
+    allocator = generator.IdAllocator(random.Random(3))
+    count = 200_000
+
+    ids = [allocator.campus_id(index) for index in range(count)]
+
+    assert len(set(ids)) == count
+    assert all(len(campus_id) == 7 and campus_id[:2].isalpha() and campus_id[:2].isupper()
+               and campus_id[2:].isdigit() for campus_id in ids)
+    assert allocator.campus_id(generator.CAMPUS_ID_SPACE - 1) not in ids
+    with pytest.raises(ValueError):
+        allocator.campus_id(generator.CAMPUS_ID_SPACE)
+
+
+def test_id_allocator_covers_the_whole_id_space(monkeypatch):
+    # Shrink the space to two letters and one digit so every ID can be drawn
+    monkeypatch.setattr(generator, "CAMPUS_ID_DIGIT_SPACE", 10)
+    monkeypatch.setattr(generator, "CAMPUS_ID_SPACE", 26 * 26 * 10)
+    allocator = generator.IdAllocator(random.Random(5))
+
+    ids = {allocator.campus_id(index) for index in range(generator.CAMPUS_ID_SPACE)}
+
+    assert len(ids) == generator.CAMPUS_ID_SPACE
+    assert {campus_id[-1] for campus_id in ids} == set("0123456789")
+
+
+def test_id_allocator_suffixes_taken_ids():
+    allocator = generator.IdAllocator(random.Random(1))
+
+    ids = [allocator.unique_id("CMSC-201") for _ in range(3)] + [allocator.unique_id("CMSC-201-1")]
+
+    assert ids == ["CMSC-201", "CMSC-201-1", "CMSC-201-2", "CMSC-201-1-1"]
+
+
+def test_weighted_sampler_array_draws_match_single_draws():
+    np = pytest.importorskip("numpy")
+    sampler = generator.WeightedSampler({"A": 1, "B": 3, "C": 6})
+    count = 60_000
+
+    indices = sampler.draw_array(count, np.random.default_rng(5))
+    rng = random.Random(5)
+    singles = [sampler.draw(rng) for _ in range(count)]
+
+    assert indices.min() >= 0 and indices.max() <= sampler.last
+    for i, value in enumerate(sampler.values):
+        assert abs(np.count_nonzero(indices == i) - singles.count(value)) / count < 0.02
+
+
+def test_weighted_sampler_array_draws_stay_in_bounds():
+    np = pytest.importorskip("numpy")
+
+    class EdgeGenerator:
+        def random(self, count):
+            return np.array([0.0, 0.1, 0.4, 1.0])[:count]
+
+    sampler = generator.WeightedSampler({"A": 1, "B": 3, "C": 6})
+
+    assert sampler.draw_array(4, EdgeGenerator()).tolist() == [0, 1, 2, 2]
+
+
+def run_script(script, *args):
+    subprocess.run([sys.executable, os.path.join(ROOT, script), *args], check=True, capture_output=True, text=True)
+
+
+@pytest.fixture(scope="module")
+def advanced_datasets(tmp_path_factory):
+    """An SF1 dataset and two copies of it, each advanced by two terms"""
+    pytest.importorskip("faker")
+    root = tmp_path_factory.mktemp("advance")
+    base = str(root / "base")
+    run_script("generate_synthetic_dataset.py", "--output-dir", base, "--reference-date", "2025-09-01",
+               "--workers", "2")
+    copies = []
+    for name in ("first", "second"):
+        copy = str(root / name)
+        shutil.copytree(base, copy)
+        run_script("generate_synthetic_dataset.py", "--output-dir", copy, "--advance-terms", "2", "--workers", "2")
+        copies.append(copy)
+    return base, copies
+
+
+def test_advanced_terms_are_written_in_order(advanced_datasets):
+    base, (advanced, _) = advanced_datasets
+    with open(os.path.join(advanced, "manifest.json")) as f:
+        deltas = json.load(f)["deltas"]
+
+    assert [delta["directory"] for delta in deltas] == ["deltas/01_Spring2025", "deltas/02_Summer2025"]
+    assert sorted(os.listdir(os.path.join(advanced, "deltas"))) == ["01_Spring2025", "02_Summer2025"]
+    assert [delta["term"] for delta in deltas] == ["Spring2025", "Summer2025"]
+    assert deltas[0]["referenceDate"] < deltas[1]["referenceDate"]
+    # The base files are left as they were
+    assert filecmp.dircmp(os.path.join(base, "csv"), os.path.join(advanced, "csv")).diff_files == []
+
+
+def test_advanced_term_ids_resolve_against_the_base_dataset(advanced_datasets):
+    pytest.importorskip("numpy")
+    base, (advanced, _) = advanced_datasets
+    nodes_from = ["--nodes-from", os.path.join(base, "csv")]
+    for delta in ("01_Spring2025", "02_Summer2025"):
+        delta_csv = os.path.join(advanced, "deltas", delta, "csv")
+        run_script("validate_dataset.py", delta_csv, *nodes_from)
+        nodes_from += ["--nodes-from", delta_csv]
+
+
+def test_advancing_the_same_base_is_deterministic(advanced_datasets):
+    _, (first, second) = advanced_datasets
+    for directory, _, files in os.walk(os.path.join(first, "deltas")):
+        other = os.path.join(second, os.path.relpath(directory, first))
+        assert sorted(files) == sorted(name for name in os.listdir(other) if os.path.isfile(os.path.join(other, name)))
+        for name in files:
+            assert filecmp.cmp(os.path.join(directory, name), os.path.join(other, name), shallow=False), name
+
+    manifests = []
+    for copy in (first, second):
+        with open(os.path.join(copy, "manifest.json")) as f:
+            deltas = json.load(f)["deltas"]
+        manifests.append([{key: value for key, value in delta.items() if key not in ("generatedAt", "elapsedSeconds")}
+                          for delta in deltas])
+    assert manifests[0] == manifests[1]
+
+
+def test_scale_factor_runs_default_to_a_fixed_reference_date(tmp_path):
+    pytest.importorskip("faker")
+    output_dir = str(tmp_path / "sf1")
+
+    run_script("generate_synthetic_dataset.py", "--output-dir", output_dir, "--scale-factor", "SF1")
+
+    with open(os.path.join(output_dir, "manifest.json")) as f:
+        config = json.load(f)["config"]
+    assert config["REFERENCE_DATE"] == generator.SCALE_FACTOR_REFERENCE_DATE
+    with open(os.path.join(output_dir, "csv", "terms.csv")) as f:
+        assert max(row["startDate"] for row in csv.DictReader(f)) < generator.SCALE_FACTOR_REFERENCE_DATE
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_worker_count_does_not_change_the_output(tmp_path, engine):
+    pytest.importorskip("faker")
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    outputs = []
+    for workers in ("1", "2"):
+        output_dir = str(tmp_path / f"workers-{workers}")
+        run_script("generate_synthetic_dataset.py", "--output-dir", output_dir, "--scale-factor", "SF1",
+                   "--reference-date", "2025-09-01", "--interaction-engine", engine, "--workers", workers)
+        outputs.append(output_dir)
+
+    files = [sorted(os.path.relpath(os.path.join(directory, name), output_dir)
+                    for directory, _, names in os.walk(output_dir) for name in names) for output_dir in outputs]
+    assert files[0] == files[1]
+    assert os.path.join("csv", "students.csv") in files[0]
+    data_files = [name for name in files[0] if name != "manifest.json"]
+    _, mismatch, errors = filecmp.cmpfiles(*outputs, data_files, shallow=False)
+    assert mismatch == errors == []
+
+    manifests = []
+    for output_dir in outputs:
+        with open(os.path.join(output_dir, "manifest.json")) as f:
+            manifests.append({key: value for key, value in json.load(f).items()
+                              if key not in ("generatedAt", "elapsedSeconds")})
+    assert manifests[0] == manifests[1]
+
+
+COLUMNAR_CHECKED_TABLES = ["students", "faculty", "courses", "completed_courses", "page_views"]
+
+
+@pytest.fixture(scope="module", params=["npy", "parquet"])
+def columnar_dataset(request, tmp_path_factory):
+    pytest.importorskip("faker")
+    pytest.importorskip("numpy")
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    output_dir = str(tmp_path_factory.mktemp(f"columnar-{request.param}"))
+    run_script("generate_synthetic_dataset.py", "--output-dir", output_dir, "--reference-date", "2025-09-01",
+               "--columnar", request.param)
+    return request.param, output_dir
+
+
+def csv_rows_as_values(path, kinds):
+    """Parse a CsvSink file into per-row values of the columnar kinds (the :TYPE column dropped)"""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        keep = [i for i, column in enumerate(header) if not column.endswith(":TYPE")]
+        assert len(keep) == len(kinds)
+        parsers = {
+            "string": str, "date": str, "timestamp": str, "int": int, "bool": lambda cell: cell == "true",
+            "float": lambda cell: float(cell) if cell else math.nan,
+            "string_list": lambda cell: cell.split(";") if cell else []
+        }
+        return [
+            {name: parsers[kind](row[i]) for i, (name, kind) in zip(keep, kinds.items())}
+            for row in reader
+        ]
+
+
+def parquet_rows(path):
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    rows = table.to_pylist()
+    for row in rows:
+        for name, value in row.items():
+            if hasattr(value, "hour"):
+                row[name] = value.strftime("%Y-%m-%d %H:%M:%S")
+            elif hasattr(value, "isoformat"):
+                row[name] = value.isoformat()
+            elif value is None and table.schema.field(name).type == "double":
+                row[name] = math.nan
+    return table.schema, rows
+
+
+def assert_same_rows(rows, expected):
+    assert len(rows) == len(expected)
+    for row, expected_row in zip(rows, expected):
+        assert row.keys() == expected_row.keys()
+        for name, value in expected_row.items():
+            if isinstance(value, float):
+                assert row[name] == pytest.approx(value, nan_ok=True), name
+            else:
+                assert row[name] == value, name
+
+
+@pytest.mark.parametrize("key", COLUMNAR_CHECKED_TABLES)
+def test_columnar_tables_round_trip_to_the_csv_rows(columnar_dataset, key):
+    columnar_format, output_dir = columnar_dataset
+    columnar_dir = os.path.join(output_dir, generator.COLUMNAR_DIR)
+    kinds = generator.COLUMNAR_TABLES[key]
+    expected = csv_rows_as_values(os.path.join(output_dir, "csv", f"{key}.csv"), kinds)
+
+    with open(os.path.join(columnar_dir, "schema.json")) as f:
+        schema = json.load(f)
+    assert schema["format"] == columnar_format
+    assert schema["tables"][key] == {"rows": len(expected), "columns": kinds}
+
+    if columnar_format == "npy":
+        batch = generator.load_columnar_table(columnar_dir, key)
+        for name, kind in kinds.items():
+            assert batch.columns[name].dtype == generator.COLUMNAR_DTYPES[kind], name
+            if kind in ("string", "string_list"):
+                # Codes index a dictionary of distinct values
+                dictionary = batch.dictionaries[name].tolist()
+                assert len(set(dictionary)) == len(dictionary)
+                assert batch.columns[name].min(initial=0) >= 0
+                assert batch.columns[name].max(initial=0) < max(len(dictionary), 1)
+        rows = batch.to_records()
+    else:
+        arrow_schema, rows = parquet_rows(os.path.join(columnar_dir, f"{key}.parquet"))
+        for name, kind in kinds.items():
+            arrow_type = str(arrow_schema.field(name).type)
+            if kind == "string":
+                assert arrow_type == "dictionary<values=string, indices=int32, ordered=0>", name
+            else:
+                # Parquet has no seconds unit, so second timestamps are stored as milliseconds
+                assert arrow_type == {"string_list": "list<element: string>", "int": "int32", "float": "double",
+                                      "bool": "bool", "date": "date32[day]", "timestamp": "timestamp[ms]"}[kind], name
+
+    assert_same_rows(rows, expected)
@@ -0,0 +1,136 @@
+import pytest
+
+pytest.importorskip("neo4j")
+
+import load_to_neo4j as loader
+from neo4j.exceptions import ServiceUnavailable, TransientError
+
+
+class FlakyDriver:
+    """Stand-in driver that raises error once for the first statement containing match"""
+
+    def __init__(self, match, error):
+        self.match = match
+        self.error = error
+        self.statements = []
+
+    def session(self, database=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def run(self, cypher, **params):
+        self.statements.append(cypher)
+        if self.error is not None and self.match in cypher:
+            error, self.error = self.error, None
+            raise error
+        return self
+
+    def consume(self):
+        pass
+
+
+@pytest.fixture
+def csv_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "RETRY_BASE_DELAY", 0)
+    (tmp_path / "students.csv").write_text("id:ID(Student),name\nS1,Ann\nS2,Bob\n")
+    (tmp_path / "courses.csv").write_text("id:ID(Course),name\nC1,Intro\n")
+    (tmp_path / "completed_courses.csv").write_text(
+        ":START_ID(Student),:END_ID(Course),:TYPE,grade\nS1,C1,COMPLETED,A\nS2,C1,COMPLETED,B\n"
+    )
+    return str(tmp_path)
+
+
+def test_node_batches_are_retried_after_a_lost_connection(csv_dir):
+    driver = FlakyDriver("MERGE (n:`Student`", ServiceUnavailable("connection lost"))
+
+    progress = loader.load_dataset(driver, csv_dir, workers=1)
+
+    assert progress.retries == 1
+    assert progress.rows == 5
+
+
+def test_relationship_batches_are_not_retried_after_a_lost_connection(csv_dir):
+    driver = FlakyDriver("CREATE (a)-[r:`COMPLETED`]", ServiceUnavailable("connection lost"))
+
+    with pytest.raises(ServiceUnavailable):
+        loader.load_dataset(driver, csv_dir, workers=1)
+    assert sum("COMPLETED" in cypher for cypher in driver.statements) == 1
+
+
+def test_relationship_batches_are_retried_after_a_transient_error(csv_dir):
+    driver = FlakyDriver("CREATE (a)-[r:`COMPLETED`]", TransientError("deadlock"))
+
+    progress = loader.load_dataset(driver, csv_dir, workers=1)
+
+    assert progress.retries == 1
+    assert sum("COMPLETED" in cypher for cypher in driver.statements) == 2
+
+
+class ConcurrencyDriver(FlakyDriver):
+    """Stand-in driver that records how many statements of each kind run at once"""
+
+    def __init__(self):
+        super().__init__(None, None)
+        self.lock = loader.threading.Lock()
+        self.running = {"node": 0, "relationship": 0}
+        self.most_running = {"node": 0, "relationship": 0}
+
+    def run(self, cypher, **params):
+        kind = "relationship" if "CREATE (a)" in cypher else "node"
+        with self.lock:
+            self.running[kind] += 1
+            self.most_running[kind] = max(self.most_running[kind], self.running[kind])
+        loader.time.sleep(0.02)
+        with self.lock:
+            self.running[kind] -= 1
+        return self
+
+
+def test_relationship_files_load_one_batch_at_a_time(csv_dir):
+    with open(f"{csv_dir}/enrolled_courses.csv", "w") as f:
+        f.write(":START_ID(Student),:END_ID(Course),:TYPE\nS1,C1,ENROLLED_IN\nS2,C1,ENROLLED_IN\n")
+    driver = ConcurrencyDriver()
+
+    progress = loader.load_dataset(driver, csv_dir, batch_size=1, workers=4)
+
+    assert progress.rows == 7
+    assert driver.most_running["relationship"] == 1
+    assert driver.most_running["node"] == 2
+
+
+def test_parse_header_reads_labels_and_columns():
+    spec = loader.parse_header([":START_ID(Student)", ":END_ID(Course)", ":TYPE", "grade", "difficulty:int"])
+
+    assert spec["kind"] == "relationship"
+    assert (spec["start_label"], spec["start_column"]) == ("Student", 0)
+    assert (spec["end_label"], spec["end_column"]) == ("Course", 1)
+    assert spec["type_column"] == 2
+    assert spec["properties"] == [(3, "grade", "string"), (4, "difficulty", "int")]
+    assert loader.parse_header(["id:ID(RequirementGroup)", "name"])["label"] == "RequirementGroup"
+    assert loader.parse_header(["id:ID", "name"])["label"] is None
+    assert loader.parse_header(["name", "price:float"]) is None
+
+
+@pytest.mark.parametrize("header", [
+    [":START_ID", ":END_ID(Course)"],
+    [":START_ID(Student)", ":END_ID()"],
+    [":START_ID(Student", ":END_ID(Course)"],
+    [":START_ID(Student)", "grade"],
+    ["id:ID(Student"],
+])
+def test_parse_header_rejects_missing_or_malformed_labels(header):
+    with pytest.raises(loader.CsvHeaderError):
+        loader.parse_header(header)
+
+
+def test_header_errors_name_the_file(csv_dir):
+    with open(f"{csv_dir}/teaching.csv", "w") as f:
+        f.write(":START_ID,:END_ID(Course),:TYPE\nF1,C1,TEACHES\n")
+
+    with pytest.raises(loader.CsvHeaderError, match=r"teaching\.csv: .*:START_ID\(Student\)"):
+        loader.load_dataset(FlakyDriver(None, None), csv_dir)
@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import validate_dataset as validator
+
+
+def write_csv(directory, name, lines):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def test_delta_relationships_validate_against_base_nodes(tmp_path):
+    base, delta = str(tmp_path / "csv"), str(tmp_path / "delta")
+    write_csv(base, "students.csv", ["id:ID(Student),name", "S1,Ann", "S2,Bob"])
+    write_csv(base, "courses.csv", ["id:ID(Course),name", "C1,Intro"])
+    write_csv(delta, "terms.csv", ["id:ID(Term),name", "T9,Fall"])
+    write_csv(delta, "enrolled_courses.csv", [":START_ID(Student),:END_ID(Course),:TYPE", "S1,C1,ENROLLED_IN"])
+
+    assert not validator.validate_dataset(delta).ok()
+    assert validator.validate_dataset(delta, nodes_from=[base]).ok()
+
+    write_csv(delta, "enrolled_courses.csv", [":START_ID(Student),:END_ID(Course),:TYPE", "S3,C1,ENROLLED_IN"])
+    report = validator.validate_dataset(delta, nodes_from=[base])
+    assert dict(report.counts) == {("enrolled_courses", "start nodes missing from Student"): 1}
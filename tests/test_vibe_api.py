@@ -0,0 +1,355 @@
+import asyncio
+import importlib.util
+import json
+import os
+import re
+import time
+import warnings
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("google.generativeai")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VALID_RESULT = {"spotify_vibe": "Neon Study Storm", "backend_category": "energetic_focus",
+                "reasoning": "upbeat", "confidence": 0.9}
+
+
+class StubModel:
+    """Stand-in for a Gemini model whose latency, failures and answers the test controls"""
+
+    def __init__(self, text=json.dumps(VALID_RESULT), latency=0.0, failures=0,
+                 prompt_tokens=100, cached_tokens=0, prefix_tokens=0):
+        self.text = text
+        self.latency = latency
+        self.failures = failures
+        self.prompt_tokens = prompt_tokens
+        self.cached_tokens = cached_tokens
+        self.prefix_tokens = prefix_tokens
+        self.prompts = []
+        self.started = []
+        self.cancelled = 0
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        self.started.append(time.monotonic())
+        try:
+            await asyncio.sleep(self.latency(len(self.prompts)) if callable(self.latency) else self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("upstream error")
+        usage = SimpleNamespace(prompt_token_count=self.prompt_tokens, candidates_token_count=20,
+                                cached_content_token_count=self.cached_tokens)
+        text = self.text(prompt) if callable(self.text) else self.text
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    async def count_tokens_async(self, content):
+        return SimpleNamespace(total_tokens=self.prefix_tokens)
+
+
+@pytest.fixture(params=["pytest.py", "pytestserverless.py"])
+def app(request):
+    """A fresh copy of the API module (its limiter, breaker and metrics are module state)"""
+    spec = importlib.util.spec_from_file_location("vibe_app", os.path.join(ROOT, request.param))
+    module = importlib.util.module_from_spec(spec)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        spec.loader.exec_module(module)
+    module.gemini_rate_limiter = module.GeminiRateLimiter(60_000, 100, 100, module.gemini_metrics)
+    return module
+
+
+def use_models(app, stubs):
+    """Route calls to stub models; the first is the fast one and the last the slow one"""
+    app.models.clear()
+    app.models.update(stubs)
+    app.model_router = app.ModelRouter(list(stubs)[0], list(stubs)[-1])
+    for name in app.models:
+        app.prompt_caches.setdefault(name, {"model": None, "expires_at": 0.0, "retry_after": 0.0,
+                                            "prefix_tokens": None, "lock": asyncio.Lock()})
+
+
+def test_prompt_cache_needs_a_cacheable_model(app):
+    assert app.prompt_cache_min_tokens("gemini-1.5-flash") is None
+    assert app.prompt_cache_min_tokens("gemini-1.5-flash-002") == 32768
+    assert app.prompt_cache_min_tokens("gemini-pro") is None
+    assert app.prompt_cache_min_tokens("models/gemini-2.5-flash") == 1024
+
+
+def test_cached_prefix_is_used_when_it_meets_the_minimum(app, monkeypatch):
+    cached = StubModel(prompt_tokens=1500, cached_tokens=1400)
+    use_models(app, {"gemini-2.5-flash": StubModel(prefix_tokens=1100)})
+    created = []
+    monkeypatch.setattr(app.caching.CachedContent, "create", lambda **kwargs: created.append(kwargs) or "cache")
+    monkeypatch.setattr(app.genai.GenerativeModel, "from_cached_content", lambda cached_content: cached)
+
+    async def scenario():
+        for _ in range(2):
+            await app.generate_vibe_content("gemini-2.5-flash", "Playlist: x", 11)
+
+    asyncio.run(scenario())
+
+    assert len(created) == 1 and created[0]["system_instruction"] == app.VIBE_CACHED_PREFIX
+    assert cached.prompts == ["Playlist: x", "Playlist: x"]
+    assert app.gemini_metrics["cached_prefix_requests"] == 2
+    assert app.gemini_metrics["cached_input_tokens"] == 2800
+    assert app.gemini_metrics["uncached_input_tokens"] == 200
+    assert app.prompt_cache_state("gemini-2.5-flash") == "active"
+
+
+def test_short_prefix_is_sent_inline_below_the_minimum(app, monkeypatch):
+    model = StubModel(prefix_tokens=900)
+    use_models(app, {"gemini-2.5-flash": model})
+    monkeypatch.setattr(app.caching.CachedContent, "create", lambda **kwargs: pytest.fail("cache created"))
+
+    asyncio.run(app.generate_vibe_content("gemini-2.5-flash", "Playlist: x", 11))
+
+    assert model.prompts == [app.VIBE_PROMPT_PREFIX + "Playlist: x"]
+    assert app.gemini_metrics["inline_prefix_requests"] == 1
+    assert app.gemini_metrics["uncached_input_tokens"] == 100
+    assert app.prompt_cache_state("gemini-2.5-flash") == "inline_below_minimum"
+
+
+class GatedLimiter:
+    """Rate limiter stand-in that holds every call until the test opens it"""
+
+    def __init__(self):
+        self.opened = asyncio.Event()
+
+    async def acquire(self, priority=0):
+        await self.opened.wait()
+
+    def penalize(self):
+        pass
+
+
+@pytest.mark.parametrize("winner", ["hedge", "primary"])
+def test_hedge_waits_for_the_grant_plus_the_hedge_delay(app, monkeypatch, winner):
+    # The primary call takes 1s and loses to the hedge, or takes 0.15s and beats the slow hedge
+    latencies = {"hedge": {1: 1.0, 2: 0.0}, "primary": {1: 0.15, 2: 1.0}}[winner]
+    model = StubModel(latency=latencies.get)
+    use_models(app, {"gemini-fast": model})
+    monkeypatch.setattr(app.model_router, "hedge_delay_ms", lambda model_name: 50)
+    app.gemini_rate_limiter = limiter = GatedLimiter()
+
+    async def scenario():
+        task = asyncio.create_task(app.hedged_request_vibe("gemini-fast", "playlist"))
+        # Waiting for quota is not slow upstream latency: nothing is hedged
+        await asyncio.sleep(0.2)
+        assert model.prompts == [] and app.gemini_metrics["hedges"] == 0
+
+        granted_at = time.monotonic()
+        limiter.opened.set()
+        result = await task
+        await asyncio.sleep(0)
+        return granted_at, result
+
+    granted_at, result = asyncio.run(scenario())
+
+    assert result == VALID_RESULT
+    assert len(model.started) == 2
+    assert model.started[1] - granted_at >= 0.05
+    assert app.gemini_metrics["hedges"] == 1
+    assert app.gemini_metrics["hedge_wins"] == (1 if winner == "hedge" else 0)
+    # The losing call was cancelled rather than left running
+    assert model.cancelled == 1
+
+
+def test_no_hedge_when_the_primary_answers_within_the_delay(app, monkeypatch):
+    model = StubModel(latency=0.01)
+    use_models(app, {"gemini-fast": model})
+    monkeypatch.setattr(app.model_router, "hedge_delay_ms", lambda model_name: 200)
+
+    assert asyncio.run(app.hedged_request_vibe("gemini-fast", "playlist")) == VALID_RESULT
+    assert len(model.prompts) == 1 and app.gemini_metrics["hedges"] == 0
+
+
+def test_circuit_breaker_opens_half_opens_and_closes(app):
+    now = [0.0]
+    app.gemini_breaker = breaker = app.CircuitBreaker(2, 30, clock=lambda: now[0])
+    # The fourth call is the successful probe, slow enough to overlap another call
+    model = StubModel(failures=3, latency=lambda call_number: 0.05 if call_number == 4 else 0.0)
+    use_models(app, {"gemini-fast": model})
+
+    async def call():
+        return await app.generate_vibe_content("gemini-fast", "Playlist: x", 11)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await call()
+        assert breaker.state == "open"
+        with pytest.raises(app.CircuitOpenError):
+            await call()
+        assert len(model.prompts) == 2
+
+        # After the reset timeout one probe goes through; its failure opens the circuit again
+        now[0] += 30
+        with pytest.raises(RuntimeError):
+            await call()
+        assert breaker.state == "open" and app.gemini_metrics["breaker_trips"] == 2
+
+        # Only one probe at a time while half-open; its success closes the circuit
+        now[0] += 30
+        probe = asyncio.create_task(call())
+        await asyncio.sleep(0.01)
+        assert breaker.state == "half_open"
+        with pytest.raises(app.CircuitOpenError):
+            await call()
+        await probe
+        assert breaker.state == "closed" and breaker.consecutive_failures == 0
+        await call()
+
+    asyncio.run(scenario())
+    assert len(model.prompts) == 5
+    assert app.gemini_metrics["breaker_rejections"] == 2
+
+
+def vibe_for(playlist):
+    return {**VALID_RESULT, "spotify_vibe": f"{playlist} vibe"}
+
+
+def answer_playlists(prompt):
+    """Answer batch prompts in reverse order with their playlist_index, and single prompts with an object"""
+    numbered = re.findall(r"Playlist (\d+): (\S+)", prompt)
+    if numbered:
+        return json.dumps([
+            {"playlist_index": int(index)} if playlist == "unparseable" else
+            {**vibe_for(playlist), "playlist_index": int(index)}
+            for index, playlist in reversed(numbered)
+        ])
+    return json.dumps(vibe_for(re.search(r"Playlist: (\S+)", prompt)[1]))
+
+
+def test_batch_flushes_when_full_and_splits_results_by_index(app):
+    model = StubModel(text=answer_playlists)
+    use_models(app, {"gemini-fast": model})
+    batcher = app.GeminiMicroBatcher(max_batch_size=3, window_ms=10_000)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(playlist) for playlist in ("a", "b", "c")))
+
+    start = time.monotonic()
+    results = asyncio.run(scenario())
+
+    # A full batch goes out at once instead of waiting out the 10s window
+    assert time.monotonic() - start < 1
+    assert len(model.prompts) == 1
+    assert results == [vibe_for("a"), vibe_for("b"), vibe_for("c")]
+
+
+def test_batch_flushes_after_the_window(app):
+    model = StubModel(text=answer_playlists)
+    use_models(app, {"gemini-fast": model})
+    batcher = app.GeminiMicroBatcher(max_batch_size=10, window_ms=50)
+
+    async def scenario():
+        first = asyncio.create_task(batcher.submit("a"))
+        await asyncio.sleep(0.02)
+        second = asyncio.create_task(batcher.submit("b"))
+        return await asyncio.gather(first, second)
+
+    start = time.monotonic()
+    results = asyncio.run(scenario())
+
+    assert time.monotonic() - start >= 0.05
+    assert len(model.prompts) == 1
+    assert results == [vibe_for("a"), vibe_for("b")]
+
+
+def test_batch_items_that_fail_validation_are_retried_alone(app):
+    model = StubModel(text=answer_playlists)
+    use_models(app, {"gemini-fast": model})
+    batcher = app.GeminiMicroBatcher(max_batch_size=2, window_ms=10_000)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("unparseable"))
+
+    results = asyncio.run(scenario())
+
+    assert results == [vibe_for("a"), vibe_for("unparseable")]
+    assert len(model.prompts) == 2
+    assert model.prompts[1].endswith(app.build_vibe_prompt("unparseable"))
+
+
+def test_batch_error_reaches_every_caller(app):
+    model = StubModel()
+    use_models(app, {"gemini-fast": model})
+    app.gemini_rate_limiter.max_queue_size = 0
+    batcher = app.GeminiMicroBatcher(max_batch_size=2, window_ms=10_000)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, app.GeminiQueueFullError) for result in results)
+    assert model.prompts == []
+
+
+def test_router_prefers_the_fast_model_within_budget(app):
+    router = app.ModelRouter("gemini-1.5-flash", "gemini-pro")
+
+    assert router.choose_model(2000, 8000) == "gemini-1.5-flash"
+    # Neither model fits: the one predicted fastest still answers
+    assert router.choose_model(2000, 1000) == "gemini-1.5-flash"
+    # Latency predictions scale with playlists larger than the average seen
+    assert router.predict_latency_ms("gemini-1.5-flash", 8000) == 4 * router.predict_latency_ms("gemini-1.5-flash", 2000)
+
+
+def test_router_follows_the_latency_ewma(app):
+    router = app.ModelRouter("gemini-1.5-flash", "gemini-pro")
+
+    for _ in range(3):
+        router.record_latency("gemini-1.5-flash", 20_000, 2000)
+    # 1500 -> 5200 -> 8160 -> 10528 ms with alpha 0.2
+    assert router.latency_ms["gemini-1.5-flash"] == pytest.approx(10_528)
+    assert router.choose_model(2000, 6000) == "gemini-pro"
+    assert router.choose_model(2000, 2000) == "gemini-pro"
+
+    for _ in range(20):
+        router.record_latency("gemini-1.5-flash", 1000, 2000)
+    assert router.choose_model(2000, 6000) == "gemini-1.5-flash"
+
+
+def test_router_escalates_only_low_confidence_answers_within_budget(app):
+    router = app.ModelRouter("gemini-1.5-flash", "gemini-pro")
+    low = {**VALID_RESULT, "confidence": 0.3}
+
+    assert router.escalation_model("gemini-1.5-flash", low, 2000, 8000) == "gemini-pro"
+    assert router.escalation_model("gemini-1.5-flash", None, 2000, 8000) == "gemini-pro"
+    assert router.escalation_model("gemini-1.5-flash", VALID_RESULT, 2000, 8000) is None
+    assert router.escalation_model("gemini-1.5-flash", low, 2000, 3000) is None
+    assert router.escalation_model("gemini-pro", low, 2000, 8000) is None
+
+
+def test_hedge_delay_uses_the_p95_of_single_requests(app):
+    router = app.ModelRouter("gemini-1.5-flash", "gemini-pro")
+    assert router.hedge_delay_ms("gemini-1.5-flash") == 3000
+
+    for latency in range(100, 2100, 100):
+        router.record_latency("gemini-1.5-flash", latency, 2000)
+    router.record_latency("gemini-1.5-flash", 60_000, 2000, batched=True)
+
+    assert router.hedge_delay_ms("gemini-1.5-flash") == 2000
+
+
+def test_analysis_escalates_a_low_confidence_fast_answer(app):
+    fast = StubModel(text=json.dumps({**VALID_RESULT, "confidence": 0.3}))
+    slow = StubModel()
+    use_models(app, {"gemini-fast": fast, "gemini-slow": slow})
+
+    result = asyncio.run(app.analyze_playlist_with_gemini("playlist", latency_budget_ms=8000))
+
+    assert result == VALID_RESULT
+    assert (len(fast.prompts), len(slow.prompts)) == (1, 1)
+    assert app.gemini_metrics["escalations"] == 1
+    # Once the fast model's average latency overruns the budget, requests start on the slow model
+    for _ in range(5):
+        app.model_router.record_latency("gemini-fast", 20_000, len("playlist"))
+    assert app.model_router.choose_model(len("playlist"), 8000) == "gemini-slow"
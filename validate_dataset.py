@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+UMBC Dataset Validator
+
+This script streams every CSV file written by generate_synthetic_dataset.py
+once and reports what neo4j-admin import in import_to_neo4j.sh would
+otherwise drop silently (--skip-bad-relationships, --skip-duplicate-nodes)
+or fail on an hour into the import:
+
+- header columns with unknown types, and values that do not parse as their type
+- rows with a different number of fields than their header
+- empty or duplicate node IDs within an ID space
+- relationships whose start or end node does not exist
+
+A term delta (deltas/NN_<Term>/csv) holds only the new nodes, so its
+relationships point at nodes of the base dataset; --nodes-from reads the
+node IDs of the base CSV directory (and of earlier deltas) first.
+
+Node IDs are kept as sorted 64-bit hashes (8 bytes per node) and files are
+read in chunks, so memory is bounded by the number of nodes however large
+the relationship files are. Plain, gzipped (.csv.gz) and chunked
+(<name>.header.csv + <name>.partNN.csv) files are all read.
+"""
+
+import csv
+import os
+import re
+import sys
+import gzip
+import time
+import argparse
+import datetime
+import itertools
+from collections import defaultdict
+import numpy as np
+
+# =============================================================================
+#                           CONFIGURATION SETTINGS
+# =============================================================================
+
+# Default input: the CSV directory of the generator's default output
+CSV_DIR = os.path.join("umbc_data", "csv")
+
+ROWS_PER_CHUNK = 100_000    # Rows checked per NumPy batch
+MAX_EXAMPLES = 5            # Offending values shown per file and problem
+ARRAY_DELIMITER = ";"       # Same as --array-delimiter in import_to_neo4j.sh
+
+# students.csv, students.csv.gz, page_views.header.csv, page_views.part01.csv.gz
+CSV_FILENAME = re.compile(r"^(?P<stem>.+?)(?:\.(?P<role>header|part\d+))?\.csv(?:\.gz)?$")
+
+def parse_boolean(value):
+    if value.lower() not in ("true", "false"):
+        raise ValueError(value)
+
+# Value parsers for neo4j-admin column types; None accepts any text
+TYPE_PARSERS = {
+    "int": int, "long": int, "short": int, "byte": int,
+    "float": float, "double": float,
+    "boolean": parse_boolean,
+    "date": datetime.date.fromisoformat,
+    "localdatetime": datetime.datetime.fromisoformat,
+    "datetime": datetime.datetime.fromisoformat,
+    "string": None, "char": None
+}
+
+# Header columns that carry no property
+SPECIAL_COLUMNS = {"TYPE", "LABEL", "IGNORE"}
+
+# =============================================================================
+#                           CSV FILES
+# =============================================================================
+
+def open_csv(path):
+    """
+    Open a CSV file for reading, through gzip when the name ends in .gz.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, newline="")
+
+def find_csv_files(csv_dir):
+    """
+    Return (name, paths) for every CSV file in csv_dir, in file name order.
+    paths[0] starts with the header row; for chunked files it is the header
+    file and the remaining paths are its parts.
+    """
+    files = {}
+    parts = defaultdict(list)
+    for filename in sorted(os.listdir(csv_dir)):
+        match = CSV_FILENAME.match(filename)
+        if match is None:
+            continue
+        path = os.path.join(csv_dir, filename)
+        if match["role"] and match["role"].startswith("part"):
+            parts[match["stem"]].append(path)
+        else:
+            files[match["stem"]] = [path]
+
+    for stem, part_paths in parts.items():
+        files.setdefault(stem, []).extend(part_paths)
+    return sorted(files.items())
+
+def read_header(paths):
+    with open_csv(paths[0]) as f:
+        return next(csv.reader(f), None)
+
+def iter_rows(paths):
+    """
+    Yield the data rows of a file and its parts, streaming them from disk.
+    """
+    for i, path in enumerate(paths):
+        with open_csv(path) as f:
+            reader = csv.reader(f)
+            if i == 0:
+                next(reader, None)
+            yield from reader
+
+def iter_chunks(rows, size=ROWS_PER_CHUNK):
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def parse_header(header):
+    """
+    Describe a neo4j-admin CSV header: kind ("node" or "relationship"), the
+    ID space and column of the node ID or relationship ends, and the
+    (index, name, parser, is_array) of every typed property column.
+    Unknown column types are returned in "errors"; kind is None for files
+    that are neither nodes nor relationships.
+    """
+    spec = {"kind": None, "width": len(header), "typed": [], "type_column": None, "errors": []}
+
+    for index, column in enumerate(header):
+        name, _, column_type = column.partition(":")
+        group = re.fullmatch(r"(ID|START_ID|END_ID)(?:\((.*)\))?", column_type)
+
+        if group and group[1] == "ID":
+            spec["kind"] = "node"
+            spec["id_space"], spec["id_column"] = group[2] or "", index
+        elif group and group[1] == "START_ID":
+            spec["kind"] = "relationship"
+            spec["start_space"], spec["start_column"] = group[2] or "", index
+        elif group and group[1] == "END_ID":
+            spec["end_space"], spec["end_column"] = group[2] or "", index
+        elif column_type == "TYPE":
+            spec["type_column"] = index
+        elif column_type in SPECIAL_COLUMNS:
+            continue
+        else:
+            base_type = column_type.lower() or "string"
+            is_array = base_type.endswith("[]")
+            base_type = base_type[:-2] if is_array else base_type
+            if base_type not in TYPE_PARSERS:
+                spec["errors"].append(f"{column}: unknown type {column_type!r}")
+            elif TYPE_PARSERS[base_type] is not None:
+                spec["typed"].append((index, name, TYPE_PARSERS[base_type], is_array))
+
+    if spec["kind"] == "relationship" and "end_column" not in spec:
+        spec["errors"].append("START_ID column without an END_ID column")
+    return spec
+
+# =============================================================================
+#                           VALIDATION
+# =============================================================================
+
+class ValidationReport:
+    """
+    Problem counts and a few example values per (file, problem).
+    """
+
+    def __init__(self, max_examples=MAX_EXAMPLES):
+        self.max_examples = max_examples
+        self.counts = defaultdict(int)
+        self.examples = defaultdict(list)
+        self.rows = {}
+
+    def add(self, name, problem, count=1, examples=()):
+        if count <= 0:
+            return
+        key = (name, problem)
+        self.counts[key] += count
+        room = self.max_examples - len(self.examples[key])
+        if room > 0:
+            self.examples[key].extend(itertools.islice(examples, room))
+
+    def ok(self):
+        return not self.counts
+
+    def print_summary(self):
+        if self.ok():
+            print(f"\nNo problems found in {len(self.rows)} files ({sum(self.rows.values()):,} rows)")
+            return
+
+        print(f"\n{sum(self.counts.values()):,} problems found:")
+        for (name, problem), count in self.counts.items():
+            examples = ", ".join(repr(example) for example in self.examples[(name, problem)])
+            print(f"  {name}: {count:,} x {problem}" + (f" (e.g. {examples})" if examples else ""))
+
+class IdIndex:
+    """
+    The node IDs of one ID space as 64-bit hashes (Python's str hash, which
+    is stable within a run), sorted once every node file has been read.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.hashes = None
+
+    def add(self, hashes):
+        self.chunks.append(hashes)
+
+    def freeze(self):
+        """
+        Sort and deduplicate the hashes; returns the hashes seen more than once.
+        """
+        hashes = np.concatenate(self.chunks) if self.chunks else np.empty(0, dtype=np.int64)
+        self.chunks = None
+        hashes.sort()
+        repeated = hashes[1:] == hashes[:-1]
+        duplicates = np.unique(hashes[1:][repeated])
+        self.hashes = hashes[np.concatenate([[True], ~repeated])] if len(hashes) else hashes
+        return duplicates
+
+    def contains(self, hashes):
+        if not len(self.hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        return self.hashes[positions] == hashes
+
+def hash_ids(values):
+    return np.fromiter((hash(value) for value in values), dtype=np.int64, count=len(values))
+
+def check_rows(name, chunk, spec, report):
+    """
+    Check field counts and typed values of a chunk; returns the rows of the right width.
+    """
+    rows = [row for row in chunk if len(row) == spec["width"]]
+    if len(rows) < len(chunk):
+        report.add(name, f"rows without {spec['width']} fields", len(chunk) - len(rows),
+                   (",".join(row)[:80] for row in chunk if len(row) != spec["width"]))
+
+    for index, column, parse, is_array in spec["typed"]:
+        bad = []
+        for row in rows:
+            value = row[index]
+            if value == "":
+                continue  # Skipped by --ignore-empty-strings
+            try:
+                if is_array:
+                    for item in value.split(ARRAY_DELIMITER):
+                        parse(item)
+                else:
+                    parse(value)
+            except ValueError:
+                bad.append(value)
+        report.add(name, f"invalid {column} values", len(bad), bad)
+    return rows
+
+def check_node_file(name, paths, spec, report, indexes):
+    rows_seen = 0
+    index = indexes[spec["id_space"]]
+    for chunk in iter_chunks(iter_rows(paths)):
+        rows = check_rows(name, chunk, spec, report)
+        ids = [row[spec["id_column"]] for row in rows]
+        report.add(name, "empty node IDs", sum(1 for node_id in ids if node_id == ""))
+        index.add(hash_ids(ids))
+        rows_seen += len(chunk)
+    return rows_seen
+
+def check_relationship_file(name, paths, spec, report, indexes):
+    rows_seen = 0
+    ends = [("start", spec["start_space"], spec["start_column"]), ("end", spec["end_space"], spec["end_column"])]
+    for end, space, _ in ends:
+        if space not in indexes:
+            report.add(name, f"{end} ID space {space!r} has no node file")
+
+    for chunk in iter_chunks(iter_rows(paths)):
+        rows = check_rows(name, chunk, spec, report)
+        if spec["type_column"] is not None:
+            report.add(name, "empty relationship types", sum(1 for row in rows if row[spec["type_column"]] == ""))
+
+        for end, space, column in ends:
+            if space not in indexes:
+                continue
+            ids = [row[column] for row in rows]
+            missing = np.flatnonzero(~indexes[space].contains(hash_ids(ids)))
+            report.add(name, f"{end} nodes missing from {space or 'the global ID space'}",
+                       len(missing), (ids[i] for i in missing[:report.max_examples].tolist()))
+        rows_seen += len(chunk)
+    return rows_seen
+
+def index_node_files(csv_dir, indexes):
+    """
+    Add the node IDs of every node file in csv_dir to indexes without checking
+    the files; returns the number of rows read.
+    """
+    rows_seen = 0
+    for name, paths in find_csv_files(csv_dir):
+        spec = parse_header(read_header(paths) or [])
+        if spec["kind"] != "node" or spec["errors"]:
+            continue
+        index = indexes[spec["id_space"]]
+        for chunk in iter_chunks(iter_rows(paths)):
+            index.add(hash_ids([row[spec["id_column"]] for row in chunk if len(row) == spec["width"]]))
+            rows_seen += len(chunk)
+    return rows_seen
+
+def find_duplicate_ids(name, paths, spec, duplicates, report):
+    """
+    Report the IDs of a node file whose hash was seen more than once in its ID space.
+    """
+    count = 0
+    examples = []
+    seen = set()
+    for row in iter_rows(paths):
+        if len(row) != spec["width"]:
+            continue
+        node_id = row[spec["id_column"]]
+        if node_id in seen:
+            continue
+        if hash(node_id) in duplicates:
+            seen.add(node_id)
+            count += 1
+            if len(examples) < report.max_examples:
+                examples.append(node_id)
+    report.add(name, f"duplicate IDs in {spec['id_space'] or 'the global ID space'}", count, examples)
+
+def validate_dataset(csv_dir, max_examples=MAX_EXAMPLES, nodes_from=()):
+    """
+    Validate every CSV file in csv_dir: node files first, building the ID
+    indexes, then relationship files against them. The node IDs of the
+    directories in nodes_from are indexed too, so relationships may point at
+    them. Returns the ValidationReport.
+    """
+    report = ValidationReport(max_examples)
+    node_files, relationship_files = [], []
+    for name, paths in find_csv_files(csv_dir):
+        header = read_header(paths)
+        spec = parse_header(header or [])
+        for error in spec["errors"]:
+            report.add(name, "bad header", 1, [error])
+        if spec["kind"] is None:
+            print(f"Skipping {name}: not a node or relationship file")
+            continue
+        (node_files if spec["kind"] == "node" else relationship_files).append((name, paths, spec))
+
+    indexes = defaultdict(IdIndex)
+    for nodes_dir in nodes_from:
+        start_time = time.time()
+        rows = index_node_files(nodes_dir, indexes)
+        print(f"Read {rows:,} node IDs from {nodes_dir} in {time.time() - start_time:.1f}s")
+
+    print(f"Checking {len(node_files)} node files...")
+    for name, paths, spec in node_files:
+        start_time = time.time()
+        report.rows[name] = check_node_file(name, paths, spec, report, indexes)
+        print(f"  {name}: {report.rows[name]:,} rows in {time.time() - start_time:.1f}s")
+
+    # Duplicates are found on the hashes and named by re-reading the (small) node files
+    for space, index in list(indexes.items()):
+        duplicates = set(index.freeze().tolist())
+        if duplicates:
+            for name, paths, spec in node_files:
+                if spec["id_space"] == space:
+                    find_duplicate_ids(name, paths, spec, duplicates, report)
+
+    print(f"Checking {len(relationship_files)} relationship files...")
+    for name, paths, spec in relationship_files:
+        start_time = time.time()
+        report.rows[name] = check_relationship_file(name, paths, spec, report, indexes)
+        print(f"  {name}: {report.rows[name]:,} rows in {time.time() - start_time:.1f}s")
+
+    return report
+
+# =============================================================================
+#                           MAIN
+# =============================================================================
+
+def parse_args(argv=None):
+    """
+    Parse command line options.
+    """
+    parser = argparse.ArgumentParser(
+        description="Check the generated UMBC CSV files before importing them into Neo4j."
+    )
+    parser.add_argument("csv_dir", nargs="?", default=CSV_DIR,
+                        help=f"Directory with the generated CSV files (default: {CSV_DIR})")
+    parser.add_argument("--max-examples", type=int, default=MAX_EXAMPLES,
+                        help=f"Offending values shown per file and problem (default: {MAX_EXAMPLES})")
+    parser.add_argument("--nodes-from", action="append", default=[], metavar="CSV_DIR",
+                        help="Also index the node IDs of this CSV directory, e.g. the base dataset "
+                             "when validating a term delta; repeat for earlier deltas")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Validate the dataset and exit with status 1 if any problem was found.
+    """
+    args = parse_args(argv)
+    if not os.path.isdir(args.csv_dir):
+        print(f"Error: CSV directory not found: {args.csv_dir}")
+        sys.exit(1)
+
+    for nodes_dir in args.nodes_from:
+        if not os.path.isdir(nodes_dir):
+            print(f"Error: CSV directory not found: {nodes_dir}")
+            sys.exit(1)
+
+    print(f"Validating {args.csv_dir}")
+    start_time = time.time()
+    report = validate_dataset(args.csv_dir, args.max_examples, args.nodes_from)
+    report.print_summary()
+    print(f"Finished in {time.time() - start_time:.1f}s")
+    if not report.ok():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()